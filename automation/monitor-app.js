@@ -1,14 +1,26 @@
 // Antigravity Mission Control - Monitor App
-// This file reads local files to display status
-
-// Since we're running from file://, we need to use a simple approach
-// The page auto-refreshes every 5 seconds via meta tag
+// Live updates come from rpa_engine/monitor_server.py over Server-Sent Events:
+// a snapshot on connect, then only what changed (checkpoint, new log lines, next task).
+// Without that server (python3 -m http.server, file://) it falls back to
+// re-fetching the files every 5 seconds.
 
 // Configuration
 const CONFIG = {
+    eventsPath: 'events',
+    statePath: 'state',
     checkpointPath: 'checkpoint.md',
     logPath: 'auto_continue_log.txt',
-    taskListPath: '../やりたいリスト.md'
+    taskListPath: '../やりたいリスト.md',
+    pollInterval: 5000,
+    countdownInterval: 30000,
+    logLines: 10
+};
+
+// Current view state (the stream updates it in place)
+const state = {
+    checkpoint: null,
+    logs: [],       // newest first
+    nextTask: '--'
 };
 
 // Parse checkpoint.md content
@@ -94,22 +106,30 @@ function getCountdown(targetTimeStr) {
     }
 }
 
+// Color a log entry by its message
+function logType(message) {
+    let type = 'info';
+    if (message.includes('COMPLETE') || message.includes('sent!')) type = 'success';
+    if (message.includes('WAITING') || message.includes('shortly')) type = 'warning';
+    return type;
+}
+
 // Parse log file content
 function parseLog(content) {
-    const lines = content.trim().split('\n').slice(-10).reverse();
+    const lines = content.trim().split('\n').slice(-CONFIG.logLines).reverse();
     return lines.map(line => {
         const timeMatch = line.match(/\[([\d-]+ [\d:]+)\]/);
         const time = timeMatch ? timeMatch[1] : '';
         const message = line.replace(/\[[\d-]+ [\d:]+\]/, '').trim();
-
-        let type = 'info';
-        if (message.includes('COMPLETE') || message.includes('sent!')) type = 'success';
-        if (message.includes('WAITING') || message.includes('shortly')) type = 'warning';
-
-        return { time, message, type };
+        return { time, message, type: logType(message) };
     });
 }
 
+// Log entries from the server ({time, message}, oldest first) -> display order
+function toLogEntries(entries) {
+    return entries.slice().reverse().map(entry => ({ ...entry, type: logType(entry.message) }));
+}
+
 // Parse task list to get next task
 function parseTaskList(content) {
     const lines = content.split('\n');
@@ -189,10 +209,29 @@ function updateUI(checkpoint, logs, nextTask) {
         `最終更新: ${new Date().toLocaleString('ja-JP')}`;
 }
 
-// For file:// protocol, we'll use embedded data
-// This gets updated by a helper script or manually
+function render() {
+    if (state.checkpoint) {
+        updateUI(state.checkpoint, state.logs, state.nextTask);
+    }
+}
+
+function applySnapshot(snapshot) {
+    state.checkpoint = snapshot.checkpoint;
+    state.logs = toLogEntries(snapshot.logs);
+    state.nextTask = snapshot.nextTask;
+    render();
+}
+
+// Fallback: re-download and parse the files
 async function loadData() {
     try {
+        // The monitor server's parsed state, if it is the one serving this page
+        const stateResp = await fetch(CONFIG.statePath).catch(() => null);
+        if (stateResp && stateResp.ok) {
+            applySnapshot(await stateResp.json());
+            return;
+        }
+
         // Try to fetch local files (works with local server)
         const [checkpointResp, logResp, taskResp] = await Promise.all([
             fetch(CONFIG.checkpointPath).catch(() => null),
@@ -204,11 +243,10 @@ async function loadData() {
         const logText = logResp ? await logResp.text() : '';
         const taskText = taskResp ? await taskResp.text() : '';
 
-        const checkpoint = parseCheckpoint(checkpointText);
-        const logs = parseLog(logText);
-        const nextTask = parseTaskList(taskText);
-
-        updateUI(checkpoint, logs, nextTask);
+        state.checkpoint = parseCheckpoint(checkpointText);
+        state.logs = parseLog(logText);
+        state.nextTask = parseTaskList(taskText);
+        render();
     } catch (e) {
         console.log('Running in file:// mode, using fallback display');
         // Show a message for file:// mode
@@ -218,5 +256,53 @@ async function loadData() {
     }
 }
 
+let pollTimer = null;
+
+function startPolling() {
+    if (pollTimer) return;
+    loadData();
+    pollTimer = setInterval(loadData, CONFIG.pollInterval);
+}
+
+// Live updates over Server-Sent Events; polling if the stream is unavailable
+function connect() {
+    if (!window.EventSource || location.protocol === 'file:') {
+        startPolling();
+        return;
+    }
+
+    const source = new EventSource(CONFIG.eventsPath);
+    let connected = false;
+
+    source.addEventListener('snapshot', e => {
+        connected = true;
+        applySnapshot(JSON.parse(e.data));
+    });
+    source.addEventListener('checkpoint', e => {
+        state.checkpoint = JSON.parse(e.data);
+        render();
+    });
+    source.addEventListener('log', e => {
+        state.logs = toLogEntries(JSON.parse(e.data)).concat(state.logs).slice(0, CONFIG.logLines);
+        render();
+    });
+    source.addEventListener('task', e => {
+        state.nextTask = JSON.parse(e.data);
+        render();
+    });
+    source.onerror = () => {
+        // Once connected, EventSource reconnects by itself (resuming from Last-Event-ID).
+        // A stream that never opened means a plain file server: poll instead.
+        if (!connected) {
+            source.close();
+            startPolling();
+        }
+    };
+}
+
 // Initialize
-document.addEventListener('DOMContentLoaded', loadData);
+document.addEventListener('DOMContentLoaded', () => {
+    connect();
+    // Keep the countdown moving between updates
+    setInterval(render, CONFIG.countdownInterval);
+});
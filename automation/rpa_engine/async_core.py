@@ -0,0 +1,203 @@
+"""
+async_core.py - AntigravityRPA の asyncio 版
+
+操作はすべて await 可能。マウス・キーボード・クリップボードは共有資源なので
+UI 操作は専用の 1 スレッドで順番に実行し、画像検索やファイル待ちは
+イベントループを塞がずに並行して待てる。
+
+    async with AsyncAntigravityRPA() as rpa:
+        index, result = await rpa.wait_first(
+            rpa.wait_for_image("continue_button"),
+            rpa.wait_for_file_change(CHECKPOINT_FILE),
+            rpa.timeout(60),
+        )
+
+wait_first は最初に終わった条件の (番号, 結果) を返し、残りはキャンセルする。
+"""
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from core import AntigravityRPA
+from lib.file_watch import FileWatcher
+
+TIMED_OUT = object()
+WATCH_SLICE = 0.5  # longest blocking FileWatcher.wait, so a cancelled wait frees its thread soon
+
+
+class AsyncAntigravityRPA:
+    def __init__(self, rpa=None, debug=True, backend=None):
+        self.rpa = rpa or AntigravityRPA(debug=debug, backend=backend)
+        self._ui = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rpa-ui")
+        self._io = ThreadPoolExecutor(thread_name_prefix="rpa-io")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._ui.shutdown(wait=False)
+        self._io.shutdown(wait=False)
+
+    def log(self, message):
+        self.rpa.log(message)
+
+    async def _ui_call(self, fn, *args, **kwargs):
+        """Run a blocking UI action on the single UI thread (actions never interleave)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._ui, functools.partial(fn, *args, **kwargs))
+
+    async def _io_call(self, fn, *args, **kwargs):
+        """Run blocking read-only work (screen capture, matching, file waits) on the I/O pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io, functools.partial(fn, *args, **kwargs))
+
+    # --- actions -----------------------------------------------------------
+
+    async def run_applescript(self, script):
+        return await self._ui_call(self.rpa.run_applescript, script)
+
+    async def activate_app(self, app_name):
+        return await self._ui_call(self.rpa.activate_app, app_name)
+
+    async def activate_by_window_title(self, title_part):
+        return await self._ui_call(self.rpa.activate_by_window_title, title_part)
+
+    async def click_window_area(self, title_part, ratio_x=0.5, ratio_y=0.5):
+        return await self._ui_call(self.rpa.click_window_area, title_part, ratio_x, ratio_y)
+
+    async def click_at(self, x, y, duration=0.2):
+        return await self._ui_call(self.rpa.click_at, x, y, duration)
+
+    async def type_text(self, text, interval=None):
+        return await self._ui_call(self.rpa.type_text, text, interval)
+
+    async def inject_text(self, text, region=None, mode=None):
+        return await self._ui_call(self.rpa.inject_text, text, region, mode)
+
+    async def press_key(self, key):
+        return await self._ui_call(self.rpa.press_key, key)
+
+    async def hotkey(self, *keys):
+        return await self._ui_call(self.rpa.hotkey, *keys)
+
+    async def get_clipboard(self):
+        return await self._ui_call(self.rpa.get_clipboard)
+
+    async def set_clipboard(self, text):
+        return await self._ui_call(self.rpa.set_clipboard, text)
+
+    # --- vision ------------------------------------------------------------
+
+    async def locate_image(self, template_path, confidence=0.8, roi=None, window=None):
+        return await self._io_call(self.rpa.locate_image, template_path, confidence, roi, window)
+
+    async def find_image_on_screen(self, template_path, confidence=0.8, roi=None, window=None):
+        match = await self.locate_image(template_path, confidence, roi, window)
+        return match.center if match else None
+
+    async def find_all(self, templates, confidence=0.8, roi=None, window=None, workers=None):
+        return await self._io_call(self.rpa.find_all, templates, confidence, roi, window, workers)
+
+    async def find_any(self, templates, confidence=0.8, roi=None, window=None, workers=None):
+        return await self._io_call(self.rpa.find_any, templates, confidence, roi, window, workers)
+
+    # --- conditions ----------------------------------------------------------
+
+    async def wait_for_image(self, template_path, timeout=None, confidence=0.8, roi=None,
+                             window=None, min_interval=0.05, max_interval=1.0):
+        """
+        Wait until an image appears and return its Match (None on timeout).
+        Pauses are asyncio sleeps, so cancelling the task stops the wait at once.
+        """
+        if window:
+            roi = await self._io_call(self.rpa.window_region, window, roi or (0.0, 0.0, 1.0, 1.0))
+        # The first use of rpa.vision imports OpenCV and loads the templates: keep that off the loop
+        watch = await self._io_call(
+            lambda: self.rpa.vision.watch(template_path, confidence, roi, min_interval, max_interval))
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            match = await self._io_call(watch.poll)
+            if match:
+                self.log(f"Found image at: {match.center} (score {match.score:.3f})")
+                return match
+            pause = watch.interval
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                pause = min(pause, remaining)
+            await asyncio.sleep(pause)
+
+    async def wait_for_file_change(self, path, timeout=None):
+        """
+        Wait until a file has changed and its writes have settled (FileWatcher:
+        inotify on Linux, stat polling elsewhere). Returns the new os.stat
+        result (None on timeout or if the file was removed).
+        """
+        watcher = FileWatcher(path)
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        waiting = None
+        try:
+            while True:
+                wait = WATCH_SLICE if deadline is None else min(WATCH_SLICE, deadline - loop.time())
+                if wait <= 0:
+                    return None
+                waiting = self._io.submit(watcher.wait, wait)
+                if await asyncio.wrap_future(waiting):
+                    try:
+                        return os.stat(path)
+                    except FileNotFoundError:
+                        return None
+        finally:
+            # A cancelled wait may still be running in its thread: close the watcher after it returns
+            if waiting is not None and not waiting.done():
+                waiting.add_done_callback(lambda _: watcher.close())
+            else:
+                watcher.close()
+
+    async def timeout(self, seconds):
+        """A condition that simply fires after `seconds`; returns TIMED_OUT."""
+        await asyncio.sleep(seconds)
+        return TIMED_OUT
+
+    # --- combinators ---------------------------------------------------------
+
+    async def wait_first(self, *conditions):
+        """
+        Run several conditions concurrently and return (index, result) of the
+        first one to finish. The others are cancelled; an exception from the
+        first finisher is re-raised.
+        """
+        tasks = [asyncio.ensure_future(c) for c in conditions]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            first = min(done, key=tasks.index)
+            return tasks.index(first), first.result()
+        finally:
+            await _cancel(tasks)
+
+    async def gather(self, *conditions):
+        """Run conditions concurrently and return all results; on the first failure cancel the rest and raise."""
+        tasks = [asyncio.ensure_future(c) for c in conditions]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception():
+                    raise task.exception()
+            return [task.result() for task in tasks]
+        finally:
+            await _cancel(tasks)
+
+
+async def _cancel(tasks):
+    pending = [task for task in tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
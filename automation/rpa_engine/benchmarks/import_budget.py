@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+import_budget.py - 起動時の import コストの確認 (tests/test_import_budget.py の実行)
+
+    python3 benchmarks/import_budget.py
+    python3 benchmarks/import_budget.py --budget-ms 120 --repeat 5
+
+どれかが守られていなければ pytest の終了コード (1) を返す。
+"""
+import os
+import sys
+import argparse
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_FILE = os.path.join(ENGINE_DIR, "tests", "test_import_budget.py")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cold-start imports of the RPA engine.")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="max import time per entry point")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per import check (fastest counts)")
+    args = parser.parse_args(argv)
+    import pytest
+    os.environ["IMPORT_BUDGET_MS"] = str(args.budget_ms)
+    os.environ["IMPORT_BUDGET_REPEAT"] = str(args.repeat)
+    return int(pytest.main(["-v", TEST_FILE]))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
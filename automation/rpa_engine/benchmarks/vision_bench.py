@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+vision_bench.py - 画像検索のベンチマーク (合成スクリーン)
+
+Mac でよく使う解像度 (Retina 2x を含む) の合成スクリーンを仮想デスクトップに
+描き、既知の位置にアンカー画像を置いて Vision の検索を計測する。
+- full:   履歴なしの全画面検索 (find_image_on_screen の初回)
+- local:  前回のヒット位置の周囲だけを探す 2 回目以降
+- roi:    呼び出し側が指定した領域 (画面の 1/4 四方) だけを探す
+- multi:  find_all で全アンカーを 1 フレームに照合 (workers=1 / 4)
+- wait:   wait_for_image のポーリング 1 回 (静止画面 / アンカーが出現した直後)
+ケースごとに p50/p95・スループット・ピークメモリ (tracemalloc) を測り、
+返ってきた座標が置いた位置と一致するかも確認する。
+
+    python3 benchmarks/vision_bench.py --out results.json
+    python3 benchmarks/vision_bench.py --screens 1080p,5k --sizes 48 --baseline results.json
+
+--baseline を渡すと p50 が threshold 倍を超えて遅くなったケースや
+位置が合わなくなったケースを一覧にし、終了コード 1 を返す。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from collections import namedtuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import cv2
+import numpy as np
+
+from lib.assets import AssetStore
+from lib.backends import VirtualDesktopBackend
+from lib.tracing import quantile
+from lib.vision import Vision
+
+# Logical size (points) and scale factor; physical pixels = size * scale
+Screen = namedtuple("Screen", "name width height scale")
+SCREENS = {
+    "1080p": Screen("1080p", 1920, 1080, 1),
+    "1440p": Screen("1440p", 2560, 1440, 1),
+    "mbp14": Screen("mbp14", 1512, 982, 2),     # MacBook Pro 14" default
+    "4k": Screen("4k", 1920, 1080, 2),          # 4K display at "looks like 1080p"
+    "5k": Screen("5k", 2560, 1440, 2),          # Studio Display / iMac 5K
+}
+DEFAULT_SCREENS = ("1080p", "mbp14", "4k", "5k")
+DEFAULT_SIZES = (24, 48, 96)
+MODES = ("full", "local", "roi", "multi-1", "multi-4", "wait-idle", "wait-change")
+TOLERANCE = 2  # points between the reported and the planted center
+ROI_FRACTION = 0.25
+
+Anchor = namedtuple("Anchor", "path x y size image")
+
+
+def paint_desktop(backend, seed):
+    """Windows, title bars and rows of 'text' so the matcher has realistic clutter."""
+    rng = np.random.default_rng(seed)
+    w, h = backend.width, backend.height
+    backend.fill_rect(0, 0, w, h, (30, 30, 34))
+    for _ in range(6):
+        ww, wh = int(rng.integers(w // 4, w // 2)), int(rng.integers(h // 4, h // 2))
+        x, y = int(rng.integers(0, w - ww)), int(rng.integers(24, h - wh))
+        shade = int(rng.integers(200, 250))
+        backend.fill_rect(x, y, ww, wh, (shade, shade, shade))
+        backend.fill_rect(x, y, ww, 22, (shade - 40, shade - 40, shade - 30))
+        for row in range(y + 34, y + wh - 12, 18):
+            cursor = x + 12
+            while cursor < x + ww - 40:
+                word = int(rng.integers(12, 60))
+                backend.fill_rect(cursor, row, word, 9, (60, 60, 70))
+                cursor += word + int(rng.integers(5, 9))
+
+
+def make_anchor(rng, size, scale):
+    """A distinctive RGB icon of size points, in physical pixels."""
+    cells = int(rng.integers(4, 7))
+    grid = rng.integers(0, 256, size=(cells, cells, 3), dtype=np.uint8)
+    side = size * scale
+    icon = cv2.resize(grid, (side, side), interpolation=cv2.INTER_NEAREST)
+    cv2.rectangle(icon, (0, 0), (side - 1, side - 1), (20, 20, 20), max(1, scale))
+    return icon
+
+
+def plant_anchors(backend, size, count, directory, seed, capture="pixels"):
+    """
+    Draw count anchors on non-overlapping grid slots and save their templates.
+    capture="points" saves the template at 1x (as if grabbed on a non-Retina screen).
+    """
+    rng = np.random.default_rng(seed)
+    cols = max(1, backend.width // (size * 3))
+    rows = max(1, backend.height // (size * 3))
+    slots = rng.choice(cols * rows, size=min(count, cols * rows), replace=False)
+    anchors = []
+    for i, slot in enumerate(slots):
+        x = int(slot % cols) * size * 3 + size
+        y = int(slot // cols) * size * 3 + size
+        icon = make_anchor(rng, size, backend.scale)
+        backend.draw_image(icon, x, y)
+        template = icon if capture == "pixels" else cv2.resize(icon, (size, size), interpolation=cv2.INTER_AREA)
+        path = os.path.join(directory, f"anchor_{size}_{i}.png")
+        cv2.imwrite(path, cv2.cvtColor(template, cv2.COLOR_RGB2BGR))
+        anchors.append(Anchor(path, x, y, size, icon))
+    return anchors
+
+
+def correct(match, anchor):
+    if match is None:
+        return False
+    cx, cy = anchor.x + anchor.size / 2, anchor.y + anchor.size / 2
+    return abs(match.center[0] - cx) <= TOLERANCE and abs(match.center[1] - cy) <= TOLERANCE
+
+
+def roi_around(backend, anchor):
+    """A caller-style ROI: ROI_FRACTION of the screen in each direction, containing the anchor."""
+    rw, rh = int(backend.width * ROI_FRACTION), int(backend.height * ROI_FRACTION)
+    left = min(max(0, anchor.x + anchor.size // 2 - rw // 2), backend.width - rw)
+    top = min(max(0, anchor.y + anchor.size // 2 - rh // 2), backend.height - rh)
+    return (left, top, rw, rh)
+
+
+class Case:
+    """One (screen, template size, mode) combination: prepare() per iteration, then a timed run()."""
+
+    def __init__(self, backend, vision, anchors, mode):
+        self.backend, self.vision, self.anchors, self.mode = backend, vision, anchors, mode
+        self.index = 0
+        self.watch = None
+
+    @property
+    def anchor(self):
+        return self.anchors[self.index % len(self.anchors)]
+
+    def searched_pixels(self):
+        b = self.backend
+        if self.mode == "roi":
+            _, _, w, h = roi_around(b, self.anchor)
+            return w * h * b.scale ** 2
+        if self.mode == "local":
+            _, _, w, h = self.vision.padded((self.anchor.x, self.anchor.y, self.anchor.size, self.anchor.size))
+            return w * h * b.scale ** 2
+        return b.width * b.height * b.scale ** 2
+
+    def prepare(self):
+        self.index += 1
+        anchor = self.anchor
+        vision = self.vision
+        if self.mode == "local":
+            vision.history.clear()
+            vision.locate(anchor.path)
+        elif self.mode.startswith("wait"):
+            self.watch = vision.watch(anchor.path, min_interval=0.0, max_interval=0.0)
+            self.backend.fill_rect(anchor.x, anchor.y, anchor.size, anchor.size, (30, 30, 34))
+            self.watch.poll()  # baseline frame without the anchor
+            if self.mode == "wait-change":
+                self.backend.draw_image(anchor.image, anchor.x, anchor.y)
+            else:
+                self.watch.poll()  # anchor still hidden: the next poll sees an idle screen
+        else:
+            vision.history.clear()
+
+    def run(self):
+        vision, anchor = self.vision, self.anchor
+        if self.mode in ("full", "local"):
+            return [correct(vision.locate(anchor.path), anchor)]
+        if self.mode == "roi":
+            return [correct(vision.locate(anchor.path, roi=roi_around(self.backend, anchor), widen=False), anchor)]
+        if self.mode.startswith("multi"):
+            workers = int(self.mode.split("-")[1])
+            results = vision.find_all([a.path for a in self.anchors], workers=workers)
+            return [correct(results[a.path], a) for a in self.anchors]
+        match = self.watch.poll()
+        if self.mode == "wait-idle":
+            return [match is None]
+        return [correct(match, anchor)]
+
+    def finish(self):
+        if self.mode.startswith("wait"):
+            self.backend.draw_image(self.anchor.image, self.anchor.x, self.anchor.y)
+
+
+def measure(case, iterations, warmup=1):
+    for _ in range(warmup):
+        case.prepare()
+        case.run()
+        case.finish()
+    timings, checks = [], []
+    for _ in range(iterations):
+        case.prepare()
+        start = time.perf_counter()
+        checks += case.run()
+        timings.append(time.perf_counter() - start)
+        case.finish()
+
+    # Memory in a separate pass: tracemalloc (which also sees NumPy buffers) slows the timed runs
+    case.prepare()
+    tracemalloc.start()
+    case.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    case.finish()
+    return timings, checks, peak
+
+
+def run_screen(screen, sizes, modes, iterations, anchors_per_screen, captures, log):
+    results = []
+    for size in sizes:
+        for capture in captures:
+            if capture == "points" and screen.scale == 1:
+                continue
+            with tempfile.TemporaryDirectory() as directory:
+                backend = VirtualDesktopBackend(screen.width, screen.height, scale=screen.scale)
+                paint_desktop(backend, seed=size)
+                anchors = plant_anchors(backend, size, anchors_per_screen, directory, seed=size, capture=capture)
+                for mode in modes:
+                    vision = Vision(backend, assets=AssetStore(directory))
+                    case = Case(backend, vision, anchors, mode)
+                    timings, checks, peak = measure(case, iterations)
+                    ordered = sorted(timings)
+                    mean = sum(timings) / len(timings)
+                    result = {
+                        "case": f"{screen.name}/{size}pt/{capture}/{mode}",
+                        "screen": screen.name, "width": screen.width, "height": screen.height,
+                        "scale": screen.scale, "template_pt": size, "capture": capture, "mode": mode,
+                        "anchors": len(anchors), "iterations": iterations,
+                        "p50_ms": quantile(ordered, 0.5) * 1000, "p95_ms": quantile(ordered, 0.95) * 1000,
+                        "mean_ms": mean * 1000, "max_ms": ordered[-1] * 1000,
+                        "per_second": 1.0 / mean if mean else None,
+                        "mpix_per_second": case.searched_pixels() / mean / 1e6 if mean else None,
+                        "peak_mb": peak / 1e6,
+                        "correct": sum(checks), "checked": len(checks),
+                    }
+                    results.append(result)
+                    log(result)
+    return results
+
+
+def print_row(r):
+    print(f"{r['case']:<34}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['per_second']:>9.1f}"
+          f"{r['mpix_per_second']:>9.0f}{r['peak_mb']:>9.1f}   {r['correct']}/{r['checked']}")
+
+
+def compare(results, baseline, threshold):
+    """Cases that got slower than threshold x the baseline p50 or stopped finding the anchors."""
+    previous = {r["case"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get(r["case"])
+        if not old:
+            continue
+        ratio = r["p50_ms"] / old["p50_ms"] if old["p50_ms"] else 1.0
+        if ratio > threshold:
+            regressions.append(f"{r['case']}: p50 {old['p50_ms']:.2f}ms -> {r['p50_ms']:.2f}ms ({ratio:.2f}x)")
+        if r["correct"] < r["checked"] and old["correct"] == old["checked"]:
+            regressions.append(f"{r['case']}: {r['correct']}/{r['checked']} positions correct (baseline all)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark template search on synthetic screens.")
+    parser.add_argument("--screens", default=",".join(DEFAULT_SCREENS),
+                        help=f"comma separated, from: {', '.join(SCREENS)}")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="template sizes in points")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--anchors", type=int, default=8, help="anchors planted per screen")
+    parser.add_argument("--points", action="store_true",
+                        help="also test 1x-captured templates on Retina screens (scaled matching)")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed p50 slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    screens = [SCREENS[name] for name in args.screens.split(",")]
+    sizes = [int(s) for s in args.sizes.split(",")]
+    modes = args.modes.split(",")
+    captures = ("pixels", "points") if args.points else ("pixels",)
+
+    print(f"{'case':<34}{'p50 ms':>9}{'p95 ms':>9}{'ops/s':>9}{'Mpix/s':>9}{'peak MB':>9}   correct")
+    results = []
+    for screen in screens:
+        results += run_screen(screen, sizes, modes, args.iterations, args.anchors, captures, print_row)
+
+    report = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "numpy": np.__version__, "opencv": cv2.__version__, "machine": platform.machine(),
+                 "platform": platform.platform(), "iterations": args.iterations},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    failures = [f"{r['case']}: {r['correct']}/{r['checked']} positions correct"
+                for r in results if r["correct"] < r["checked"]]
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            failures = compare(results, json.load(f), args.threshold)
+        print("No regressions against baseline." if not failures else "Regressions:")
+    elif failures:
+        print("Wrong positions:")
+    for line in failures:
+        print(f"  {line}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,42 @@
 import os
 import time
-import subprocess
-import pyautogui
-import cv2
-import numpy as np
-from PIL import Image
+
+from lib.backends import make_backend
+from lib.window_registry import WindowRegistry
+from lib.assets import find_asset
+from lib.probes import StepRunner, wait_until
+from lib.text_injection import TextInjector
+from lib.macro import Macro
+from lib.tracing import span
 
 class AntigravityRPA:
-    def __init__(self, debug=True):
+    def __init__(self, debug=True, backend=None):
         self.debug = debug
-        # Default safety: mouse to top-left corner to abort
-        pyautogui.FAILSAFE = True
+        # Backend defaults to the real Mac desktop ($RPA_BACKEND=virtual for headless runs)
+        self.backend = backend or make_backend()
+        self.windows = WindowRegistry(self.backend)
+        self._vision = None
+        self.injector = TextInjector(self)
+        self.capture_service = None
+
+    @property
+    def vision(self):
+        """The image search stack (OpenCV, NumPy, templates), loaded on first use."""
+        if self._vision is None:
+            from lib.vision import Vision
+            self._vision = Vision(self.backend)
+        return self._vision
+
+    def has_asset(self, template):
+        """True if a template name or path exists (does not load the vision stack)."""
+        try:
+            if self._vision is not None:
+                self._vision.assets.resolve_path(template)
+            else:
+                find_asset(template)
+            return True
+        except FileNotFoundError:
+            return False
 
     def log(self, message):
         if self.debug:
@@ -19,99 +45,156 @@ class AntigravityRPA:
 
     def run_applescript(self, script):
         """Execute a raw AppleScript and return the result."""
-        process = subprocess.run(['osascript', '-e', script], capture_output=True, text=True)
-        if process.returncode != 0:
-            self.log(f"AppleScript Error: {process.stderr}")
-        return process.stdout.strip()
+        with span("run_applescript", chars=len(script)) as s:
+            output, error = self.backend.run_script(script)
+            if error:
+                s.fail(error)
+                self.log(f"AppleScript Error: {error}")
+        return output
 
     def activate_app(self, app_name):
         self.log(f"Activating app/process: {app_name}")
-        # More robust way to activate by process name using System Events
-        script = f'''
-        tell application "System Events"
-            if exists process "{app_name}" then
-                set frontmost of process "{app_name}" to true
-            end if
-        end tell
-        '''
-        return self.run_applescript(script)
+        activated = self.backend.activate_process(app_name)
+        if activated:
+            self.windows.note_focus(app_name)
+        return activated
 
     def activate_by_window_title(self, title_part):
+        """Bring the window whose title contains title_part to the front. Returns its process name."""
         self.log(f"Searching for window with title containing: {title_part}")
-        script = f'''
-        tell application "System Events"
-            set processList to every process whose background only is false
-            repeat with p in processList
-                set winList to every window of p
-                repeat with w in winList
-                    try
-                        if title of w contains "{title_part}" then
-                            set frontmost of p to true
-                            return name of p
-                        end if
-                    end try
-                end repeat
-            end repeat
-        end tell
-        '''
-        return self.run_applescript(script)
+        window = self.windows.resolve(title_part)
+        if window and not self.backend.activate_process(window.process):
+            # The cached process is gone; rescan once
+            self.windows.invalidate(title_part)
+            window = self.windows.resolve(title_part)
+            if window and not self.backend.activate_process(window.process):
+                window = None
+        if not window:
+            return ""
+        self.windows.note_focus(window.process)
+        return window.process
 
     def click_window_area(self, title_part, ratio_x=0.5, ratio_y=0.5):
         """Click at a relative position within a window. Default is center."""
         self.log(f"Clicking window '{title_part}' at ratio ({ratio_x}, {ratio_y})")
-        script = f'''
-        tell application "System Events"
-            set processList to every process whose background only is false
-            repeat with p in processList
-                set winList to every window of p
-                repeat with w in winList
-                    try
-                        if title of w contains "{title_part}" then
-                            set pos to position of w
-                            set sz to size of w
-                            set targetX to (item 1 of pos) + (item 1 of sz) * {ratio_x}
-                            set targetY to (item 2 of pos) + (item 2 of sz) * {ratio_y}
-                            return (targetX as string) & "," & (targetY as string)
-                        end if
-                    end try
-                end repeat
-            end repeat
-        end tell
-        return ""
-        '''
-        result = self.run_applescript(script)
-        if result and "," in result:
-            try:
-                parts = result.split(",")
-                x, y = float(parts[0]), float(parts[1])
-                self.click_at(int(x), int(y))
-                return True
-            except (ValueError, IndexError) as e:
-                self.log(f"Coordinate parsing error: {e} (Result was: '{result}')")
-        return False
+        window = self.windows.lookup(title_part)
+        cached = window is not None
+        if not cached:
+            window = self.windows.resolve(title_part)
+        if not window:
+            return False
+        x = window.x + window.width * ratio_x
+        y = window.y + window.height * ratio_y
+        self.click_at(int(x), int(y))
+        # A click from cached geometry must land on the expected process;
+        # otherwise the window moved, so rescan and click once more.
+        if cached and self.backend.frontmost_process() != window.process:
+            self.log("Click missed the cached window. Rescanning...")
+            self.windows.invalidate(title_part)
+            return self.click_window_area(title_part, ratio_x, ratio_y)
+        self.windows.note_focus(window.process)
+        return True
 
     def click_at(self, x, y, duration=0.2):
         self.log(f"Clicking at ({x}, {y})")
-        pyautogui.moveTo(x, y, duration=duration)
-        pyautogui.click()
+        with span("click_at", x=x, y=y):
+            self.backend.move_to(x, y, duration=duration)
+            self.backend.click()
 
-    def type_text(self, text, interval=0.05):
+    def type_text(self, text, interval=None):
+        """Type text key by key. With interval=None it is sent in chunks instead of one key per interval."""
         self.log(f"Typing text: {text[:20]}...")
-        pyautogui.write(text, interval=interval)
+        with span("type_text", chars=len(text)):
+            if interval is None:
+                self.injector.inject(text, mode="type")
+            else:
+                self.backend.write(text, interval=interval)
+
+    def inject_text(self, text, region=None, mode=None):
+        """
+        Enter text the fastest safe way: short ASCII is typed, anything else is
+        pasted via a verified clipboard that is restored afterwards.
+        region (screen box of the input) lets the paste wait until it rendered.
+        """
+        with span("inject_text", chars=len(text)) as s:
+            result = self.injector.inject(text, region=region, mode=mode)
+            s.set(mode=result.mode, verified=result.verified)
+            if not result.verified:
+                s.fail("clipboard not verified")
+        self.log(f"Injected {result.chars} chars by {result.mode} in {result.latency:.2f}s"
+                 + ("" if result.verified else " (clipboard not verified, nothing pasted)"))
+        return result
 
     def press_key(self, key):
         self.log(f"Pressing key: {key}")
-        pyautogui.press(key)
+        self.backend.press(key)
 
-    def find_image_on_screen(self, template_path, confidence=0.8):
-        """Finds a template image on the current screen and returns center (x, y)."""
+    def hotkey(self, *keys):
+        self.log(f"Pressing hotkey: {'+'.join(keys)}")
+        self.backend.hotkey(*keys)
+
+    def get_clipboard(self):
+        return self.backend.get_clipboard()
+
+    def set_clipboard(self, text):
+        self.backend.set_clipboard(text)
+
+    def wait_until(self, probe, timeout=5.0, interval=0.02, max_interval=0.25):
+        """Poll probe() until it holds; returns (value, latency, attempts) instead of sleeping a fixed time."""
+        return wait_until(probe, timeout, interval, max_interval)
+
+    def steps(self, log=None):
+        """A StepRunner whose steps wait on readiness probes and record their latency."""
+        return StepRunner(log=log or self.log)
+
+    def macro(self):
+        """Start recording a Macro; consecutive script-expressible steps run in one round trip."""
+        return Macro(self)
+
+    def window_region(self, title_part, roi=(0.0, 0.0, 1.0, 1.0)):
+        """Convert a window-relative (x, y, width, height) ratio box to screen coordinates."""
+        window = self.windows.resolve(title_part)
+        if not window:
+            return None
+        rx, ry, rw, rh = roi
+        return (window.x + window.width * rx, window.y + window.height * ry,
+                window.width * rw, window.height * rh)
+
+    def start_capture(self, interval=0.05, slots=4, name=None):
+        """
+        Capture the screen in the background into a shared-memory FrameRing that
+        image searches read from instead of taking a screenshot each time.
+        Returns the ring; other processes can FrameRing.attach(ring.name).
+        """
+        if self.capture_service is None:
+            from lib.frame_ring import CaptureService
+            self.capture_service = CaptureService(self.backend, interval, slots, name, log=self.log).start()
+            self.vision.frames = self.capture_service.ring
+            # A frame older than two capture intervals may predate the last action
+            self.vision.frame_max_age = interval * 2
+        return self.capture_service.ring
+
+    def stop_capture(self):
+        if self.capture_service is not None:
+            self.vision.frames = None
+            self.capture_service.stop()
+            self.capture_service = None
+
+    def locate_image(self, template_path, confidence=0.8, roi=None, window=None):
+        """
+        Finds a template (path or asset name) on screen and returns a Match (center, score, box, scale).
+        With window, roi is a ratio box inside that window; otherwise roi is in screen points.
+        """
         self.log(f"Searching for image: {template_path}")
         try:
-            # Using PyAutoGUI's built-in locate (which uses opencv/pilllow internally)
-            location = pyautogui.locateCenterOnScreen(template_path, confidence=confidence)
-            if location:
-                self.log(f"Found image at: {location}")
-                return location
+            if window:
+                roi = self.window_region(window, roi or (0.0, 0.0, 1.0, 1.0))
+            with span("find_image_on_screen", template=str(template_path)) as s:
+                match = self.vision.locate(template_path, confidence=confidence, roi=roi)
+                s.set(found=match is not None)
+            if match:
+                self.log(f"Found image at: {match.center} (score {match.score:.3f})")
+                return match
             else:
                 self.log("Image not found on screen.")
                 return None
@@ -119,15 +202,51 @@ class AntigravityRPA:
             self.log(f"Search error: {e}")
             return None
 
-    def wait_for_image(self, template_path, timeout=30, interval=1):
-        """Wait until an image appears on screen."""
+    def find_image_on_screen(self, template_path, confidence=0.8, roi=None, window=None):
+        """Finds a template image on the current screen and returns center (x, y)."""
+        match = self.locate_image(template_path, confidence=confidence, roi=roi, window=window)
+        return match.center if match else None
+
+    def find_all(self, templates, confidence=0.8, roi=None, window=None, workers=None):
+        """Matches several templates against a single screenshot. Returns {template: Match or None}."""
+        self.log(f"Searching for {len(templates)} images in one frame")
+        if window:
+            roi = self.window_region(window, roi or (0.0, 0.0, 1.0, 1.0))
+        with span("find_all", templates=len(templates)):
+            results = self.vision.find_all(templates, confidence=confidence, roi=roi, workers=workers)
+        for name, match in results.items():
+            if match:
+                self.log(f"  {name}: {match.center} (score {match.score:.3f})")
+        return results
+
+    def find_any(self, templates, confidence=0.8, roi=None, window=None, workers=None):
+        """Returns (template, Match) for the first of several templates visible in one screenshot."""
+        if window:
+            roi = self.window_region(window, roi or (0.0, 0.0, 1.0, 1.0))
+        name, match = self.vision.find_any(templates, confidence=confidence, roi=roi, workers=workers)
+        self.log(f"First visible image: {name}" if name else "None of the images are on screen.")
+        return name, match
+
+    def wait_for_image(self, template_path, timeout=30, interval=1, confidence=0.8, roi=None, window=None):
+        """
+        Wait until an image appears on screen.
+        Matching only runs when the screen (or ROI) changed; interval is the
+        longest pause between polls while nothing moves.
+        """
         self.log(f"Waiting for image: {template_path} (timeout: {timeout}s)")
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            location = self.find_image_on_screen(template_path)
-            if location:
-                return location
-            time.sleep(interval)
+        try:
+            if window:
+                roi = self.window_region(window, roi or (0.0, 0.0, 1.0, 1.0))
+            with span("wait_for_image", template=str(template_path)) as s:
+                match = self.vision.wait_for(template_path, timeout=timeout, confidence=confidence,
+                                             roi=roi, max_interval=interval)
+                s.set(found=match is not None)
+        except Exception as e:
+            self.log(f"Search error: {e}")
+            return None
+        if match:
+            self.log(f"Found image at: {match.center} (score {match.score:.3f})")
+            return match.center
         self.log("Wait timeout reached.")
         return None
 
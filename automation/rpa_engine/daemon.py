@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+daemon.py - 常駐 RPA デーモン (Unix ドメインソケット)
+
+AntigravityRPA を 1 つだけ起動したまま、ソケット経由でコマンドを受け付ける。
+ウィンドウのキャッシュ・テンプレート・常駐スクリプトホストが呼び出しをまたいで
+温まったままになり、トリガーごとに Python を起動・import し直す必要がない。
+- UI を使うコマンドはキューに積み、1 本のワーカースレッドが順番に実行する
+  (同時に来たトリガーがマウスやクリップボードを奪い合わない)。キューで待つうちに
+  呼び出し側がタイムアウトしたコマンドは、あとから実行しない
+- status / ping / shutdown はキューを待たずに即答する
+- --monitor で自動継続 (auto_continue_rpa) のループも同じプロセスで動かし、
+  その送信と画面状態の判定 (classify-state) も同じキューを通す
+  (rpa.vision に触るのはワーカースレッドだけ)。モニターが落ちたらログに残し、
+  status の monitor に表示する
+
+プロトコルは 1 行 1 JSON: {"cmd": "send-prompt", "args": {"text": "..."}}
+→ {"ok": true, "result": ..., "error": null, "queued": 0.0, "seconds": 0.4}
+
+    python3 automation/rpa_engine/daemon.py [--monitor]
+    python3 automation/rpa_engine/rpa_client.py send-prompt "続けてください"
+"""
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import argparse
+import threading
+import socketserver
+import traceback
+
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ENGINE_DIR)
+sys.path.append(os.path.join(ENGINE_DIR, "scenarios"))
+from core import AntigravityRPA
+from lib.antigravity import send_command
+from lib.checkpoint import read_checkpoint
+from lib.logger import get_logger
+from lib.tracing import TRACER
+from rpa_client import PROJECT_DIR, SOCKET_PATH, DaemonUnavailable, request
+
+LOG_FILE = os.path.join(PROJECT_DIR, "automation", "rpa_daemon_log.txt")
+CHECKPOINT_FILE = os.path.join(PROJECT_DIR, "automation", "checkpoint.md")
+TRACE_FILE = os.path.join(PROJECT_DIR, "automation", "rpa_trace.jsonl")
+MAX_QUEUE = 16  # pending UI commands before new ones are refused
+
+
+class DaemonError(Exception):
+    """A command failed in a way the client should see as an error message."""
+
+
+class Job:
+    def __init__(self, cmd, args):
+        self.cmd = cmd
+        self.args = args
+        self.created = time.monotonic()
+        self.started = None
+        self.cancelled = False  # the caller gave up before the worker picked it up
+        self.done = threading.Event()
+        self.response = None
+
+
+class RPADaemon:
+    def __init__(self, rpa=None, socket_path=SOCKET_PATH, log=None, max_queue=MAX_QUEUE):
+        self.rpa = rpa or AntigravityRPA(debug=False)
+        self.socket_path = socket_path
+        self.log = log or get_logger(LOG_FILE).log
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.started = time.time()
+        self.current = None
+        self.stats = {"served": 0, "failed": 0, "refused": 0}
+        self.server = None
+        self.monitor = None  # the --monitor thread, if any
+        self.monitor_error = None
+        self._stop = threading.Event()
+        self._claim = threading.Lock()  # a job is either cancelled or started, never both
+        self._states = None  # StateDetector for classify-state, loaded on first use
+        # UI commands, run one at a time on the worker thread
+        self.commands = {
+            "send-prompt": self.cmd_send_prompt,
+            "find-image": self.cmd_find_image,
+            "mission": self.cmd_mission,
+            "classify-state": self.cmd_classify_state,
+            "warm": self.cmd_warm,
+        }
+
+    # --- commands (worker thread) --------------------------------------------------
+
+    def cmd_send_prompt(self, text):
+        return {"sent": send_command(self.rpa, text, log=self.log)}
+
+    def cmd_find_image(self, template, confidence=0.8, window=None):
+        if not self.rpa.has_asset(template):
+            raise DaemonError(f"Template not found: {template}")
+        match = self.rpa.locate_image(template, confidence=confidence, window=window)
+        if not match:
+            return None
+        return {"center": match.center, "score": round(float(match.score), 4), "box": match.box}
+
+    def cmd_mission(self):
+        import master_auto_mission
+        report = master_auto_mission.main(self.rpa)
+        return {"dispatched": report.ok, "report": report.table()}
+
+    def cmd_classify_state(self):
+        """Classify the Antigravity window against the learned screen states (assets/states.json)."""
+        if self._states is None:
+            from lib.state_classifier import StateClassifier, StateDetector
+            classifier = StateClassifier.load()
+            if classifier is None:
+                raise DaemonError("No screen states learned yet (lib/state_classifier.py learn <state>)")
+            self._states = StateDetector(self.rpa, classifier)
+        return self._states.classify()._asdict()
+
+    def cmd_warm(self):
+        """Load the template cache and look up the Antigravity window ahead of the first real command."""
+        from lib.antigravity import WINDOW_TITLE
+        templates = len(self.rpa.vision.assets.names())
+        window = self.rpa.windows.resolve(WINDOW_TITLE)
+        return {"templates": templates, "window": bool(window)}
+
+    def status(self):
+        backend = self.rpa.backend
+        host = getattr(backend, "_host", None)
+        vision = self.rpa._vision
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 1),
+            "backend": backend.name,
+            "queue": self.jobs.qsize(),
+            "current": self.current,
+            "stats": dict(self.stats),
+            "windows": dict(self.rpa.windows.stats),
+            "templates": vision.assets.names() if vision else None,
+            "script_host": host.alive() if host else None,
+            "checkpoint": read_checkpoint(CHECKPOINT_FILE)["status"],
+            "monitor": None if self.monitor is None else {"alive": self.monitor.is_alive(),
+                                                          "error": self.monitor_error},
+        }
+
+    # --- queue ---------------------------------------------------------------------
+
+    def call(self, cmd, args=None, timeout=None):
+        """Queue a UI command and wait for its response dict (used by connections and --monitor)."""
+        if cmd == "status":
+            return {"ok": True, "result": self.status(), "error": None}
+        if cmd == "ping":
+            return {"ok": True, "result": {"pid": os.getpid()}, "error": None}
+        if cmd == "shutdown":
+            self.shutdown()
+            return {"ok": True, "result": {"pid": os.getpid()}, "error": None}
+        if cmd not in self.commands:
+            return {"ok": False, "result": None, "error": f"Unknown command: {cmd}"}
+        job = Job(cmd, args or {})
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            self.stats["refused"] += 1
+            return {"ok": False, "result": None, "error": f"Busy: {self.jobs.maxsize} commands already queued"}
+        if not job.done.wait(timeout):
+            with self._claim:
+                if job.started is None:
+                    # The caller falls back to running it itself: the worker must not run it too
+                    job.cancelled = True
+                    return {"ok": False, "result": None, "error": "Timed out waiting in the queue"}
+            # Already running: its UI action happens either way, so report how it went
+            job.done.wait()
+        return job.response
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._claim:
+                if job.cancelled:
+                    self.log(f"Command {job.cmd} skipped: its caller timed out in the queue")
+                    continue
+                job.started = time.monotonic()
+            self.current = job.cmd
+            try:
+                result = self.commands[job.cmd](**job.args)
+                job.response = {"ok": True, "result": result, "error": None}
+                self.stats["served"] += 1
+            except Exception as e:
+                job.response = {"ok": False, "result": None, "error": str(e) or type(e).__name__}
+                self.stats["failed"] += 1
+                self.log(f"Command {job.cmd} failed: {e}")
+            finally:
+                self.current = None
+            job.response["queued"] = round(job.started - job.created, 4)
+            job.response["seconds"] = round(time.monotonic() - job.started, 4)
+            job.done.set()
+            TRACER.export_jsonl(TRACE_FILE)
+
+    # --- socket --------------------------------------------------------------------
+
+    def _claim_socket(self):
+        """Remove a stale socket file; refuse to start if another daemon answers on it."""
+        if not os.path.exists(self.socket_path):
+            return
+        try:
+            request("ping", socket_path=self.socket_path, timeout=1.0)
+        except DaemonUnavailable:
+            os.unlink(self.socket_path)
+            return
+        raise DaemonError(f"Another daemon is already listening on {self.socket_path}")
+
+    def serve_forever(self, monitor=False):
+        self._claim_socket()
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        message = json.loads(line)
+                        response = daemon.call(message["cmd"], message.get("args"))
+                    except (ValueError, KeyError, TypeError) as e:
+                        response = {"ok": False, "result": None, "error": f"Bad request: {e}"}
+                    self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        threading.Thread(target=self._work, name="rpa-worker", daemon=True).start()
+        self.log(f"=== RPA daemon listening on {self.socket_path} (pid {os.getpid()}) ===")
+        self.jobs.put(Job("warm", {}))
+        if monitor:
+            self.monitor = threading.Thread(target=self._monitor, name="auto-continue", daemon=True)
+            self.monitor.start()
+        try:
+            self.server.serve_forever(poll_interval=0.5)
+        finally:
+            self.close()
+
+    def _monitor(self):
+        """
+        auto_continue_rpa's loop. Its sends and its screen-state captures go through
+        the same queue as socket commands, so only the worker thread uses rpa.vision.
+        """
+        try:
+            self._run_monitor()
+        except Exception as e:
+            # Keep the daemon serving, but say so in the log and in status
+            self.monitor_error = str(e) or type(e).__name__
+            self.log(f"Auto-continue monitor stopped: {self.monitor_error}\n{traceback.format_exc()}")
+
+    def _run_monitor(self):
+        import auto_continue_rpa
+
+        def send(rpa, text):
+            # The steps are logged to the daemon log; the monitor's own log gets the lines
+            # log_analytics counts as sends, as it does when auto_continue_rpa runs alone
+            auto_continue_rpa.log(f"Sending command: {text[:50]}...")
+            response = self.call("send-prompt", {"text": text})
+            sent = bool(response["ok"] and response["result"]["sent"])
+            if sent:
+                auto_continue_rpa.log(f"Command sent! (through the daemon, {response['seconds']:.2f}s)")
+            else:
+                auto_continue_rpa.log(f"Command not sent: {response['error'] or 'see rpa_daemon_log.txt'}")
+            return sent
+
+        def classify():
+            from lib.state_classifier import StateMatch
+            response = self.call("classify-state")
+            if not response["ok"]:
+                return StateMatch(None, None, {}, 0.0)
+            return StateMatch(**response["result"])
+        auto_continue_rpa.main(self.rpa, send=send, classify=classify)
+
+    def shutdown(self):
+        if self.server is not None:
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def close(self):
+        self._stop.set()
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.log("=== RPA daemon stopped ===")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resident Antigravity RPA daemon.")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--monitor", action="store_true", help="also run the auto-continue monitor")
+    args = parser.parse_args(argv)
+    daemon = RPADaemon(socket_path=args.socket)
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.shutdown())
+    try:
+        daemon.serve_forever(monitor=args.monitor)
+    except DaemonError as e:
+        print(e, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
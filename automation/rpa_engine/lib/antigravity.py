@@ -0,0 +1,56 @@
+"""
+antigravity.py - Antigravity のチャット欄へのコマンド送信 (シナリオ共通)
+
+master_auto_mission / auto_continue_rpa などで重複していた
+「ウィンドウを前面に → チャット欄をクリック → 貼り付け → 送信」をまとめたもの。
+各ステップは固定 sleep ではなく probe で確認してから進む。
+"""
+from lib.probes import focused, image_visible
+
+WINDOW_TITLE = "Antigravity"
+CHAT_POSITION = (0.9, 0.9)           # window ratio of the chat input to click
+INPUT_BOX_TEMPLATE = "chat_input"    # optional assets/chat_input.png; skipped if absent
+INPUT_AREA = (0.0, 0.75, 1.0, 0.25)  # window ratio box the pasted text shows up in
+
+
+def focus_chat(rpa, log=None, steps=None):
+    """Bring Antigravity to the front and click its chat input. Returns the process name ('' on failure)."""
+    log = log or rpa.log
+    steps = steps or rpa.steps(log=log)
+    process = rpa.activate_by_window_title(WINDOW_TITLE)
+    if not process or not steps.step("focus", probe=focused(rpa, process), timeout=3.0):
+        log("Failed to find Antigravity window.")
+        return ""
+    log("Focused Antigravity window.")
+    if not steps.step("click", lambda: rpa.click_window_area(WINDOW_TITLE, *CHAT_POSITION)):
+        log("Failed to click window.")
+        return ""
+    log("Clicked chat area.")
+    steps.step("input box", probe=image_visible(rpa, INPUT_BOX_TEMPLATE, window=WINDOW_TITLE),
+               timeout=3.0, required=False)
+    return process
+
+
+def send_command(rpa, text, log=None, process=None, steps=None):
+    """
+    Paste text into the Antigravity chat and submit it. Focuses the chat first
+    unless the caller already did (process given). Returns True when sent.
+    """
+    log = log or rpa.log
+    steps = steps or rpa.steps(log=log)
+    log(f"Sending command: {text[:50]}...")
+    process = process or focus_chat(rpa, log, steps)
+    if not process:
+        return False
+
+    # Verified paste (or typing for short ASCII); the user's clipboard is restored afterwards
+    input_area = rpa.window_region(WINDOW_TITLE, INPUT_AREA)
+    if not steps.step("inject", lambda: rpa.inject_text(text, region=input_area).verified):
+        log("Clipboard did not take the command.")
+        return False
+    submit = rpa.macro().activate(process).press("return").run()
+    if not submit.ok:
+        log(f"Failed to submit command: {submit.error}")
+        return False
+    log(f"Command sent! ({steps.summary()})")
+    return True
@@ -0,0 +1,110 @@
+"""
+assets.py - テンプレート画像キャッシュ
+
+assets/ 以下のアンカー画像を一度だけ読み込み、グレースケール・ピラミッド・
+正規化用の統計量 (平均・標準偏差) を前計算して保持する。
+- ファイルの mtime/サイズが変わったら読み直す
+- メモリ上限を超えたら最も使われていないものから捨てる (LRU)
+- "send_button" のように名前だけでも参照できる
+OpenCV は最初に画像を読み込むときに import する (find_asset だけなら不要)。
+"""
+import os
+from collections import OrderedDict
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class Template:
+    """A decoded anchor image plus everything the matcher derives from it."""
+
+    def __init__(self, name, path, gray, stamp):
+        import cv2
+        from lib.matcher import build_pyramid, pyramid_depth
+        self.name = name
+        self.path = path
+        self.gray = gray
+        self.stamp = stamp
+        mean, std = cv2.meanStdDev(gray)
+        self.mean, self.std = float(mean[0][0]), float(std[0][0])
+        # scale -> [level0, level1, ...]; the matcher adds other scales on first use
+        self.pyramids = {1.0: build_pyramid(gray, pyramid_depth(gray.shape))}
+
+    @property
+    def flat(self):
+        """Uniform images cannot be matched by normalized correlation."""
+        return self.std == 0.0
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for pyramid in self.pyramids.values() for level in pyramid)
+
+
+def find_asset(name_or_path, asset_dir=ASSET_DIR):
+    """Map 'send_button', 'send_button.png' or a path to an absolute file path."""
+    if os.path.exists(name_or_path):
+        return os.path.abspath(name_or_path)
+    candidate = os.path.join(asset_dir, name_or_path)
+    if os.path.exists(candidate):
+        return candidate
+    for ext in IMAGE_EXTENSIONS:
+        if os.path.exists(candidate + ext):
+            return candidate + ext
+    raise FileNotFoundError(f"Template not found: {name_or_path}")
+
+
+class AssetStore:
+    def __init__(self, asset_dir=ASSET_DIR, max_bytes=64 * 1024 * 1024, preload=True):
+        self.asset_dir = asset_dir
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "loads": 0, "reloads": 0, "evictions": 0}
+        self._entries = OrderedDict()
+        if preload:
+            self.preload()
+
+    def preload(self):
+        """Load every image in the asset directory."""
+        if not os.path.isdir(self.asset_dir):
+            return
+        for filename in sorted(os.listdir(self.asset_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                self.get(os.path.join(self.asset_dir, filename))
+
+    def resolve_path(self, name_or_path):
+        return find_asset(name_or_path, self.asset_dir)
+
+    def get(self, name_or_path):
+        """Return the Template for a name or path, (re)loading it if needed."""
+        path = self.resolve_path(name_or_path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        template = self._entries.get(path)
+        if template is not None and template.stamp == stamp:
+            self._entries.move_to_end(path)
+            self.stats["hits"] += 1
+            return template
+
+        import cv2
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise FileNotFoundError(f"Cannot read template: {path}")
+        self.stats["reloads" if template is not None else "loads"] += 1
+        name = os.path.splitext(os.path.basename(path))[0]
+        template = Template(name, path, gray, stamp)
+        self._entries[path] = template
+        self._entries.move_to_end(path)
+        self.evict()
+        return template
+
+    def evict(self):
+        """Drop least recently used templates until under max_bytes (keeps at least one)."""
+        while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    @property
+    def nbytes(self):
+        return sum(t.nbytes for t in self._entries.values())
+
+    def names(self):
+        return [t.name for t in self._entries.values()]
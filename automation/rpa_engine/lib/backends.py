@@ -0,0 +1,541 @@
+"""
+backends.py - 入出力バックエンド
+
+AntigravityRPA が画面・マウス・キーボード・クリップボード・ウィンドウを
+操作するための差し替え可能な層。
+- MacBackend: pyautogui + osascript による実機操作
+- VirtualDesktopBackend: ヘッドレス環境向けの決定的なインメモリ仮想デスクトップ
+
+環境変数 RPA_BACKEND (mac / virtual) で既定のバックエンドを切り替えられる。
+"""
+import os
+import re
+import sys
+import time
+import subprocess
+import tempfile
+from collections import namedtuple
+
+from lib.script_host import ScriptHost, ScriptHostError
+
+Window = namedtuple("Window", "process title x y width height")
+
+
+def quote_applescript(text):
+    """Escape a Python string for use inside an AppleScript string literal."""
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def unquote_applescript(text):
+    """Inverse of quote_applescript (also reads the \\n, \\r and \\t escapes AppleScript knows)."""
+    escapes = {"n": "\n", "r": "\r", "t": "\t"}
+    return re.sub(r"\\(.)", lambda m: escapes.get(m.group(1), m.group(1)), text, flags=re.S)
+
+
+class Backend:
+    """Interface every input/screen backend implements."""
+    name = "base"
+    # True when run_script executes real AppleScript (lets lib.macro batch steps)
+    supports_applescript = False
+
+    def screen_size(self):
+        """Logical screen size (points) as (width, height)."""
+        raise NotImplementedError
+
+    def scale_factor(self):
+        """Physical pixels per logical point (2.0 on Retina displays)."""
+        return 1.0
+
+    def screenshot(self, region=None):
+        """Capture the screen (or a logical (left, top, width, height) region) as an RGB array."""
+        raise NotImplementedError
+
+    def screenshot_into(self, out):
+        """Capture the full screen into a preallocated (height, width, 3) array (e.g. a frame ring slot)."""
+        out[...] = self.screenshot()
+
+    def move_to(self, x, y, duration=0.0):
+        raise NotImplementedError
+
+    def click(self, x=None, y=None):
+        raise NotImplementedError
+
+    def write(self, text, interval=0.0):
+        raise NotImplementedError
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        raise NotImplementedError
+
+    def get_clipboard(self):
+        raise NotImplementedError
+
+    def set_clipboard(self, text):
+        raise NotImplementedError
+
+    def list_windows(self):
+        """Return every visible window as a list of Window tuples."""
+        raise NotImplementedError
+
+    def find_window(self, title_part):
+        """Return the first window whose title contains title_part, or None."""
+        for window in self.list_windows():
+            if title_part in window.title:
+                return window
+        return None
+
+    def window_epoch(self):
+        """
+        Counter that changes whenever window focus or geometry changes, or None
+        when the backend cannot observe such changes (callers fall back to a TTL).
+        """
+        return None
+
+    def activate_process(self, process_name):
+        """Bring a process to the front. Returns True if it exists."""
+        raise NotImplementedError
+
+    def frontmost_process(self):
+        raise NotImplementedError
+
+    def run_script(self, script):
+        """Run an AppleScript. Returns (output, error) where error is None on success."""
+        raise NotImplementedError
+
+
+def _appkit_pasteboard():
+    """The general NSPasteboard via PyObjC, or None when PyObjC is not installed."""
+    try:
+        from AppKit import NSPasteboard
+    except ImportError:
+        return None
+    return NSPasteboard.generalPasteboard()
+
+
+def _load_pyautogui():
+    """
+    Import pyautogui without OpenCV: its screenshot helper (pyscreeze) imports
+    cv2 and NumPy when they are installed, which would put the whole vision
+    stack on the input path. The engine does its own matching, so pyscreeze's
+    OpenCV support is not needed.
+    """
+    if "pyautogui" in sys.modules or "cv2" in sys.modules:
+        import pyautogui
+        return pyautogui
+    sys.modules["cv2"] = None  # makes `import cv2` raise ImportError inside pyscreeze
+    try:
+        import pyautogui
+    finally:
+        if sys.modules.get("cv2", 0) is None:
+            del sys.modules["cv2"]
+    return pyautogui
+
+
+class MacBackend(Backend):
+    """
+    Real macOS desktop driven by pyautogui and osascript. The clipboard is
+    accessed in-process (PyObjC), else through the script host, else with
+    pbcopy/pbpaste.
+    """
+    name = "mac"
+    supports_applescript = True
+
+    def __init__(self, use_script_host=None):
+        self._pyautogui = None
+        self._scale = None
+        if use_script_host is None:
+            use_script_host = os.environ.get("RPA_SCRIPT_HOST", "1") != "0"
+        self._host = ScriptHost() if use_script_host else None
+        self._pasteboard = _appkit_pasteboard()
+
+    @property
+    def _gui(self):
+        """pyautogui, imported on the first mouse / keyboard action."""
+        if self._pyautogui is None:
+            pyautogui = _load_pyautogui()
+            # Default safety: mouse to top-left corner to abort
+            pyautogui.FAILSAFE = True
+            self._pyautogui = pyautogui
+        return self._pyautogui
+
+    @property
+    def clipboard_mode(self):
+        if self._pasteboard is not None:
+            return "appkit"
+        return "script-host" if self._host else "pbcopy"
+
+    def screen_size(self):
+        size = self._gui.size()
+        return (size[0], size[1])
+
+    def scale_factor(self):
+        if self._scale is None:
+            self._scale = self.screenshot().shape[1] / float(self.screen_size()[0])
+        return self._scale
+
+    def screenshot(self, region=None):
+        import numpy as np
+        from PIL import Image
+        # screencapture takes the region in points and returns physical pixels,
+        # which keeps Retina captures consistent with the full-screen case.
+        fd, path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            cmd = ["screencapture", "-x"]
+            if region:
+                left, top, width, height = region
+                cmd.append(f"-R{int(left)},{int(top)},{int(width)},{int(height)}")
+            subprocess.run(cmd + [path], check=True)
+            with Image.open(path) as image:
+                return np.asarray(image.convert("RGB"))
+        finally:
+            os.remove(path)
+
+    def move_to(self, x, y, duration=0.0):
+        self._gui.moveTo(x, y, duration=duration)
+
+    def click(self, x=None, y=None):
+        self._gui.click(x, y)
+
+    def write(self, text, interval=0.0):
+        self._gui.write(text, interval=interval)
+
+    def press(self, key):
+        self._gui.press(key)
+
+    def hotkey(self, *keys):
+        self._gui.hotkey(*keys)
+
+    def get_clipboard(self):
+        if self._pasteboard is not None:
+            from AppKit import NSPasteboardTypeString
+            return self._pasteboard.stringForType_(NSPasteboardTypeString) or ""
+        if self._host:
+            try:
+                return self._host.get_clipboard()
+            except ScriptHostError:
+                pass
+        return subprocess.run(['pbpaste'], capture_output=True).stdout.decode('utf-8', 'replace')
+
+    def set_clipboard(self, text):
+        if self._pasteboard is not None:
+            from AppKit import NSPasteboardTypeString
+            self._pasteboard.clearContents()
+            self._pasteboard.setString_forType_(text, NSPasteboardTypeString)
+            return
+        if self._host:
+            try:
+                self._host.set_clipboard(text)
+                return
+            except ScriptHostError:
+                pass
+        process = subprocess.Popen(['pbcopy'], stdin=subprocess.PIPE)
+        process.communicate(text.encode('utf-8'))
+
+    def list_windows(self):
+        script = '''
+        set out to ""
+        tell application "System Events"
+            set processList to every process whose background only is false
+            repeat with p in processList
+                set pName to name of p
+                repeat with w in (every window of p)
+                    try
+                        set pos to position of w
+                        set sz to size of w
+                        set out to out & pName & tab & (title of w) & tab & (item 1 of pos) & tab & (item 2 of pos) & tab & (item 1 of sz) & tab & (item 2 of sz) & linefeed
+                    end try
+                end repeat
+            end repeat
+        end tell
+        return out
+        '''
+        output, _ = self.run_script(script)
+        return [w for w in (_parse_window_line(line) for line in output.splitlines()) if w]
+
+    def find_window(self, title_part):
+        # Stops at the first match instead of listing every window.
+        script = f'''
+        tell application "System Events"
+            set processList to every process whose background only is false
+            repeat with p in processList
+                set winList to every window of p
+                repeat with w in winList
+                    try
+                        if title of w contains "{quote_applescript(title_part)}" then
+                            set pos to position of w
+                            set sz to size of w
+                            return (name of p) & tab & (title of w) & tab & (item 1 of pos) & tab & (item 2 of pos) & tab & (item 1 of sz) & tab & (item 2 of sz)
+                        end if
+                    end try
+                end repeat
+            end repeat
+        end tell
+        return ""
+        '''
+        output, _ = self.run_script(script)
+        return _parse_window_line(output)
+
+    def activate_process(self, process_name):
+        name = quote_applescript(process_name)
+        script = f'''
+        tell application "System Events"
+            if exists process "{name}" then
+                set frontmost of process "{name}" to true
+                return "true"
+            end if
+        end tell
+        return "false"
+        '''
+        output, _ = self.run_script(script)
+        return output == "true"
+
+    def frontmost_process(self):
+        output, _ = self.run_script(
+            'tell application "System Events" to get name of first process whose frontmost is true')
+        return output
+
+    def run_script(self, script):
+        if self._host:
+            try:
+                return self._host.run(script)
+            except ScriptHostError:
+                # Fall back to one osascript per call for the rest of the session
+                self._host = None
+        process = subprocess.run(['osascript', '-e', script], capture_output=True, text=True)
+        if process.returncode != 0:
+            return process.stdout.strip(), process.stderr.strip()
+        return process.stdout.strip(), None
+
+
+def _parse_window_line(line):
+    parts = line.strip("\n").split("\t")
+    if len(parts) != 6:
+        return None
+    try:
+        return Window(parts[0], parts[1], float(parts[2]), float(parts[3]),
+                      float(parts[4]), float(parts[5]))
+    except ValueError:
+        return None
+
+
+class VirtualWindow:
+    """A fake application window with a text input buffer."""
+
+    def __init__(self, process, title, x, y, width, height):
+        self.process = process
+        self.title = title
+        self.x, self.y, self.width, self.height = x, y, width, height
+        self.text = ""
+        self.submitted = []
+
+    def contains(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def as_window(self):
+        return Window(self.process, self.title, self.x, self.y, self.width, self.height)
+
+
+DEFAULT_LATENCIES = {
+    "screenshot": 0.0,
+    "mouse": 0.0,
+    "key": 0.0,
+    "clipboard": 0.0,
+    "window": 0.0,
+    "script": 0.0,
+}
+
+
+class VirtualDesktopBackend(Backend):
+    """
+    Deterministic in-memory desktop for headless tests and benchmarks.
+
+    Windows are plain objects, the screen is a NumPy framebuffer in physical
+    pixels, and every action costs a configurable latency (seconds). All
+    actions are appended to `events` so a run can be inspected afterwards.
+    """
+    name = "virtual"
+
+    def __init__(self, width=1440, height=900, scale=1, latencies=None,
+                 background=(32, 32, 32), sleep=time.sleep):
+        import numpy as np
+        self.width, self.height, self.scale = width, height, scale
+        self.framebuffer = np.empty((height * scale, width * scale, 3), dtype=np.uint8)
+        self.framebuffer[:] = background
+        self.latencies = dict(DEFAULT_LATENCIES, **(latencies or {}))
+        self.sleep = sleep
+        self.windows = []
+        self.front = None
+        self.mouse = (0, 0)
+        self.clipboard = ""
+        self.events = []
+        self.epoch = 0
+
+    # --- scene setup -------------------------------------------------------
+
+    def add_window(self, process, title, x, y, width, height, color=None):
+        window = VirtualWindow(process, title, x, y, width, height)
+        self.windows.append(window)
+        if color is not None:
+            self.fill_rect(x, y, width, height, color)
+        if self.front is None:
+            self.front = window
+        self.epoch += 1
+        return window
+
+    def move_window(self, window, x=None, y=None, width=None, height=None):
+        """Change a window's geometry (does not repaint the framebuffer)."""
+        window.x = window.x if x is None else x
+        window.y = window.y if y is None else y
+        window.width = window.width if width is None else width
+        window.height = window.height if height is None else height
+        self.epoch += 1
+
+    def fill_rect(self, x, y, width, height, color):
+        s = self.scale
+        self.framebuffer[int(y * s):int((y + height) * s), int(x * s):int((x + width) * s)] = color
+
+    def draw_input(self, window):
+        """Render the window's input buffer as a bar along its bottom edge (longer text, longer bar)."""
+        band = max(8, window.height // 12)
+        top = window.y + window.height - band
+        self.fill_rect(window.x, top, window.width, band, (48, 48, 48))
+        if window.text:
+            length = min(window.width - 8, 4 + 6 * len(window.text))
+            self.fill_rect(window.x + 4, top + 2, length, band - 4, (200, 200, 200))
+
+    def draw_image(self, image, x, y):
+        """Blit an RGB array (physical pixels) with its top-left at logical (x, y)."""
+        top, left = int(y * self.scale), int(x * self.scale)
+        h, w = image.shape[:2]
+        self.framebuffer[top:top + h, left:left + w] = image[..., :3]
+
+    # --- Backend interface -------------------------------------------------
+
+    def _spend(self, kind, detail=None):
+        self.events.append((kind, detail))
+        delay = self.latencies.get(kind, 0.0)
+        if delay:
+            self.sleep(delay)
+
+    def screen_size(self):
+        return (self.width, self.height)
+
+    def scale_factor(self):
+        return float(self.scale)
+
+    def screenshot(self, region=None):
+        self._spend("screenshot", region)
+        if not region:
+            return self.framebuffer.copy()
+        left, top, width, height = (int(v * self.scale) for v in region)
+        return self.framebuffer[top:top + height, left:left + width].copy()
+
+    def screenshot_into(self, out):
+        self._spend("screenshot", None)
+        out[...] = self.framebuffer
+
+    def move_to(self, x, y, duration=0.0):
+        self._spend("mouse", ("move", x, y))
+        self.mouse = (x, y)
+
+    def click(self, x=None, y=None):
+        if x is not None and y is not None:
+            self.mouse = (x, y)
+        self._spend("mouse", ("click",) + tuple(self.mouse))
+        for window in reversed(self.windows):
+            if window.contains(*self.mouse):
+                self._focus(window)
+                break
+
+    def write(self, text, interval=0.0):
+        self._spend("key", ("write", text))
+        if self.front:
+            self.front.text += text
+            self.draw_input(self.front)
+
+    def press(self, key):
+        self._spend("key", ("press", key))
+        if self.front and key in ("enter", "return"):
+            self.front.submitted.append(self.front.text)
+            self.front.text = ""
+            self.draw_input(self.front)
+
+    def hotkey(self, *keys):
+        self._spend("key", ("hotkey",) + keys)
+        if self.front and keys[-1] == "v" and ("command" in keys or "ctrl" in keys):
+            self.front.text += self.clipboard
+            self.draw_input(self.front)
+
+    def get_clipboard(self):
+        self._spend("clipboard", "get")
+        return self.clipboard
+
+    def set_clipboard(self, text):
+        self._spend("clipboard", "set")
+        self.clipboard = text
+
+    def list_windows(self):
+        self._spend("window", "list")
+        return [w.as_window() for w in self.windows]
+
+    def activate_process(self, process_name):
+        self._spend("window", ("activate", process_name))
+        for window in self.windows:
+            if window.process == process_name:
+                self._focus(window)
+                return True
+        return False
+
+    def _focus(self, window):
+        if window is not self.front:
+            self.front = window
+            self.epoch += 1
+
+    def window_epoch(self):
+        return self.epoch
+
+    def frontmost_process(self):
+        return self.front.process if self.front else ""
+
+    def run_script(self, script):
+        """Interpret the handful of System Events commands the scenarios use."""
+        self._spend("script", script)
+        # One statement per line; a string literal may span lines
+        for line in re.findall(r'(?:"(?:[^"\\]|\\.)*"|[^"\n])+', script, re.S):
+            line = line.strip()
+            match = re.match(r'set the clipboard to "((?:[^"\\]|\\.)*)"$', line, re.S)
+            if match:
+                self.clipboard = unquote_applescript(match.group(1))
+                continue
+            match = re.search(r'set frontmost of process "((?:[^"\\]|\\.)+)" to true', line)
+            if match:
+                self.activate_process(unquote_applescript(match.group(1)))
+                continue
+            match = re.search(r'keystroke "([^"\\]|\\.)" using \{?command down\}?', line)
+            if match:
+                self.hotkey("command", unquote_applescript(match.group(1)))
+                continue
+            if re.search(r'keystroke return|key code 36', line):
+                self.press("return")
+                continue
+            match = re.match(r'delay ([\d.]+)$', line)
+            if match:
+                self.sleep(float(match.group(1)))
+        return "", None
+
+
+BACKENDS = {
+    "mac": MacBackend,
+    "virtual": VirtualDesktopBackend,
+}
+
+
+def make_backend(name=None, **kwargs):
+    """Create a backend by name (defaults to $RPA_BACKEND, then 'mac')."""
+    name = name or os.environ.get("RPA_BACKEND", "mac")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown RPA backend: {name} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
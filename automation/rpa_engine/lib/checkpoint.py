@@ -0,0 +1,181 @@
+"""
+checkpoint.py - checkpoint.md の読み書きと状態遷移の監視
+
+CheckpointWatcher はファイルが実際に変わったときだけ解析し、
+状態が変わったら StatusEvent (例: RUNNING→WAITING) を返す。
+
+CheckpointStore は RPA 側の状態更新を status_journal に追記し、
+checkpoint.md (人間と monitor-app.js 用) をジャーナルから再生成して
+一時ファイル + rename で置き換える。
+"""
+import os
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from lib.file_watch import FileWatcher
+from lib.status_journal import StatusJournal, journal_path_for
+
+STATUS_PATTERN = re.compile(r'(\*\*状態\*\*:\s*)(\w+)')
+
+StatusEvent = namedtuple("StatusEvent", "previous status checkpoint")
+
+
+def parse_checkpoint(content):
+    """Extracts status, schedule and content from checkpoint markdown."""
+    result = {
+        "status": "IDLE",
+        "scheduled_time": None,
+        "scheduled_content": None,
+        "content": content
+    }
+
+    # Extract status
+    match = STATUS_PATTERN.search(content)
+    if match:
+        result["status"] = match.group(2).strip()
+
+    # Extract scheduled time: - **予定時刻**: 2026-01-18 00:01
+    time_match = re.search(r'\*\*予定時刻\*\*:\s*([\d\-]+ [\d:]+)', content)
+    if time_match:
+        try:
+            result["scheduled_time"] = datetime.strptime(time_match.group(1).strip(), "%Y-%m-%d %H:%M")
+        except ValueError:
+            pass
+
+    # Extract scheduled content: - **内容**: Day 5「ボム兵カウントするゲー」の開発開始
+    content_match = re.search(r'\*\*内容\*\*:\s*(.+)', content)
+    if content_match:
+        result["scheduled_content"] = content_match.group(1).strip()
+
+    return result
+
+
+def read_checkpoint(path):
+    """Reads and parses the checkpoint file (IDLE defaults if it does not exist)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return parse_checkpoint(f.read())
+    except FileNotFoundError:
+        return parse_checkpoint("")
+
+
+CHECKPOINT_TEMPLATE = """# Checkpoint - 自律開発ステータス
+
+## 現在のミッション
+- **タスク名**: {task_name}
+- **開始時刻**: {timestamp}
+
+## ステータス
+- **状態**: {status}
+
+## 進捗チェックリスト
+(AIが自動で記入)
+
+## 次のアクション
+(AIが自動で記入)
+
+## 最終更新
+{timestamp}
+"""
+
+
+def atomic_write(path, content):
+    """Write via a temporary file and rename so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def render_checkpoint(path, record):
+    """
+    Regenerates checkpoint.md from a journal record. The status and last-update
+    lines are rewritten; the agent's checklist and notes are kept.
+    """
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.time))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except FileNotFoundError:
+        content = CHECKPOINT_TEMPLATE.format(task_name=record.task, timestamp=timestamp, status=record.status)
+    content = STATUS_PATTERN.sub(lambda m: m.group(1) + record.status, content)
+    content = re.sub(r'(## 最終更新\n)[^\n#]*', lambda m: m.group(1) + timestamp, content)
+    atomic_write(path, content)
+
+
+class CheckpointStore:
+    """checkpoint.md plus its append-only status journal."""
+
+    def __init__(self, path):
+        self.path = path
+        self.journal = StatusJournal(journal_path_for(path))
+
+    def latest(self):
+        """Newest journaled state (reads only the journal tail)."""
+        return self.journal.latest()
+
+    def start_mission(self, task_name):
+        """Journal a new RUNNING mission and write a fresh checkpoint.md for it."""
+        record = self.journal.append("RUNNING", task=task_name)
+        self.journal.flush()
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.time))
+        atomic_write(self.path, CHECKPOINT_TEMPLATE.format(
+            task_name=task_name, timestamp=timestamp, status="RUNNING"))
+        return record
+
+    def set_status(self, status, source="rpa"):
+        """Journal a status change and regenerate checkpoint.md from it."""
+        record = self.journal.append(status, source=source)
+        self.journal.flush()
+        render_checkpoint(self.path, record)
+        return record
+
+    def observe(self, status):
+        """Journal a status the agent wrote into checkpoint.md (no-op if already current)."""
+        last = self.journal.latest()
+        if last and last.status == status:
+            return last
+        return self.journal.append(status, source="agent")
+
+    def close(self):
+        self.journal.close()
+
+
+class CheckpointWatcher:
+    """Re-parses checkpoint.md only when it changes and reports status transitions."""
+
+    def __init__(self, path, debounce=0.2, poll_interval=0.5):
+        self.path = path
+        self.watcher = FileWatcher(path, debounce=debounce, poll_interval=poll_interval)
+        self.checkpoint = read_checkpoint(path)
+
+    @property
+    def status(self):
+        return self.checkpoint["status"]
+
+    @property
+    def mode(self):
+        return self.watcher.mode
+
+    def next_event(self, timeout=None):
+        """
+        Wait for the next status transition. Returns a StatusEvent, or None if
+        timeout passes first. Edits that keep the status only refresh
+        self.checkpoint.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.watcher.wait(remaining):
+                return None
+            previous = self.status
+            self.checkpoint = read_checkpoint(self.path)
+            if self.status != previous:
+                return StatusEvent(previous, self.status, self.checkpoint)
+
+    def close(self):
+        self.watcher.close()
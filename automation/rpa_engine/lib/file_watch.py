@@ -0,0 +1,136 @@
+"""
+file_watch.py - ファイル変更の監視
+
+Linux では inotify (ctypes 経由) で親ディレクトリを監視し、それ以外の環境では
+mtime/サイズの stat ポーリングにフォールバックする。
+書き込みが落ち着くまで (debounce) 待ってから、実際に mtime/サイズが
+変わったときだけ「変更あり」とする。
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def file_stamp(path):
+    """(mtime_ns, size, inode) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class _Inotify:
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+
+    def read_names(self, timeout):
+        """Wait up to timeout for events; return the file names they concern (empty on timeout)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+        names, offset = [], 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            names.append(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    def __init__(self, path, debounce=0.2, poll_interval=0.5, max_settle=2.0, use_inotify=None):
+        self.path = os.path.abspath(path)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.max_settle = max_settle
+        self._name = os.path.basename(self.path)
+        self._last = file_stamp(self.path)   # last stamp reported as a change
+        self._seen = self._last              # last stamp observed while polling
+        self._inotify = None
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith("linux")
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(os.path.dirname(self.path))
+            except (OSError, AttributeError):
+                self._inotify = None
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify else "stat"
+
+    def _activity(self, timeout):
+        """True if something may have happened to the file within timeout seconds."""
+        if self._inotify:
+            deadline = time.monotonic() + timeout
+            while True:
+                if self._name in self._inotify.read_names(max(0.0, deadline - time.monotonic())):
+                    return True
+                if time.monotonic() >= deadline:
+                    return False
+        deadline = time.monotonic() + timeout
+        while True:
+            stamp = file_stamp(self.path)
+            if stamp != self._seen:
+                self._seen = stamp
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.poll_interval, remaining))
+
+    def wait(self, timeout=None):
+        """
+        Block until the file has changed and writes have settled for `debounce`
+        seconds. Returns True on a real change, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = 3600.0 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0 or not self._activity(remaining):
+                if deadline is not None:
+                    return False
+                continue
+            settle_until = time.monotonic() + self.max_settle
+            while time.monotonic() < settle_until and self._activity(self.debounce):
+                pass
+            stamp = file_stamp(self.path)
+            if stamp != self._last:
+                self._last = self._seen = stamp
+                return True
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
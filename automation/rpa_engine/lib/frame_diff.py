@@ -0,0 +1,42 @@
+"""
+frame_diff.py - タイル単位のフレーム差分
+
+前回のフレームを持っておき、タイルの高さごとの帯に分けて全行をそのまま
+(全幅・全チャンネル) 比べる。変わった帯の中で変わった列を探し、タイル境界に
+広げた範囲を dirty として報告する。生のキャプチャのまま比べるので
+グレースケール変換は要らず、静止した画面のポーリングは帯ごとのメモリ比較
+だけで済む。1 ピクセルの変化 (キャレットやプログレスバー) も見逃さない。
+"""
+import numpy as np
+
+
+class TileDiff:
+    def __init__(self, tile=64):
+        self.tile = tile
+        self._previous = None
+
+    def reset(self):
+        self._previous = None
+
+    def update(self, frame):
+        """
+        Compare a grayscale (or RGB) frame with the previous one and return the pixel
+        bounding box (left, top, right, bottom) of all tiles that changed, or None
+        when nothing changed. The first frame (or a resized one) is all dirty.
+        The frame is kept for the next call, so the caller must not modify it.
+        """
+        height, width = frame.shape[:2]
+        tile = self.tile
+        previous, self._previous = self._previous, frame
+        if previous is None or previous.shape != frame.shape:
+            return (0, 0, width, height)
+        rows, before = frame.reshape(height, -1), previous.reshape(height, -1)
+        dirty = [top for top in range(0, height, tile)
+                 if not np.array_equal(rows[top:top + tile], before[top:top + tile])]
+        if not dirty:
+            return None
+        top, bottom = dirty[0], min(height, dirty[-1] + tile)
+        changed = np.flatnonzero((rows[top:bottom] != before[top:bottom]).any(axis=0))
+        columns = changed // (rows.shape[1] // width)
+        return (int(columns[0]) // tile * tile, top,
+                min(width, (int(columns[-1]) // tile + 1) * tile), bottom)
@@ -0,0 +1,308 @@
+"""
+frame_ring.py - 共有メモリ上のフレームリングバッファ
+
+キャプチャを 1 か所 (CaptureService) に集め、事前確保した共有メモリの
+スロットに順番に書き込む。照合・差分・録画などの読み手は同じプロセスでも
+別プロセスでも FrameRing.attach(name) でつなぎ、コピーなしの読み取り専用
+NumPy ビューを (通し番号・タイムスタンプ付きで) 受け取る。
+
+- スロットごとに seqlock: 書き込み中は奇数、書き終わると 2 * 通し番号
+- ビューは書き手がそのスロットを再利用するまで (おおよそ slots - 1 フレームの間) 有効。
+  使い終わったら frame.valid() で上書きされていないことを確かめるか、
+  長く持つなら frame.copy() で取り出す
+- 作成したプロセスが close() すると共有メモリの名前を消す。ビューを持ったままの
+  読み手がいてもマッピングはそのまま使え、最後のビューが消えたときに解放される
+
+    service = CaptureService(backend, interval=0.05).start()
+    frame = service.ring.latest()
+    gray = to_gray(frame.image[top:bottom, left:right])
+    if not frame.valid():
+        ...  # 読んでいる間に上書きされた: 取り直す
+
+    # 別プロセス
+    ring = FrameRing.attach(service.ring.name)
+    for frame in ring.follow(): ...
+"""
+import time
+import threading
+import weakref
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAGIC = int.from_bytes(b"RPAFRAME", "little")
+HEADER_WORDS = 8          # magic, slots, height, width, channels, latest seq, reserved x2
+ALIGN = 64
+
+# Index of each header word
+_MAGIC, _SLOTS, _HEIGHT, _WIDTH, _CHANNELS, _LATEST = range(6)
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _layout(slots, shape):
+    """Byte offsets of the slot sequence words, timestamps and frame data, plus the total size."""
+    seqs = HEADER_WORDS * 8
+    stamps = seqs + 8 * slots
+    data = _aligned(stamps + 8 * slots)
+    frame_bytes = int(np.prod(shape))
+    return seqs, stamps, data, frame_bytes, data + frame_bytes * slots
+
+
+def _open_existing(name):
+    """Attach without letting this process's resource tracker unlink the segment at exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class Frame(namedtuple("Frame", "seq timestamp image ring slot")):
+    """A read-only view of one slot. seq counts frames from 1; timestamp is time.time() at capture."""
+
+    @property
+    def age(self):
+        return time.time() - self.timestamp
+
+    def valid(self):
+        """True while the writer has not started reusing this frame's slot."""
+        return int(self.ring._seqs[self.slot]) == 2 * self.seq
+
+    def copy(self):
+        """An owned copy of the image, or None if the slot was overwritten while copying."""
+        image = self.image.copy()
+        return image if self.valid() else None
+
+
+class _Mapped(np.ndarray):
+    """
+    An array over a SharedMemory that keeps it open. numpy points every view
+    and slice at this root, so the segment stays mapped while any is alive.
+    """
+
+
+class FrameRing:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self._name = shm.name
+        # Weak references to the arrays mapped over shm, see close()
+        self._roots = []
+        self._header = self._map((HEADER_WORDS,), np.uint64)
+        if int(self._header[_MAGIC]) != MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not a frame ring")
+        self.slots = int(self._header[_SLOTS])
+        self.shape = tuple(int(v) for v in self._header[[_HEIGHT, _WIDTH, _CHANNELS]])
+        seqs, stamps, data, frame_bytes, _ = _layout(self.slots, self.shape)
+        self._seqs = self._map((self.slots,), np.uint64, seqs)
+        self._stamps = self._map((self.slots,), np.float64, stamps)
+        self._data = self._map((self.slots,) + self.shape, np.uint8, data)
+        self._views = []
+        for slot in range(self.slots):
+            view = self._data[slot].view()
+            view.flags.writeable = False
+            self._views.append(view)
+        self.stats = {"written": 0, "torn_reads": 0}
+
+    def _map(self, shape, dtype, offset=0):
+        """An array over the shared memory that holds a reference to it."""
+        root = _Mapped(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+        root.shm = self.shm
+        self._roots.append(weakref.ref(root))
+        return root
+
+    @classmethod
+    def create(cls, shape, slots=4, name=None):
+        """Allocate a ring for frames of shape (height, width, channels) uint8."""
+        shape = tuple(shape) if len(shape) == 3 else tuple(shape) + (1,)
+        size = _layout(slots, shape)[-1]
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        header[:] = 0
+        header[_SLOTS], header[_HEIGHT], header[_WIDTH], header[_CHANNELS] = slots, *shape
+        header[_MAGIC] = MAGIC
+        seqs = _layout(slots, shape)[0]
+        np.ndarray((slots,), dtype=np.uint64, buffer=shm.buf, offset=seqs)[:] = 0
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Open a ring created by another process (or thread) as a reader."""
+        return cls(_open_existing(name), owner=False)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def latest_seq(self):
+        return int(self._header[_LATEST])
+
+    # --- writer ------------------------------------------------------------------
+
+    def _begin(self):
+        seq = self.latest_seq + 1
+        slot = (seq - 1) % self.slots
+        self._seqs[slot] = 2 * seq - 1  # odd: readers treat the slot as being written
+        return seq, slot
+
+    def _commit(self, seq, slot, timestamp):
+        self._stamps[slot] = time.time() if timestamp is None else timestamp
+        self._seqs[slot] = 2 * seq
+        self._header[_LATEST] = seq
+        self.stats["written"] += 1
+        return seq
+
+    def write(self, image, timestamp=None):
+        """Copy one frame into the next slot. Returns its sequence number."""
+        if image.shape[:2] != self.shape[:2]:
+            raise ValueError(f"Frame shape {image.shape} does not fit ring {self.shape}")
+        seq, slot = self._begin()
+        self._data[slot].reshape(image.shape)[...] = image
+        return self._commit(seq, slot, timestamp)
+
+    def fill(self, capture, timestamp=None):
+        """Let capture(out) write the next frame straight into its slot. Returns the sequence number."""
+        seq, slot = self._begin()
+        capture(self._data[slot])
+        return self._commit(seq, slot, timestamp)
+
+    # --- readers -----------------------------------------------------------------
+
+    def get(self, seq):
+        """Frame seq if it is still in the ring, else None."""
+        if seq < 1 or seq > self.latest_seq or seq <= self.latest_seq - self.slots:
+            return None
+        slot = (seq - 1) % self.slots
+        timestamp = float(self._stamps[slot])
+        if int(self._seqs[slot]) != 2 * seq:
+            self.stats["torn_reads"] += 1
+            return None
+        return Frame(seq, timestamp, self._views[slot], self, slot)
+
+    def latest(self, max_age=None):
+        """Most recent complete frame (None if there is none, or it is older than max_age seconds)."""
+        for _ in range(self.slots):
+            seq = self.latest_seq
+            if seq == 0:
+                return None
+            frame = self.get(seq)
+            if frame is not None:
+                return None if max_age is not None and frame.age > max_age else frame
+        return None
+
+    def wait_next(self, after_seq, timeout=1.0, interval=0.002):
+        """First complete frame newer than after_seq (skipping ahead if the reader fell behind)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            latest = self.latest_seq
+            if latest > after_seq:
+                frame = self.get(max(after_seq + 1, latest - self.slots + 2))
+                if frame is not None:
+                    return frame
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+
+    def follow(self, timeout=1.0, stop=None):
+        """Yield frames as they are published until no frame arrives within timeout (or stop is set)."""
+        seq = self.latest_seq - 1
+        while stop is None or not stop.is_set():
+            frame = self.wait_next(seq, timeout)
+            if frame is None:
+                return
+            seq = frame.seq
+            yield frame
+
+    def close(self):
+        """
+        Detach; the creating process also removes the shared memory's name. The
+        mapping is closed once no frame (or slice of one) handed out is still alive.
+        """
+        if self.shm is None:
+            return
+        shm, self.shm = self.shm, None
+        self._views = []
+        self._header = self._seqs = self._stamps = self._data = None
+        try:
+            if all(ref() is None for ref in self._roots):
+                shm.close()
+            # Otherwise the arrays still out there hold shm, and SharedMemory
+            # closes itself when the last of them is collected
+        finally:
+            # Unlinking only removes the name: mapped views stay valid
+            if self.owner:
+                try:
+                    shm.unlink()
+                except FileNotFoundError:
+                    pass
+
+
+class CaptureService:
+    """
+    Background thread that captures the screen every interval seconds into a
+    FrameRing. The ring is created on the first frame (its shape follows the
+    display); frames of another shape (resolution change) are counted and skipped.
+    """
+
+    def __init__(self, backend, interval=0.05, slots=4, name=None, log=None):
+        self.backend = backend
+        self.interval = interval
+        self.slots = slots
+        self.name = name
+        self.log = log or (lambda message: None)
+        self.ring = None
+        self.stats = {"frames": 0, "skipped": 0, "errors": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.capture_once()
+            self._thread = threading.Thread(target=self._run, name="frame-capture", daemon=True)
+            self._thread.start()
+        return self
+
+    def capture_once(self):
+        """Capture one frame now. Returns the new Frame (None if it was skipped)."""
+        if self.ring is None:
+            image = self.backend.screenshot()
+            self.ring = FrameRing.create(image.shape, self.slots, self.name)
+            self.log(f"Frame ring {self.ring.name}: {self.slots} x {image.shape[1]}x{image.shape[0]}")
+            seq = self.ring.write(image)
+        else:
+            try:
+                # The backend writes straight into the slot (no intermediate frame)
+                seq = self.ring.fill(self.backend.screenshot_into)
+            except ValueError:
+                # The display changed resolution; the half-written slot stays marked invalid
+                self.stats["skipped"] += 1
+                return None
+        self.stats["frames"] += 1
+        return self.ring.get(seq)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.capture_once()
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.log(f"Frame capture failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(1.0, self.interval * 4))
+            self._thread = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
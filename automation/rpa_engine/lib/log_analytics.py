@@ -0,0 +1,380 @@
+"""
+log_analytics.py - ミッションログの差分集計
+
+mission_log.txt と auto_continue_log.txt を前回読み終えたバイト位置から読み進め、
+ミッションごとのタイムライン (開始 → 送信 → RUNNING / WAITING の繰り返し → COMPLETE)
+を組み立てて、所要時間や WAITING の回数・応答時間のパーセンタイルを
+小さな JSON (automation/mission_stats.json) にまとめる。
+- 読み位置・途中のミッション・直近のタイムライン・集計用サンプルを同じファイルに保存するので、
+  1 回の実行のコストは新しく追記された行の数だけで決まる
+- ログがローテーションされていたら (inode が変わったら)、退避されたファイルの
+  読み残しを先に読んでから新しいファイルを先頭から読む
+- テキスト (.txt) と JSONL (.jsonl) のどちらのログも読める
+- 古い形式のメッセージ (--- MISSION START ---, Status: RUNNING - AI is working...) も解釈する
+
+    python3 lib/log_analytics.py              # 差分を取り込んで集計を表示
+    python3 lib/log_analytics.py --missions 5 # 直近 5 件のタイムラインも表示
+    python3 lib/log_analytics.py --rebuild    # 読み位置を捨てて最初から集計し直す
+"""
+import os
+import re
+import sys
+import json
+import glob
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.checkpoint import atomic_write
+from lib.tracing import quantile
+
+MISSION, MONITOR = "mission", "monitor"  # which script wrote a log
+QUANTILES = (0.5, 0.9, 0.99)
+MAX_MISSIONS = 100   # finished timelines kept in the state file
+MAX_SAMPLES = 1000   # values kept per metric for the percentiles
+MAX_TIMELINE = 200   # status changes kept per mission
+
+LOG_LINE = re.compile(r'^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (.*)$')
+STATUS_CHANGE = re.compile(r'^Status: (\w+) → (\w+)')
+STATUS_LEGACY = re.compile(r'^Status: (\w+) - ')
+
+# metric: what one sample measures
+METRICS = {
+    "mission_seconds": "start → COMPLETE",
+    "dispatch_seconds": "start → command sent",
+    "running_seconds": "time RUNNING per mission",
+    "waiting_seconds": "time WAITING per mission",
+    "waiting_cycles": "WAITING cycles per mission",
+    "wait_response_seconds": "WAITING detected → continue sent",
+}
+
+
+def default_sources(project_dir):
+    automation = os.path.join(project_dir, "automation")
+    return [(os.path.join(automation, "mission_log.txt"), MISSION),
+            (os.path.join(automation, "auto_continue_log.txt"), MONITOR)]
+
+
+def parse_line(line, jsonl=False):
+    """(unix time, message, fields) for one log line, or None for continuation lines and noise."""
+    if jsonl:
+        try:
+            record = json.loads(line)
+            ts, message = float(record["time"]), record["message"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        fields = {k: v for k, v in record.items() if k not in ("ts", "time", "level", "message")}
+        return ts, message, fields
+    match = LOG_LINE.match(line)
+    if not match:
+        return None
+    ts = time.mktime(time.strptime(match.group(1), "%Y-%m-%d %H:%M:%S"))
+    return ts, match.group(2).strip(), {}
+
+
+def classify(message, fields, role):
+    """(kind, value) for the messages the timelines are built from, else None."""
+    if message == "=== AUTONOMOUS MISSION START ===" or message.startswith("--- MISSION START"):
+        return "start", None
+    if message.startswith("Target: "):
+        return "target", message[len("Target: "):].strip()
+    if message in ("=== MISSION DISPATCHED ===", "--- MISSION COMPLETE ---"):
+        return "dispatched", None
+    if message.startswith("Mission not dispatched"):
+        return "failed", None
+    if "Triggering scheduled task:" in message:
+        return "scheduled", message.split("Triggering scheduled task:", 1)[1].strip()
+    if "status" in fields and "previous" in fields:
+        return "status", fields["status"]
+    match = STATUS_CHANGE.match(message) or STATUS_LEGACY.match(message)
+    if match:
+        return "status", match.groups()[-1]
+    if message.startswith("Detected WAITING status") or message.startswith("Screen is waiting for approval"):
+        return "waiting", None
+    if message.startswith("Mission COMPLETE detected"):
+        return "status", "COMPLETE"
+    if message.startswith("Max waiting time exceeded"):
+        return "gave_up", None
+    if role == MONITOR and (message.startswith("Command sent!") or message == "Continue command sent!"):
+        return "sent", None
+    return None
+
+
+def _new_state():
+    return {"version": 1, "sources": {}, "open": None, "missions": [],
+            "samples": {name: [] for name in METRICS},
+            "counts": {"lines": 0, "missions": 0, "complete": 0, "failed": 0, "abandoned": 0,
+                       "waiting_cycles": 0, "continues": 0, "gave_up": 0},
+            "summary": {}, "updated": None}
+
+
+class LogAnalytics:
+    """
+    Incremental reader plus timeline builder. update() reads only what was
+    appended since the offsets saved in state_path; save() writes the offsets,
+    the open mission and the percentile summary back.
+    """
+
+    def __init__(self, sources, state_path):
+        self.sources = list(sources)
+        self.state_path = state_path
+        self.state = self._load()
+        self.stats = {"lines": 0, "bytes": 0, "events": 0, "rotations": 0}
+
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return _new_state()
+        fresh = _new_state()
+        for key, value in fresh.items():
+            state.setdefault(key, value)
+        for name in METRICS:
+            state["samples"].setdefault(name, [])
+        return state
+
+    def save(self):
+        self.state["summary"] = self.summary()
+        self.state["updated"] = time.time()
+        atomic_write(self.state_path, json.dumps(self.state, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    # --- reading -------------------------------------------------------------------
+
+    def _read_from(self, path, offset):
+        """Complete lines of path after offset, and the offset after the last of them."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self.stats["bytes"] += end
+        return data[:end].decode("utf-8", "replace").splitlines(), offset + end
+
+    def _rotated(self, path, inode):
+        """The rotated-away copy of path that still has inode (auto_continue_log.2026-01-20.txt)."""
+        root, ext = os.path.splitext(path)
+        for candidate in glob.glob(f"{glob.escape(root)}.*{ext}"):
+            try:
+                if os.stat(candidate).st_ino == inode:
+                    return candidate
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _read_source(self, path):
+        """New lines of one log since its saved offset, following a rotation if there was one."""
+        saved = self.state["sources"].get(path, {"offset": 0, "inode": None})
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return []
+        lines, offset = [], saved["offset"]
+        if saved["inode"] is not None and (st.st_ino != saved["inode"] or st.st_size < offset):
+            self.stats["rotations"] += 1
+            rotated = self._rotated(path, saved["inode"]) if st.st_ino != saved["inode"] else None
+            if rotated:
+                lines, _ = self._read_from(rotated, offset)
+            offset = 0
+        new_lines, offset = self._read_from(path, offset)
+        self.state["sources"][path] = {"offset": offset, "inode": st.st_ino}
+        return lines + new_lines
+
+    def update(self):
+        """Fold the lines appended since the last run into the timelines. Returns the number of new lines."""
+        events = []
+        for order, (path, role) in enumerate(self.sources):
+            jsonl = path.endswith(".jsonl")
+            lines = self._read_source(path)
+            self.stats["lines"] += len(lines)
+            for line in lines:
+                parsed = parse_line(line, jsonl)
+                if parsed is None:
+                    continue
+                ts, message, fields = parsed
+                event = classify(message, fields, role)
+                if event:
+                    events.append((ts, order, event))
+        # Interleave the logs by time; on the same second the mission log comes first
+        events.sort(key=lambda e: (e[0], e[1]))
+        for ts, _, (kind, value) in events:
+            self.feed(ts, kind, value)
+        self.stats["events"] += len(events)
+        self.state["counts"]["lines"] += self.stats["lines"]
+        return self.stats["lines"]
+
+    # --- timelines -----------------------------------------------------------------
+
+    def _open(self, ts, source, task=None, dispatched=None):
+        self.state["open"] = {"task": task, "source": source, "start": ts, "dispatched": dispatched,
+                              "end": None, "outcome": None, "status": None, "since": ts,
+                              "time_in": {}, "waiting_cycles": 0, "continues": 0, "gave_up": 0,
+                              "wait_start": None, "answered": False, "timeline": [[ts, "start"]]}
+        self.state["counts"]["missions"] += 1
+        return self.state["open"]
+
+    def _sample(self, name, value):
+        samples = self.state["samples"][name]
+        samples.append(round(value, 3))
+        del samples[:-MAX_SAMPLES]
+
+    def _close(self, ts, outcome):
+        mission = self.state["open"]
+        if mission is None:
+            return
+        self.state["open"] = None
+        if mission["status"]:
+            time_in = mission["time_in"]
+            time_in[mission["status"]] = time_in.get(mission["status"], 0.0) + ts - mission["since"]
+        mission["end"], mission["outcome"] = ts, outcome
+        mission["timeline"].append([ts, outcome])
+        del mission["wait_start"], mission["answered"], mission["since"]
+        self.state["counts"][outcome] += 1
+        if mission["dispatched"] is not None and mission["source"] == MISSION:
+            self._sample("dispatch_seconds", mission["dispatched"] - mission["start"])
+        if outcome == "complete":
+            self._sample("mission_seconds", ts - mission["start"])
+            self._sample("running_seconds", mission["time_in"].get("RUNNING", 0.0))
+            self._sample("waiting_seconds", mission["time_in"].get("WAITING", 0.0))
+            self._sample("waiting_cycles", mission["waiting_cycles"])
+        missions = self.state["missions"]
+        missions.append(mission)
+        del missions[:-MAX_MISSIONS]
+
+    def _transition(self, ts, mission, status):
+        if mission["status"]:
+            time_in = mission["time_in"]
+            time_in[mission["status"]] = time_in.get(mission["status"], 0.0) + ts - mission["since"]
+        mission["status"], mission["since"] = status, ts
+        timeline = mission["timeline"]
+        timeline.append([ts, status])
+        if len(timeline) > MAX_TIMELINE:
+            del timeline[1:len(timeline) - MAX_TIMELINE + 1]  # keep the start marker
+        if status == "WAITING":
+            mission["waiting_cycles"] += 1
+            mission["wait_start"], mission["answered"] = ts, False
+            self.state["counts"]["waiting_cycles"] += 1
+
+    def feed(self, ts, kind, value=None):
+        """Apply one classified log event to the open mission."""
+        mission = self.state["open"]
+        if kind in ("start", "scheduled"):
+            if mission is not None:
+                self._close(ts, "abandoned" if mission["dispatched"] is not None else "failed")
+            if kind == "start":
+                self._open(ts, MISSION)
+            else:
+                self._open(ts, "schedule", task=value, dispatched=ts)
+            return
+        if kind == "status" and value in ("COMPLETE", "IDLE") and mission is None:
+            return
+        if mission is None:
+            if kind not in ("status", "waiting"):
+                return
+            # The monitor saw work that no mission log line announced
+            mission = self._open(ts, MONITOR)
+        if kind == "target":
+            mission["task"] = value
+        elif kind == "dispatched":
+            mission["dispatched"] = ts
+        elif kind == "failed":
+            self._close(ts, "failed")
+        elif kind == "status":
+            if value == "COMPLETE":
+                self._close(ts, "complete")
+            elif value != mission["status"]:
+                self._transition(ts, mission, value)
+        elif kind == "waiting":
+            # A new wait after the last one was answered is a new cycle even without a status line between
+            if mission["status"] != "WAITING" or mission["answered"]:
+                self._transition(ts, mission, "WAITING")
+        elif kind == "sent":
+            mission["continues"] += 1
+            self.state["counts"]["continues"] += 1
+            if mission["status"] == "WAITING" and not mission["answered"]:
+                self._sample("wait_response_seconds", ts - mission["wait_start"])
+                mission["answered"] = True
+        elif kind == "gave_up":
+            mission["gave_up"] += 1
+            self.state["counts"]["gave_up"] += 1
+
+    # --- summary -------------------------------------------------------------------
+
+    def summary(self):
+        """{metric: {"count", "mean", "max", 0.5, 0.9, 0.99}} over the kept samples."""
+        summary = {}
+        for name, values in self.state["samples"].items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            stats = {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 3), "max": ordered[-1]}
+            for q in QUANTILES:
+                stats[str(q)] = quantile(ordered, q)
+            summary[name] = stats
+        return summary
+
+
+def _duration(seconds):
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds:.1f}s"
+
+
+def report(analytics, missions=0):
+    """Text table of the percentiles plus the counts (and the last few timelines)."""
+    state = analytics.state
+    summary = analytics.summary()
+    lines = [f"{'metric':<24}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"]
+    for name, description in METRICS.items():
+        st = summary.get(name)
+        if not st:
+            continue
+        fmt = (lambda v: f"{v:>9.1f}") if name == "waiting_cycles" else (lambda v: f"{_duration(v):>9}")
+        lines.append(f"{name:<24}{st['count']:>7}" + "".join(fmt(st[str(q)]) for q in QUANTILES)
+                     + fmt(st["max"]) + f"   {description}")
+    counts = state["counts"]
+    lines.append("")
+    lines.append(", ".join(f"{key}: {value}" for key, value in counts.items()))
+    if state["open"]:
+        m = state["open"]
+        lines.append(f"open: {m['task'] or '(unknown task)'} {m['status'] or ('dispatched' if m['dispatched'] else 'started')} since "
+                     + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(m["since"])))
+    for m in state["missions"][-missions:] if missions else []:
+        start = time.strftime("%Y-%m-%d %H:%M", time.localtime(m["start"]))
+        lines.append(f"\n{start}  {m['task'] or '(unknown task)'}  [{m['outcome']}, {_duration(m['end'] - m['start'])}]")
+        previous = m["start"]
+        for ts, label in m["timeline"][1:]:
+            lines.append(f"  +{_duration(ts - previous):>7}  {label}")
+            previous = ts
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    project_dir = os.environ.get("ANTIGRAVITY_PROJECT_DIR", "/Users/moritak129/DailyAntigravity")
+    parser = argparse.ArgumentParser(description="Incrementally summarize the mission logs.")
+    parser.add_argument("--state", default=os.path.join(project_dir, "automation", "mission_stats.json"))
+    parser.add_argument("--log", action="append", metavar="PATH[:mission|monitor]",
+                        help="log to read (default: mission_log.txt and auto_continue_log.txt)")
+    parser.add_argument("--missions", type=int, default=0, help="also print the last N timelines")
+    parser.add_argument("--rebuild", action="store_true", help="forget the saved offsets and start over")
+    args = parser.parse_args(argv)
+
+    sources = default_sources(project_dir)
+    if args.log:
+        sources = [tuple(spec.rsplit(":", 1)) if spec.endswith((":" + MISSION, ":" + MONITOR)) else (spec, MONITOR)
+                   for spec in args.log]
+    if args.rebuild and os.path.exists(args.state):
+        os.remove(args.state)
+    start = time.perf_counter()
+    analytics = LogAnalytics(sources, args.state)
+    analytics.update()
+    analytics.save()
+    elapsed = time.perf_counter() - start
+    print(report(analytics, args.missions))
+    print(f"\nRead {analytics.stats['lines']} new lines ({analytics.stats['bytes']} bytes) in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
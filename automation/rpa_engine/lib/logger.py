@@ -0,0 +1,220 @@
+"""
+logger.py - シナリオ共通のログ出力
+
+1行ごとにファイルを開閉する代わりに、バックグラウンドの書き込みスレッドと
+上限付きキューでまとめて書き出す。
+- 同じメッセージの連続は 1 行にまとめ、「N 回繰り返し」を後から書く
+- サイズ超過または日付変更でローテーション (例: auto_continue_log.2026-01-20.txt)
+- 人間向けテキストの隣に JSONL 版 (auto_continue_log.jsonl) も出力
+- 終了時 (atexit) にキューを書き切ってから閉じる
+- キューが溢れた分は捨てて件数を記録し、次に書くときに 1 行残す
+
+    logger = get_logger(LOG_FILE)
+    logger.log("Command sent!", chars=42)
+"""
+import os
+import sys
+import json
+import glob
+import time
+import queue
+import atexit
+import threading
+
+_STOP = object()
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+class MissionLogger:
+    def __init__(self, path, jsonl=True, max_bytes=5 * 1024 * 1024, rotate_daily=True,
+                 backup_count=14, queue_size=1000, put_timeout=0.5, coalesce_window=60.0, echo=True):
+        self.path = path
+        self.jsonl_path = os.path.splitext(path)[0] + ".jsonl" if jsonl else None
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.backup_count = backup_count
+        self.coalesce_window = coalesce_window
+        self.echo = echo
+        self.put_timeout = put_timeout
+        self.dropped = 0
+        self._queue = queue.Queue(queue_size)
+        self._files = None
+        self._opened_day = None
+        self._last = None           # last message written
+        self._repeats = 0           # identical messages suppressed since then
+        self._repeat_start = None
+        self._error_reported = False
+        self._dropped_reported = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="mission-log-writer", daemon=True)
+        self._thread.start()
+
+    # --- caller side -------------------------------------------------------
+
+    def log(self, message, level="INFO", **fields):
+        """
+        Print a line and queue it for the log files. Only blocks (up to
+        put_timeout) when the writer has fallen queue_size lines behind;
+        after that the line is counted in self.dropped.
+        """
+        now = time.time()
+        line = f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))}] {message}"
+        if self.echo:
+            print(line)
+        if self._closed:
+            return line
+        try:
+            self._queue.put((now, str(message), level, fields), timeout=self.put_timeout)
+        except queue.Full:
+            self.dropped += 1
+        return line
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is on disk."""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # --- writer thread -----------------------------------------------------
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.coalesce_window)
+            except queue.Empty:
+                self._guard(self._write_repeats)
+                self._guard(self._flush_files)
+                continue
+            if item is _STOP:
+                self._guard(self._write_repeats)
+                self._guard(self._close_files)
+                return
+            if isinstance(item, threading.Event):
+                self._guard(self._write_repeats)
+                self._guard(self._flush_files)
+                item.set()
+                continue
+            self._guard(self._handle, *item)
+            if self._queue.empty():
+                self._guard(self._flush_files)
+
+    def _guard(self, fn, *args):
+        try:
+            fn(*args)
+        except OSError as e:
+            if not self._error_reported:
+                self._error_reported = True
+                print(f"[logger] Cannot write {self.path}: {e}", file=sys.stderr)
+
+    def _handle(self, ts, message, level, fields):
+        if self._last == (message, level) and not fields:
+            if self._repeats == 0:
+                self._repeat_start = ts
+            self._repeats += 1
+            if ts - self._repeat_start >= self.coalesce_window:
+                self._write_repeats(ts)
+            return
+        self._write_repeats(ts)
+        if self.dropped != self._dropped_reported:
+            count, self._dropped_reported = self.dropped - self._dropped_reported, self.dropped
+            self._write(ts, f"({count} log lines dropped: queue full)", "WARNING", {"dropped": count})
+        self._write(ts, message, level, fields)
+        self._last = (message, level)
+
+    def _write_repeats(self, ts=None):
+        if not self._repeats:
+            return
+        count, self._repeats = self._repeats, 0
+        self._write(ts or time.time(), f"(last message repeated {count} times)", self._last[1],
+                    {"repeat_of": self._last[0], "count": count})
+
+    def _write(self, ts, message, level, fields):
+        self._maybe_rotate(ts)
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+        text_file, json_file = self._files
+        text_file.write(f"[{stamp}] {message}\n")
+        if json_file:
+            record = {"ts": stamp, "time": round(ts, 3), "level": level, "message": message}
+            record.update(fields)
+            json_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    # --- files -------------------------------------------------------------
+
+    def _open_files(self, ts=None):
+        text_file = open(self.path, "a", encoding="utf-8")
+        json_file = open(self.jsonl_path, "a", encoding="utf-8") if self.jsonl_path else None
+        self._files = (text_file, json_file)
+        self._opened_day = time.strftime("%Y-%m-%d", time.localtime(ts))
+
+    def _flush_files(self):
+        if self._files:
+            for f in self._files:
+                if f:
+                    f.flush()
+
+    def _close_files(self):
+        if self._files:
+            for f in self._files:
+                if f:
+                    f.close()
+            self._files = None
+
+    def _maybe_rotate(self, ts):
+        if self._files is None:
+            if os.path.exists(self.path) and self._needs_rotation(ts, os.path.getmtime(self.path)):
+                # Name the archive after the day it was last written, not today
+                self._rotate(time.strftime("%Y-%m-%d", time.localtime(os.path.getmtime(self.path))))
+            self._open_files(ts)
+            return
+        day = time.strftime("%Y-%m-%d", time.localtime(ts))
+        if (self.rotate_daily and day != self._opened_day) or self._files[0].tell() >= self.max_bytes:
+            self._close_files()
+            self._rotate(self._opened_day)
+            self._open_files(ts)
+
+    def _needs_rotation(self, ts, mtime):
+        if os.path.getsize(self.path) >= self.max_bytes:
+            return True
+        day = time.strftime("%Y-%m-%d", time.localtime(ts))
+        return self.rotate_daily and time.strftime("%Y-%m-%d", time.localtime(mtime)) != day
+
+    def _rotate(self, day):
+        """Move the current files aside as <name>.<day>[.n]<ext>, day being the one they were written on."""
+        for path in filter(None, (self.path, self.jsonl_path)):
+            if not os.path.exists(path):
+                continue
+            root, ext = os.path.splitext(path)
+            target, n = f"{root}.{day}{ext}", 1
+            while os.path.exists(target):
+                n += 1
+                target = f"{root}.{day}.{n}{ext}"
+            os.replace(path, target)
+            backups = sorted(glob.glob(f"{glob.escape(root)}.????-??-??*{ext}"), key=os.path.getmtime)
+            for old in backups[:-self.backup_count] if self.backup_count else []:
+                os.remove(old)
+
+
+def get_logger(path, **kwargs):
+    """Return the shared logger for a file (created on first use)."""
+    path = os.path.abspath(path)
+    with _loggers_lock:
+        if path not in _loggers:
+            _loggers[path] = MissionLogger(path, **kwargs)
+        return _loggers[path]
+
+
+@atexit.register
+def _close_all():
+    for logger in list(_loggers.values()):
+        logger.close()
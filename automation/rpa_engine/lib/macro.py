@@ -0,0 +1,230 @@
+"""
+macro.py - 連続した UI 操作を 1 回の AppleScript 実行にまとめる
+
+    result = (rpa.macro()
+              .activate("Google Chrome")
+              .hotkey("command", "t")
+              .keystroke("http://localhost:3000")
+              .press("return")
+              .run())
+    if not result.ok:
+        rpa.log(result.error)   # 'step 2 hotkey command+t failed: ...'
+
+AppleScript で書ける操作 (前面化・キー入力・クリップボード・delay) が続く区間は、
+ステップごとに try とタイムスタンプを挟んだ 1 本のスクリプトにコンパイルして
+1 往復で実行する。クリックやウィンドウ検索など書けない操作はその場で
+Python から実行し、そこで区間が切れる。
+AppleScript を持たないバックエンド (virtual) では全ステップを 1 つずつ実行する。
+
+結果はステップごとの成否と所要時間を持ち、失敗したステップで止まる。
+"""
+import time
+from collections import namedtuple
+
+from lib.backends import quote_applescript
+from lib.probes import wait_until
+from lib.tracing import span
+
+KEY_CODES = {"return": 36, "enter": 76, "tab": 48, "space": 49, "delete": 51,
+             "escape": 53, "left": 123, "right": 124, "down": 125, "up": 126}
+MODIFIERS = {"command": "command down", "cmd": "command down", "shift": "shift down",
+             "option": "option down", "alt": "option down", "ctrl": "control down",
+             "control": "control down"}
+
+# script: AppleScript fragment (None = Python only); action: fallback / native callable;
+# after: bookkeeping to do in Python once a batched script step succeeded
+MacroStep = namedtuple("MacroStep", "name script action after")
+StepOutcome = namedtuple("StepOutcome", "index name ok seconds error")
+
+
+class MacroResult:
+    def __init__(self, outcomes, total, round_trips):
+        self.steps = outcomes
+        self.total = total
+        self.round_trips = round_trips
+        failed = next((s for s in outcomes if not s.ok), None)
+        self.ok = failed is None
+        self.failed_step = failed
+        self.error = None if failed is None else f"step {failed.index} {failed.name} failed: {failed.error}"
+
+    def summary(self):
+        return ", ".join(f"{s.name} {s.seconds:.2f}s" + ("" if s.ok else " FAILED") for s in self.steps)
+
+
+def _tell(command):
+    return f'tell application "System Events" to {command}'
+
+
+def _key_command(key, modifiers=()):
+    using = ""
+    if modifiers:
+        using = " using {" + ", ".join(MODIFIERS[m] for m in modifiers) + "}"
+    if key.lower() in KEY_CODES:
+        return f"key code {KEY_CODES[key.lower()]}{using}"
+    return f'keystroke "{quote_applescript(key)}"{using}'
+
+
+def compile_batch(steps, first_index=1):
+    """
+    One AppleScript for consecutive script steps. Each step runs in its own
+    try; the script returns one line per step: "OK<tab>index<tab>µs since
+    start" or "ERR<tab>index<tab>message" (and stops there).
+    """
+    lines = [
+        'use framework "Foundation"',
+        "use scripting additions",
+        'set _out to ""',
+        "set _t0 to current application's NSDate's timeIntervalSinceReferenceDate()",
+    ]
+    for offset, step in enumerate(steps):
+        index = first_index + offset
+        lines += [
+            "try",
+            step.script,
+            "on error _msg",
+            f'return _out & "ERR" & tab & "{index}" & tab & _msg',
+            "end try",
+            "set _dt to (current application's NSDate's timeIntervalSinceReferenceDate()) - _t0",
+            f'set _out to _out & "OK" & tab & "{index}" & tab & ((round (_dt * 1000000)) as integer as text) & linefeed',
+        ]
+    lines.append("return _out")
+    return "\n".join(lines)
+
+
+def parse_batch_output(output, error, steps, first_index):
+    """Turn a batch's marker lines into StepOutcomes (steps after a failure are omitted)."""
+    outcomes = []
+    previous_us = 0
+    for line in (output or "").splitlines():
+        parts = line.split("\t", 2)
+        if len(parts) < 3:
+            continue
+        status, index = parts[0], int(parts[1])
+        name = steps[index - first_index].name
+        if status == "OK":
+            elapsed_us = int(parts[2])
+            outcomes.append(StepOutcome(index, name, True, (elapsed_us - previous_us) / 1e6, None))
+            previous_us = elapsed_us
+        else:
+            outcomes.append(StepOutcome(index, name, False, 0.0, parts[2]))
+            return outcomes
+    if len(outcomes) < len(steps):
+        # The script itself failed (compile error, timeout): blame the first step without a marker
+        index = first_index + len(outcomes)
+        outcomes.append(StepOutcome(index, steps[index - first_index].name, False, 0.0,
+                                    error or "no result from script"))
+    return outcomes
+
+
+class Macro:
+    def __init__(self, rpa):
+        self.rpa = rpa
+        self.steps = []
+
+    def _add(self, name, script, action, after=None):
+        self.steps.append(MacroStep(name, script, action, after))
+        return self
+
+    # --- script-expressible steps --------------------------------------------
+
+    def activate(self, process):
+        name = quote_applescript(process)
+        return self._add(f"activate {process}",
+                         _tell(f'set frontmost of process "{name}" to true'),
+                         lambda: self.rpa.activate_app(process),
+                         after=lambda: self.rpa.windows.note_focus(process))
+
+    def keystroke(self, text):
+        return self._add(f"keystroke {text[:20]!r}",
+                         _tell(f'keystroke "{quote_applescript(text)}"'),
+                         lambda: self.rpa.backend.write(text))
+
+    def hotkey(self, *keys):
+        *modifiers, key = keys
+        return self._add(f"hotkey {'+'.join(keys)}",
+                         _tell(_key_command(key, modifiers)),
+                         lambda: self.rpa.backend.hotkey(*keys))
+
+    def press(self, key):
+        return self._add(f"press {key}", _tell(_key_command(key)),
+                         lambda: self.rpa.backend.press(key))
+
+    def paste(self):
+        return self.hotkey("command", "v")
+
+    def set_clipboard(self, text):
+        return self._add("set clipboard", f'set the clipboard to "{quote_applescript(text)}"',
+                         lambda: self.rpa.set_clipboard(text))
+
+    def delay(self, seconds):
+        return self._add(f"delay {seconds}", f"delay {seconds}", lambda: time.sleep(seconds))
+
+    # --- Python-only steps -----------------------------------------------------
+
+    def activate_window(self, title_part):
+        return self._add(f"activate window {title_part}", None,
+                         lambda: self.rpa.activate_by_window_title(title_part))
+
+    def click_window(self, title_part, ratio_x=0.5, ratio_y=0.5):
+        return self._add(f"click {title_part} ({ratio_x}, {ratio_y})", None,
+                         lambda: self.rpa.click_window_area(title_part, ratio_x, ratio_y))
+
+    def wait(self, name, probe, timeout=5.0):
+        return self._add(f"wait {name}", None, lambda: bool(wait_until(probe, timeout)[0]))
+
+    def call(self, name, fn):
+        """Any callable; a False / empty-string result counts as a failure."""
+        return self._add(name, None, fn)
+
+    # --- execution ---------------------------------------------------------------
+
+    def _runs(self, batch):
+        """Split steps into (first_index, [steps], batched?) runs."""
+        runs = []
+        for index, step in enumerate(self.steps, 1):
+            scripted = batch and step.script is not None
+            if runs and scripted and runs[-1][2]:
+                runs[-1][1].append(step)
+            else:
+                runs.append((index, [step], scripted))
+        return runs
+
+    def _run_action(self, index, step):
+        start = time.monotonic()
+        try:
+            value = step.action()
+            error = "returned no result" if value is False or value == "" else None
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        return StepOutcome(index, step.name, error is None, time.monotonic() - start, error)
+
+    def run(self):
+        """Execute the macro; stops at the first failing step. Returns a MacroResult."""
+        backend = self.rpa.backend
+        batch = getattr(backend, "supports_applescript", False)
+        outcomes, round_trips = [], 0
+        start = time.monotonic()
+        for first_index, steps, scripted in self._runs(batch):
+            if scripted:
+                round_trips += 1
+                with span("macro_batch", steps=len(steps)) as s:
+                    output, error = backend.run_script(compile_batch(steps, first_index))
+                    batch_outcomes = parse_batch_output(output, error, steps, first_index)
+                    if any(not o.ok for o in batch_outcomes):
+                        s.fail(batch_outcomes[-1].error)
+                for outcome in batch_outcomes:
+                    step = steps[outcome.index - first_index]
+                    if outcome.ok and step.after:
+                        step.after()
+            else:
+                batch_outcomes = [self._run_action(first_index + i, step) for i, step in enumerate(steps)]
+                round_trips += len(steps)
+            outcomes += batch_outcomes
+            if any(not o.ok for o in batch_outcomes):
+                break
+        result = MacroResult(outcomes, time.monotonic() - start, round_trips)
+        if result.ok:
+            self.rpa.log(f"Macro: {len(outcomes)} steps in {result.round_trips} round trips ({result.total:.2f}s)")
+        else:
+            self.rpa.log(f"Macro failed: {result.error}")
+        return result
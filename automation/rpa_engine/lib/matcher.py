@@ -0,0 +1,152 @@
+"""
+matcher.py - マルチスケール・テンプレートマッチング
+
+グレースケールのピラミッドで粗い解像度から候補を探し、解像度を上げながら
+候補の周囲だけを再探索する (coarse-to-fine)。信頼度が閾値を超えた時点で打ち切る。
+座標はすべてスクリーンショットの物理ピクセル単位。
+"""
+from collections import namedtuple
+
+import cv2
+
+# Raw hit in physical pixels of the searched image
+Hit = namedtuple("Hit", "left top width height score scale")
+
+MIN_TEMPLATE_SIDE = 8     # do not shrink templates below this many pixels
+MAX_LEVELS = 3            # deepest pyramid level (1/8 resolution)
+COARSE_SLACK = 0.15       # score allowance per level for downsampling blur
+MAX_CANDIDATES = 5        # coarse peaks refined per template and scale
+REFINE_MARGIN = 3         # search radius (pixels) around a projected peak
+
+
+def to_gray(image):
+    """Convert an RGB(A) or already-gray array to a uint8 grayscale image."""
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+
+def pyramid_depth(shape, max_levels=MAX_LEVELS):
+    """How many times a template of this shape can be halved and stay usable."""
+    h, w = shape[:2]
+    levels = 0
+    while levels < max_levels and min(h, w) // 2 >= MIN_TEMPLATE_SIDE:
+        h, w = h // 2, w // 2
+        levels += 1
+    return levels
+
+
+def build_pyramid(gray, levels):
+    """Return [gray, gray/2, gray/4, ...] with levels + 1 entries."""
+    pyramid = [gray]
+    extend_pyramid(pyramid, levels)
+    return pyramid
+
+
+def extend_pyramid(pyramid, levels):
+    """Grow an existing pyramid in place so it has at least levels + 1 entries."""
+    while len(pyramid) <= levels:
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def scale_template(gray, scale):
+    if scale == 1.0:
+        return gray
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+def _peaks(result, threshold, count, width, height):
+    """Best `count` locations above threshold, suppressing overlapping neighbours."""
+    result = result.copy()
+    peaks = []
+    for _ in range(count):
+        _, score, _, (x, y) = cv2.minMaxLoc(result)
+        if score < threshold:
+            break
+        peaks.append((x, y, score))
+        result[max(0, y - height // 2):y + height // 2 + 1,
+               max(0, x - width // 2):x + width // 2 + 1] = -1.0
+    return peaks
+
+
+def _refine(screen, template, x, y, margin=REFINE_MARGIN):
+    """Re-match a template in a small window around (x, y)."""
+    th, tw = template.shape
+    left, top = max(0, x - margin), max(0, y - margin)
+    right = min(screen.shape[1], x + tw + margin)
+    bottom = min(screen.shape[0], y + th + margin)
+    if bottom - top < th or right - left < tw:
+        return None
+    result = cv2.matchTemplate(screen[top:bottom, left:right], template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, (dx, dy) = cv2.minMaxLoc(result)
+    return left + dx, top + dy, score
+
+
+def coarse_to_fine(screen_pyramid, template_pyramid, confidence):
+    """
+    Match template_pyramid[-1] against the matching screen level, then follow
+    the strongest peaks down to full resolution. Returns (x, y, score) at
+    level 0 for the best candidate, stopping at the first one >= confidence.
+    """
+    level = len(template_pyramid) - 1
+    screen, template = screen_pyramid[level], template_pyramid[level]
+    if screen.shape[0] < template.shape[0] or screen.shape[1] < template.shape[1]:
+        return None
+    result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+    if level == 0:
+        _, score, _, (x, y) = cv2.minMaxLoc(result)
+        return x, y, score
+
+    threshold = max(0.0, confidence - COARSE_SLACK * level)
+    th, tw = template.shape
+    best = None
+    for x, y, score in _peaks(result, threshold, MAX_CANDIDATES, tw, th):
+        for refine_level in range(level - 1, -1, -1):
+            refined = _refine(screen_pyramid[refine_level], template_pyramid[refine_level], x * 2, y * 2)
+            if refined is None:
+                break
+            x, y, score = refined
+        else:
+            if best is None or score > best[2]:
+                best = (x, y, score)
+            if score >= confidence:
+                break
+    return best
+
+
+def find_template(screen_pyramid, template_gray, confidence=0.8, scales=(1.0,),
+                  max_levels=MAX_LEVELS, template_pyramids=None):
+    """
+    Search for a grayscale template at each scale in turn (most likely first).
+
+    screen_pyramid is a list starting with the full-resolution grayscale screen;
+    it is extended in place so several templates can share it. Template
+    pyramids are taken from (and added to) template_pyramids when given.
+    Returns the best Hit found (which may be below confidence) or None.
+    """
+    best = None
+    screen = screen_pyramid[0]
+    for scale in scales:
+        pyramid = template_pyramids.get(scale) if template_pyramids is not None else None
+        if pyramid is None:
+            template = scale_template(template_gray, scale)
+            pyramid = build_pyramid(template, pyramid_depth(template.shape, max_levels))
+            if template_pyramids is not None:
+                template_pyramids[scale] = pyramid
+        th, tw = pyramid[0].shape
+        if th > screen.shape[0] or tw > screen.shape[1]:
+            continue
+        extend_pyramid(screen_pyramid, len(pyramid) - 1)
+        found = coarse_to_fine(screen_pyramid, pyramid, confidence)
+        if found is None:
+            continue
+        x, y, score = found
+        if best is None or score > best.score:
+            best = Hit(x, y, tw, th, float(score), scale)
+        if best.score >= confidence:
+            break
+    return best
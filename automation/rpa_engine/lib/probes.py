@@ -0,0 +1,119 @@
+"""
+probes.py - 固定 sleep の代わりに「準備できたか」を確かめて進むステップ
+
+各ステップは操作 (action) のあとに probe を短い間隔でポーリングし、
+条件が成り立った時点ですぐ次へ進む。タイムアウトはステップごとに指定でき、
+実際に待った時間 (latency) を StepResult として記録する。
+
+    steps = rpa.steps()
+    steps.step("focus", lambda: rpa.activate_by_window_title("Antigravity"),
+               probe=focused(rpa, "Electron"), timeout=3)
+    steps.step("clipboard", lambda: rpa.set_clipboard(text), probe=clipboard_is(rpa, text))
+    steps.summary()  # "focus 0.04s, clipboard 0.01s"
+
+probe は真偽値 (または見つかった値) を返す関数。None を渡すと確認なしで進む。
+"""
+import time
+from collections import namedtuple
+
+from lib.tracing import TRACER
+
+# latency: seconds from the end of the action until the probe held (or the timeout)
+StepResult = namedtuple("StepResult", "name ok latency attempts value")
+
+
+def wait_until(probe, timeout=5.0, interval=0.02, max_interval=0.25,
+               sleep=time.sleep, clock=time.monotonic):
+    """
+    Poll probe() until it returns something truthy. The pause starts at
+    interval and grows to max_interval. Returns (value, latency, attempts);
+    value is falsy on timeout.
+    """
+    start = clock()
+    attempts = 0
+    pause = interval
+    while True:
+        attempts += 1
+        value = probe()
+        elapsed = clock() - start
+        if value or elapsed >= timeout:
+            return value, elapsed, attempts
+        sleep(min(pause, timeout - elapsed))
+        pause = min(max_interval, pause * 1.5)
+
+
+# --- probes ------------------------------------------------------------------
+
+def focused(rpa, process):
+    """The given process is frontmost."""
+    return lambda: rpa.backend.frontmost_process() == process
+
+
+def clipboard_is(rpa, text):
+    """The clipboard holds exactly text."""
+    return lambda: rpa.get_clipboard() == text
+
+
+def image_visible(rpa, template, window=None, roi=None, confidence=0.8):
+    """
+    The template is on screen (inside window / roi if given). Returns None,
+    meaning "nothing to check", when no such asset exists.
+    """
+    if not rpa.has_asset(template):
+        return None
+
+    def probe():
+        region = rpa.window_region(window, roi or (0.0, 0.0, 1.0, 1.0)) if window else roi
+        return rpa.vision.locate(template, confidence=confidence, roi=region)
+    return probe
+
+
+def screen_changed(rpa, region=None):
+    """
+    The screen (or a logical region) differs from how it looked when the probe
+    was created, e.g. pasted text showing up in the input box.
+    """
+    from lib.frame_diff import TileDiff
+    # Raw RGB frames are compared as they are: no OpenCV needed for a text-only mission
+    diff = TileDiff(tile=32)
+    diff.update(rpa.backend.screenshot(region))
+    return lambda: diff.update(rpa.backend.screenshot(region)) is not None
+
+
+# --- step runner ---------------------------------------------------------------
+
+class StepRunner:
+    def __init__(self, log=None, sleep=time.sleep, clock=time.monotonic):
+        self.log = log or (lambda message: None)
+        self.sleep = sleep
+        self.clock = clock
+        self.results = []
+
+    def step(self, name, action=None, probe=None, timeout=5.0, required=True,
+             interval=0.02, max_interval=0.25):
+        """
+        Run action, then wait until probe holds. Returns the probe's value
+        (True when there is no probe), or a falsy value on timeout. A required
+        step that times out is logged as a failure; an optional one as a warning.
+        """
+        result = action() if action is not None else None
+        if probe is None:
+            # Nothing to wait for: the action's own result (if any) decides
+            value, latency, attempts = (True if result is None else result), 0.0, 0
+        else:
+            value, latency, attempts = wait_until(probe, timeout, interval, max_interval,
+                                                  sleep=self.sleep, clock=self.clock)
+            TRACER.record(f"wait:{name}", latency, bool(value), attempts=attempts)
+        self.results.append(StepResult(name, bool(value), latency, attempts, value))
+        if not value:
+            level = "failed" if required else "not confirmed, continuing"
+            self.log(f"Step '{name}' {level} after {latency:.2f}s")
+        return value
+
+    def summary(self):
+        return ", ".join(f"{r.name} {r.latency:.2f}s" + ("" if r.ok else " (timeout)")
+                         for r in self.results)
+
+    @property
+    def total_latency(self):
+        return sum(r.latency for r in self.results)
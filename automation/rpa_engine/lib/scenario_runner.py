@@ -0,0 +1,224 @@
+"""
+scenario_runner.py - 依存関係つきステップ定義からシナリオを実行する
+
+シナリオを「ステップとその依存 (needs)」の一覧として書くと、依存が揃った
+ステップから順に実行する。
+- 互いに依存しないステップ (タスク読み込み・checkpoint 初期化・ウィンドウ解決など)
+  はスレッドプールで並行に走る
+- ui=True のステップはマウス・キーボードを使うので共通のロックで 1 つずつ実行する
+- ステップごとにリトライ回数とタイムアウト (実行可能になった時点から数える) を指定できる。
+  スレッドは止められないので、タイムアウトしたステップはそれ以上リトライせず、
+  run() は終わる前にそのスレッドを (もう 1 タイムアウト分まで) 待つ。遅れて
+  成功したものは late、まだ動いているものは timeout として報告する
+  (UI のロックは実際に終わるまで手放されない)
+- 失敗したステップに依存するステップは実行せず skipped になる
+- 終了後にステップごとの開始時刻・所要時間・試行回数のレポートを返す
+
+定義は dict のリスト (または同じ形の JSON ファイル)。run は呼び出し可能か
+"module:function" 形式の文字列で、ctx (共有 dict) を受け取り、戻り値が
+ctx[name] に入る。失敗させたいときは StepFailed を投げる。
+
+    SCENARIO = [
+        {"name": "task", "run": claim_task},
+        {"name": "window", "run": resolve_window},
+        {"name": "checkpoint", "run": init_checkpoint, "needs": ["task"]},
+        {"name": "send", "run": send, "needs": ["task", "window", "checkpoint"],
+         "ui": True, "retries": 1, "timeout": 20},
+    ]
+    report = ScenarioRunner(SCENARIO, log=log).run({"rpa": rpa})
+"""
+import json
+import time
+import contextlib
+import importlib
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from lib.tracing import span
+
+# Shared by every runner in the process: only one UI step drives the desktop at a time
+UI_LOCK = threading.Lock()
+
+# status: ok / failed / skipped / timeout (still running) / late (succeeded after its timeout)
+StepOutcome = namedtuple("StepOutcome", "name status attempts started seconds error")
+
+
+class StepFailed(Exception):
+    """Raised by a step to fail without a traceback-worthy error."""
+
+
+class Step:
+    def __init__(self, name, run, needs=(), ui=False, retries=0, timeout=None, retry_delay=0.5):
+        self.name = name
+        self.run = _resolve(run)
+        self.needs = tuple(needs)
+        self.ui = ui
+        self.retries = retries
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+
+    @classmethod
+    def from_definition(cls, definition):
+        if isinstance(definition, Step):
+            return definition
+        return cls(**definition)
+
+
+def _resolve(run):
+    if callable(run):
+        return run
+    module_name, _, attr = run.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def load_definition(definition):
+    """Steps from a list of dicts / Steps or from a JSON file with such a list."""
+    if isinstance(definition, str):
+        with open(definition, "r", encoding="utf-8") as f:
+            definition = json.load(f)
+    steps = [Step.from_definition(d) for d in definition]
+    names = [s.name for s in steps]
+    if len(set(names)) != len(names):
+        raise ValueError("Duplicate step names in scenario")
+    for step in steps:
+        missing = [n for n in step.needs if n not in names]
+        if missing:
+            raise ValueError(f"Step '{step.name}' needs unknown step(s): {', '.join(missing)}")
+    _check_acyclic(steps)
+    return steps
+
+
+def _check_acyclic(steps):
+    needs = {s.name: set(s.needs) for s in steps}
+    done = set()
+    while needs:
+        ready = [name for name, deps in needs.items() if deps <= done]
+        if not ready:
+            raise ValueError(f"Dependency cycle among: {', '.join(sorted(needs))}")
+        for name in ready:
+            done.add(name)
+            del needs[name]
+
+
+class ScenarioReport:
+    def __init__(self, results, context, total):
+        self.results = results
+        self.context = context
+        self.total = total
+        self.ok = all(r.status == "ok" for r in results.values())
+
+    def failed(self):
+        return [r for r in self.results.values() if r.status in ("failed", "timeout")]
+
+    def table(self):
+        """Per-step timing report, in start order."""
+        lines = [f"{'step':<16}{'status':<9}{'start':>8}{'time':>8}  tries"]
+        for r in sorted(self.results.values(), key=lambda r: (r.started is None, r.started or 0)):
+            start = "-" if r.started is None else f"{r.started:.2f}s"
+            lines.append(f"{r.name:<16}{r.status:<9}{start:>8}{r.seconds:>7.2f}s  {r.attempts}"
+                         + (f"  {r.error}" if r.error else ""))
+        lines.append(f"total {self.total:.2f}s")
+        return "\n".join(lines)
+
+
+class ScenarioRunner:
+    def __init__(self, definition, workers=4, log=None, ui_lock=UI_LOCK):
+        self.steps = {s.name: s for s in load_definition(definition)}
+        self.workers = workers
+        self.log = log or (lambda message: None)
+        self.ui_lock = ui_lock
+
+    def _attempt(self, step, ctx, origin, started, cancel):
+        """Run one step with retries (in a worker thread). Returns (value, attempts)."""
+        # UI steps hold the lock across retries so nothing else moves the mouse in between
+        with self.ui_lock if step.ui else contextlib.nullcontext():
+            started[step.name] = time.monotonic() - origin
+            attempts = 0
+            while True:
+                attempts += 1
+                try:
+                    with span(f"step:{step.name}", attempt=attempts, ui=step.ui):
+                        return step.run(ctx), attempts
+                except Exception as e:
+                    # A step that already timed out is not retried behind the runner's back
+                    if attempts > step.retries or cancel.is_set():
+                        e.attempts = attempts
+                        raise
+                    self.log(f"Step '{step.name}' attempt {attempts} failed: {e}. Retrying...")
+                    time.sleep(step.retry_delay)
+
+    def run(self, context=None):
+        """Execute every step whose dependencies succeeded. Returns a ScenarioReport."""
+        ctx = dict(context or {})
+        origin = time.monotonic()
+        results, started, running = {}, {}, {}
+        abandoned, cancels = {}, {name: threading.Event() for name in self.steps}
+        pending = dict(self.steps)
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scenario")
+        try:
+            while pending or running:
+                # Skip steps whose dependencies did not succeed; start the ready ones
+                for name, step in list(pending.items()):
+                    if any(results.get(n) and results[n].status != "ok" for n in step.needs):
+                        del pending[name]
+                        results[name] = StepOutcome(name, "skipped", 0, None, 0.0, "dependency failed")
+                    elif all(n in results for n in step.needs):
+                        del pending[name]
+                        future = pool.submit(self._attempt, step, ctx, origin, started, cancels[name])
+                        running[future] = (step, time.monotonic())
+                if not running:
+                    continue
+
+                deadlines = [begun + step.timeout for step, begun in running.values() if step.timeout]
+                timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                for future, (step, begun) in list(running.items()):
+                    if future in done:
+                        del running[future]
+                        results[step.name] = self._finish(step, future, ctx, origin, started, now)
+                    elif step.timeout and now - begun >= step.timeout:
+                        # The thread cannot be killed: stop its retries and settle it below
+                        del running[future]
+                        cancels[step.name].set()
+                        abandoned[future] = (step, begun)
+                        results[step.name] = StepOutcome(step.name, "timeout", 0, started.get(step.name),
+                                                         now - begun, f"timed out after {step.timeout}s")
+                        self.log(f"Step '{step.name}' timed out after {step.timeout}s")
+            for future, (step, begun) in abandoned.items():
+                results[step.name] = self._settle(step, future, ctx, origin, started, begun)
+        finally:
+            pool.shutdown(wait=False)
+        report = ScenarioReport(results, ctx, time.monotonic() - origin)
+        self.log("Scenario report:\n" + report.table())
+        return report
+
+    def _settle(self, step, future, ctx, origin, started, begun):
+        """
+        Wait (up to one more timeout) for a step that timed out, so its UI action is
+        over and its lock released before the report says what really happened.
+        """
+        done, _ = wait([future], timeout=step.timeout)
+        now = time.monotonic()
+        if not done:
+            self.log(f"Step '{step.name}' is still running {step.timeout}s after its timeout")
+            return StepOutcome(step.name, "timeout", 0, started.get(step.name), now - begun,
+                               f"timed out after {step.timeout}s; still running")
+        outcome = self._finish(step, future, ctx, origin, started, now)
+        if outcome.status == "ok":
+            self.log(f"Step '{step.name}' finished after its {step.timeout}s timeout")
+            return outcome._replace(status="late", error=f"finished after the {step.timeout}s timeout")
+        return outcome._replace(error=f"timed out after {step.timeout}s, then: {outcome.error}")
+
+    def _finish(self, step, future, ctx, origin, started, now):
+        begun = started.get(step.name, 0.0)
+        seconds = now - origin - begun
+        try:
+            value, attempts = future.result()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            self.log(f"Step '{step.name}' failed: {error}")
+            return StepOutcome(step.name, "failed", getattr(e, "attempts", 1), begun, seconds, error)
+        ctx[step.name] = value
+        return StepOutcome(step.name, "ok", attempts, begun, seconds, None)
@@ -0,0 +1,9 @@
+"""
+screen_states.py - 画面状態のラベル
+
+state_classifier が返すラベルと、その参照状態を学習するときの名前。
+監視ループが判定結果と比べるだけなら、画像処理 (cv2 / NumPy) を
+読み込まずにこのモジュールだけを import すればよい。
+"""
+BUSY, WAITING, IDLE, ERROR = "busy", "waiting-for-approval", "idle", "error"
+LABELS = (BUSY, WAITING, IDLE, ERROR)
@@ -0,0 +1,228 @@
+"""
+script_host.py - 常駐 AppleScript ホスト
+
+run_applescript のたびに osascript を起動する代わりに、1つの
+osascript (JavaScript for Automation) プロセスを常駐させ、パイプ越しに
+JSON 行でスクリプトを送って実行する。
+
+プロトコル (1行1メッセージ):
+  要求: {"id": 1, "script": "..."}
+  応答: {"id": 1, "ok": true, "result": "..."} / {"id": 1, "ok": false, "error": "..."}
+  クリップボード: {"id": 2, "clipboard": "get"} / {"id": 3, "clipboard": "set", "text": "..."}
+  (NSPasteboard を直接読み書きするので pbcopy/pbpaste を起動しない)
+
+ホスト側ではスクリプト本文をキーにコンパイル済み NSAppleScript をキャッシュする。
+同じプロトコルを話すプロセスであれば command 引数で差し替えられる
+（Linux での動作確認用の代替インタプリタなど）。
+"""
+import json
+import atexit
+import threading
+import subprocess
+import queue
+
+HOST_SOURCE = r'''
+ObjC.import('Foundation');
+ObjC.import('AppKit');
+var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+var cache = {};
+var cacheSize = 0;
+var buffer = '';
+
+function send(message) {
+    var line = $(JSON.stringify(message) + '\n');
+    stdout.writeData(line.dataUsingEncoding($.NSUTF8StringEncoding));
+}
+
+function errorMessage(err) {
+    var info = ObjC.deepUnwrap(err[0]) || {};
+    return String(info.NSAppleScriptErrorMessage || 'AppleScript error');
+}
+
+function execute(source) {
+    var err = Ref();
+    var script = cache[source];
+    if (!script) {
+        script = $.NSAppleScript.alloc.initWithSource($(source));
+        if (!script.compileAndReturnError(err)) {
+            return {ok: false, error: errorMessage(err)};
+        }
+        if (cacheSize >= 256) {
+            cache = {};
+            cacheSize = 0;
+        }
+        cache[source] = script;
+        cacheSize += 1;
+    }
+    var desc = script.executeAndReturnError(err);
+    if (desc.isNil()) {
+        return {ok: false, error: errorMessage(err)};
+    }
+    var value = ObjC.unwrap(desc.stringValue);
+    return {ok: true, result: value === undefined ? '' : value};
+}
+
+function clipboard(request) {
+    var board = $.NSPasteboard.generalPasteboard;
+    if (request.clipboard == 'set') {
+        board.clearContents;
+        board.setStringForType($(request.text), $.NSPasteboardTypeString);
+        return {ok: true, result: ''};
+    }
+    var value = ObjC.unwrap(board.stringForType($.NSPasteboardTypeString));
+    return {ok: true, result: value === undefined ? '' : value};
+}
+
+while (true) {
+    var data = stdin.availableData;
+    if (data.length == 0) {
+        break;
+    }
+    // Requests are ASCII-only JSON, so chunk boundaries never split a character.
+    buffer += ObjC.unwrap($.NSString.alloc.initWithDataEncoding(data, $.NSASCIIStringEncoding));
+    var index;
+    while ((index = buffer.indexOf('\n')) >= 0) {
+        var line = buffer.slice(0, index);
+        buffer = buffer.slice(index + 1);
+        if (!line) {
+            continue;
+        }
+        var request = JSON.parse(line);
+        var response;
+        try {
+            response = request.clipboard ? clipboard(request) : execute(request.script);
+        } catch (e) {
+            response = {ok: false, error: String(e)};
+        }
+        response.id = request.id;
+        send(response);
+    }
+}
+'''
+
+DEFAULT_COMMAND = ["osascript", "-l", "JavaScript", "-e", HOST_SOURCE]
+
+
+class ScriptHostError(Exception):
+    """Raised when the host process cannot be started or talked to."""
+
+
+class ScriptHost:
+    """Long-lived script interpreter reached over stdin/stdout pipes."""
+
+    def __init__(self, command=None, timeout=15.0):
+        self.command = command or DEFAULT_COMMAND
+        self.timeout = timeout
+        self.stats = {"requests": 0, "errors": 0, "timeouts": 0, "restarts": 0}
+        self._process = None
+        self._responses = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _start(self):
+        try:
+            process = subprocess.Popen(
+                self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL)
+        except OSError as e:
+            raise ScriptHostError(f"Cannot start script host: {e}")
+        responses = queue.Queue()
+        reader = threading.Thread(target=self._read_loop, args=(process, responses), daemon=True)
+        reader.start()
+        if self._process is not None:
+            self.stats["restarts"] += 1
+        self._process = process
+        self._responses = responses
+
+    @staticmethod
+    def _read_loop(process, responses):
+        for line in process.stdout:
+            try:
+                responses.put(json.loads(line))
+            except ValueError:
+                continue
+        # EOF: the host exited or crashed
+        responses.put(None)
+
+    def _kill(self):
+        process = self._process
+        if process and process.poll() is None:
+            process.kill()
+        if process:
+            process.wait()
+
+    def alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def stop(self):
+        with self._lock:
+            process = self._process
+            if process and process.poll() is None:
+                try:
+                    process.stdin.close()
+                    process.wait(timeout=2)
+                except (OSError, subprocess.TimeoutExpired):
+                    self._kill()
+
+    def _call(self, message, timeout=None):
+        """Send one request. Returns (response dict, None) or (None, error message)."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            self.stats["requests"] += 1
+            self._next_id += 1
+            request_id = self._next_id
+            payload = (json.dumps(dict(message, id=request_id)) + "\n").encode("ascii")
+
+            # A host that died while idle is restarted and the request is sent
+            # once more; a host that dies mid-request is not retried because
+            # the script may already have pressed keys.
+            for attempt in range(2):
+                if not self.alive():
+                    self._start()
+                try:
+                    self._process.stdin.write(payload)
+                    self._process.stdin.flush()
+                    break
+                except (BrokenPipeError, OSError):
+                    self._kill()
+                    if attempt:
+                        raise ScriptHostError("Script host is not accepting requests")
+
+            while True:
+                try:
+                    response = self._responses.get(timeout=timeout)
+                except queue.Empty:
+                    self.stats["timeouts"] += 1
+                    self._kill()
+                    return None, f"Script host timeout after {timeout}s"
+                if response is None:
+                    self._kill()
+                    self.stats["errors"] += 1
+                    return None, "Script host exited while running the script"
+                if response.get("id") != request_id:
+                    continue  # late answer to a request that already timed out
+                if response.get("ok"):
+                    return response, None
+                self.stats["errors"] += 1
+                return None, response.get("error") or "Script error"
+
+    def run(self, script, timeout=None):
+        """Run a script in the host. Returns (output, error) like Backend.run_script."""
+        response, error = self._call({"script": script}, timeout)
+        if error:
+            return "", error
+        return str(response.get("result", "")).strip(), None
+
+    def get_clipboard(self, timeout=None):
+        """Read the clipboard as text through the host's NSPasteboard (no process spawn)."""
+        response, error = self._call({"clipboard": "get"}, timeout)
+        if error:
+            raise ScriptHostError(error)
+        return str(response.get("result", ""))
+
+    def set_clipboard(self, text, timeout=None):
+        response, error = self._call({"clipboard": "set", "text": text}, timeout)
+        if error:
+            raise ScriptHostError(error)
@@ -0,0 +1,258 @@
+"""
+state_classifier.py - 知覚ハッシュによる画面状態の判定
+
+Antigravity ウィンドウの決まった領域 (入力欄まわり・エージェントのパネル) から
+dHash と pHash (各 64 bit) を取り、ラベル付きの参照状態 (busy / waiting / idle / error)
+の索引とハミング距離で照合する。checkpoint.md に WAITING が書かれなくても
+「承認待ちの画面」を検出できる。1 フレームの判定は数ミリ秒なので、
+ファイルの状態監視と並べて常時回せる。
+
+参照状態は実際の画面から学習して assets/states.json に保存する:
+
+    python3 lib/state_classifier.py learn waiting-for-approval   # いまの画面を登録
+    python3 lib/state_classifier.py classify                     # 判定と所要時間
+
+    classifier = StateClassifier.load()          # 索引が無ければ None
+    detector = StateDetector(rpa, classifier)
+    detector.poll()   # 安定した状態が変わったときだけ StateMatch を返す
+"""
+import os
+import sys
+import json
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.assets import ASSET_DIR
+from lib.screen_states import BUSY, WAITING, IDLE, ERROR, LABELS
+from lib.tracing import span
+
+STATES_FILE = os.path.join(ASSET_DIR, "states.json")
+WINDOW_TITLE = "Antigravity"
+
+# Window-relative (x, y, width, height) ratio boxes that tell the states apart
+REGIONS = {
+    "input": (0.0, 0.75, 1.0, 0.25),   # chat input, approve / stop buttons
+    "panel": (0.6, 0.0, 0.4, 0.75),    # agent panel: spinner, error banners
+}
+MAX_DISTANCE = 20  # of 128 bits (dHash + pHash) per region; farther means "unknown"
+THUMB_WIDTH = 320  # captures are shrunk to about this width once before the regions are hashed
+
+# label: best match or None; distance: mean bits per region; regions: {name: (label, distance)}
+StateMatch = namedtuple("StateMatch", "label distance regions seconds")
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def dhash(gray, size=8):
+    """Difference hash: brightness gradient between horizontal neighbours of a size x size thumbnail."""
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return _pack(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray, size=8, factor=4):
+    """Perceptual hash: low-frequency DCT coefficients of a thumbnail compared with their median."""
+    side = size * factor
+    small = cv2.resize(gray, (side, side), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:size, :size].flatten()
+    return _pack(low > np.median(low[1:]))
+
+
+def _pack(bits):
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def region_hashes(gray, regions=REGIONS):
+    """{region: (dhash, phash)} for a grayscale capture of the whole window."""
+    height, width = gray.shape[:2]
+    factor = width // THUMB_WIDTH
+    if factor > 1:
+        # One area resize of the whole capture by an integer factor (OpenCV's fast path)
+        # is cheaper than one resize per region at Retina size
+        height, width = height // factor, width // factor
+        gray = cv2.resize(gray[:height * factor, :width * factor], (width, height), interpolation=cv2.INTER_AREA)
+    hashes = {}
+    for name, (rx, ry, rw, rh) in regions.items():
+        crop = gray[int(ry * height):int((ry + rh) * height), int(rx * width):int((rx + rw) * width)]
+        hashes[name] = (dhash(crop), phash(crop))
+    return hashes
+
+
+class StateClassifier:
+    """An index of labeled reference hashes per region, searched by Hamming distance."""
+
+    def __init__(self, references=(), regions=REGIONS, max_distance=MAX_DISTANCE):
+        self.regions = dict(regions)
+        self.max_distance = max_distance
+        self.references = []  # (label, region, dhash, phash)
+        self._index = {}      # region -> (labels, uint64 dhashes, uint64 phashes)
+        for ref in references:
+            self.add(*ref)
+
+    def add(self, label, region, dh, ph):
+        self.references.append((label, region, dh, ph))
+        self._index.pop(region, None)
+
+    def learn(self, label, gray):
+        """Add the regions of one window capture as references for label."""
+        for region, (dh, ph) in region_hashes(gray, self.regions).items():
+            self.add(label, region, dh, ph)
+
+    def _arrays(self, region):
+        if region not in self._index:
+            refs = [r for r in self.references if r[1] == region]
+            self._index[region] = ([r[0] for r in refs],
+                                   np.array([r[2] for r in refs], dtype=np.uint64),
+                                   np.array([r[3] for r in refs], dtype=np.uint64))
+        return self._index[region]
+
+    def _distances(self, region, dh, ph):
+        """Bit distance from (dh, ph) to every reference of region, vectorized over the index."""
+        labels, dhashes, phashes = self._arrays(region)
+        if not labels:
+            return labels, np.empty(0, dtype=np.int64)
+        x = np.stack([dhashes ^ np.uint64(dh), phashes ^ np.uint64(ph)], axis=1)
+        bits = _POPCOUNT[x.view(np.uint8)].reshape(len(labels), -1).sum(axis=1)
+        return labels, bits
+
+    def classify(self, gray):
+        """
+        Label a grayscale window capture. Each region votes for its nearest
+        reference; the label with the smallest mean distance over the regions
+        wins, or None when that is above max_distance.
+        """
+        start = time.perf_counter()
+        per_label, regions = {}, {}
+        for region, (dh, ph) in region_hashes(gray, self.regions).items():
+            labels, bits = self._distances(region, dh, ph)
+            if not labels:
+                continue
+            best = {}
+            for label, distance in zip(labels, bits.tolist()):
+                best[label] = min(distance, best.get(label, distance))
+            nearest = min(best, key=best.get)
+            regions[region] = (nearest, best[nearest])
+            for label, distance in best.items():
+                per_label.setdefault(label, []).append(distance)
+        label, distance = None, None
+        if per_label:
+            scores = {label: sum(d) / len(d) for label, d in per_label.items()}
+            label = min(scores, key=scores.get)
+            distance = scores[label]
+            if distance > self.max_distance:
+                label = None
+        return StateMatch(label, distance, regions, time.perf_counter() - start)
+
+    # --- persistence ---------------------------------------------------------------
+
+    def to_dict(self):
+        return {"regions": self.regions, "max_distance": self.max_distance,
+                "references": [{"label": l, "region": r, "dhash": f"{d:016x}", "phash": f"{p:016x}"}
+                               for l, r, d, p in self.references]}
+
+    def save(self, path=STATES_FILE):
+        from lib.checkpoint import atomic_write
+        atomic_write(path, json.dumps(self.to_dict(), indent=2) + "\n")
+
+    @classmethod
+    def load(cls, path=STATES_FILE):
+        """The classifier stored at path, or None when no references were learned yet."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        refs = [(r["label"], r["region"], int(r["dhash"], 16), int(r["phash"], 16)) for r in data["references"]]
+        regions = {name: tuple(box) for name, box in data.get("regions", REGIONS).items()}
+        return cls(refs, regions, data.get("max_distance", MAX_DISTANCE))
+
+
+class StateDetector:
+    """
+    Classifies the Antigravity window on each poll and reports a state only
+    once it was seen `confirm` times in a row (a spinner frame or a half-drawn
+    banner does not flip the state).
+    """
+
+    def __init__(self, rpa, classifier, window=WINDOW_TITLE, confirm=2):
+        self.rpa = rpa
+        self.classifier = classifier
+        self.window = window
+        self.confirm = confirm
+        self.state = None
+        self.last = None
+        self._candidate, self._count = None, 0
+
+    def capture(self):
+        region = self.rpa.window_region(self.window)
+        if not region:
+            return None
+        return self.rpa.vision.capture(self.rpa.vision.clip_region(region))
+
+    def classify(self):
+        """StateMatch for the current screen (label None if the window is missing or unknown)."""
+        with span("classify_state") as s:
+            gray = self.capture()
+            if gray is None:
+                return StateMatch(None, None, {}, 0.0)
+            self.last = self.classifier.classify(gray)
+            s.set(label=self.last.label, distance=self.last.distance)
+            return self.last
+
+    def poll(self, match=None):
+        """
+        Classify once (or take a StateMatch classified elsewhere, e.g. on the daemon's
+        worker thread); returns the StateMatch when the confirmed state changed, else None.
+        """
+        if match is None:
+            match = self.classify()
+        if match.label == self._candidate:
+            self._count += 1
+        else:
+            self._candidate, self._count = match.label, 1
+        if self._count >= self.confirm and self._candidate != self.state:
+            self.state = self._candidate
+            return match
+        return None
+
+
+def main(argv=None):
+    import argparse
+    from core import AntigravityRPA
+    parser = argparse.ArgumentParser(description="Learn or classify Antigravity screen states.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    learn = sub.add_parser("learn", help="add the current window as a reference")
+    learn.add_argument("label", help=f"e.g. {', '.join(LABELS)}")
+    classify = sub.add_parser("classify", help="classify the current window")
+    classify.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--states", default=STATES_FILE)
+    args = parser.parse_args(argv)
+
+    rpa = AntigravityRPA(debug=False)
+    classifier = StateClassifier.load(args.states) or StateClassifier()
+    detector = StateDetector(rpa, classifier)
+    if args.command == "learn":
+        gray = detector.capture()
+        if gray is None:
+            print(f"{WINDOW_TITLE} window not found.")
+            return 1
+        classifier.learn(args.label, gray)
+        classifier.save(args.states)
+        print(f"Learned '{args.label}' ({len(classifier.references)} references in {args.states})")
+        return 0
+    for _ in range(args.repeat):
+        match = detector.classify()
+        distance = "-" if match.distance is None else f"{match.distance:.1f}"
+        print(f"{match.label or 'unknown'} (distance {distance}, {match.seconds * 1000:.2f} ms) {match.regions}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+status_journal.py - チェックポイント状態の追記専用ジャーナル
+
+checkpoint.md の隣に checkpoint.journal を置き、状態変化を固定長レコードで
+追記していく。最新の状態は末尾の 1 レコードを読むだけで分かる。
+
+レコード (RECORD_SIZE バイト, 改行で終わる):
+    crc32|本文の長さ|seq|unix時刻|source|status|task<空白埋め>\\n
+- crc32 は本文に対するもので、書きかけのレコードを検出する
+- 本文の長さで空白埋めを切り落とす (task 自体の末尾の空白は残る)
+- seq はファイル末尾のレコードの次の番号。ロック (flock) の中で読んで書くので、
+  デーモンとミッションのように複数のプロセスが書いても通し番号になる
+- fsync はまとめて行う (fsync_every 件ごと / fsync_interval 秒ごと / close 時)
+- compact_after 件を超えたら最新レコードだけの一時ファイルを作り、rename で置き換える。
+  置き換えも同じロックの中で行い、ロックを取った書き手はファイルが置き換わって
+  いないか確かめてから書く (古い inode への追記で記録が消えない)
+"""
+import os
+import time
+import zlib
+import fcntl
+import tempfile
+from collections import namedtuple
+
+RECORD_SIZE = 256
+HEADER_SIZE = 13  # "crc32|len|" (8 + 1 + 3 + 1 bytes)
+JournalRecord = namedtuple("JournalRecord", "seq time source status task")
+
+
+def _clean(text):
+    return (text or "").replace("|", "/").replace("\n", " ")
+
+
+def encode_record(record):
+    body = f"{record.seq}|{record.time:.3f}|{_clean(record.source)}|{_clean(record.status)}|{_clean(record.task)}"
+    raw = body.encode("utf-8")[:RECORD_SIZE - HEADER_SIZE - 1]
+    # Never cut a multi-byte character in half
+    raw = raw.decode("utf-8", "ignore").encode("utf-8")
+    line = b"%08x|%03x|" % (zlib.crc32(raw), len(raw)) + raw
+    return line.ljust(RECORD_SIZE - 1, b" ") + b"\n"
+
+
+def _checked_body(data):
+    """The record body if its CRC matches, else None."""
+    try:
+        length = int(data[9:12], 16)
+        raw = data[HEADER_SIZE:HEADER_SIZE + length]
+        if data[8:9] == data[12:13] == b"|" and int(data[:8], 16) == zlib.crc32(raw):
+            return raw
+    except ValueError:
+        pass
+    return None
+
+
+def decode_record(data):
+    """Parse one record; returns None for torn or corrupt data."""
+    if len(data) != RECORD_SIZE or not data.endswith(b"\n"):
+        return None
+    raw = _checked_body(data)
+    if raw is None:
+        return None
+    try:
+        seq, ts, source, status, task = raw.decode("utf-8").split("|", 4)
+        return JournalRecord(int(seq), float(ts), source, status, task)
+    except ValueError:
+        return None
+
+
+def journal_path_for(checkpoint_path):
+    return os.path.splitext(checkpoint_path)[0] + ".journal"
+
+
+class StatusJournal:
+    def __init__(self, path, fsync_every=8, fsync_interval=1.0, compact_after=1024):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_after = compact_after
+        self._fd = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _open(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _lock(self):
+        """
+        Open the journal and take its exclusive lock. The inode is checked once the
+        lock is held: if another process compacted the file meanwhile, the lock was
+        on the replaced file, so reopen and lock the new one.
+        """
+        while True:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self._close_fd()
+
+    def _close_fd(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def latest(self):
+        """Return the newest intact record by reading only the end of the file."""
+        try:
+            with open(self.path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                offset = (size // RECORD_SIZE) * RECORD_SIZE
+                # Walk back past a torn tail, at most a few records
+                for _ in range(4):
+                    offset -= RECORD_SIZE
+                    if offset < 0:
+                        return None
+                    f.seek(offset)
+                    record = decode_record(f.read(RECORD_SIZE))
+                    if record:
+                        return record
+        except FileNotFoundError:
+            return None
+        return None
+
+    def append(self, status, task=None, source="rpa"):
+        """Append a state record (task defaults to the previous one)."""
+        fd = self._lock()
+        try:
+            # The next number comes from the file, not this process, so writers share one order
+            last = self.latest()
+            if task is None:
+                task = last.task if last else ""
+            record = JournalRecord(last.seq + 1 if last else 1, time.time(), source, status, task)
+            # Keep records aligned even if a previous writer died mid-record
+            misalignment = os.fstat(fd).st_size % RECORD_SIZE
+            if misalignment:
+                os.ftruncate(fd, os.fstat(fd).st_size - misalignment)
+            os.write(fd, encode_record(record))
+            oversized = os.fstat(fd).st_size // RECORD_SIZE > self.compact_after
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._unsynced += 1
+        if (self._unsynced >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.flush()
+        if oversized:
+            self.compact()
+        return record
+
+    def flush(self):
+        if self._fd is not None and self._unsynced:
+            os.fsync(self._fd)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self):
+        """Atomically replace the journal with just its latest record (under the writers' lock)."""
+        fd = self._lock()
+        try:
+            self.flush()
+            last = self.latest()
+            directory = os.path.dirname(os.path.abspath(self.path))
+            tmp_fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".",
+                                                suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(tmp_fd, "wb") as f:
+                    os.fchmod(f.fileno(), 0o644)
+                    if last:
+                        f.write(encode_record(last))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+            _fsync_dir(directory)
+        finally:
+            # Writers blocked on the old file see the new inode once this lock is gone
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self._close_fd()
+
+    def close(self):
+        self.flush()
+        self._close_fd()
+
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -1,26 +1,19 @@
 import sys
 import os
-import re
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.task_queue import TaskQueue
 
 def get_next_task(list_file_path):
     """
     Reads 'やりたいリスト.md' and returns the first uncompleted task.
-    Looks for the pattern: - [ ] Task Name
+    Looks for the pattern: - [ ] Task Name (duplicates and tasks in progress are skipped)
     """
     if not os.path.exists(list_file_path):
         return None
 
-    with open(list_file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Find the first incomplete task [- [ ] Task Name]
-    match = re.search(r'- \[ \]\s*(.*)', content)
-    if match:
-        task_name = match.group(1).strip()
-        # Remove parenthetical notes like "(Day 4 予定)" or "(🟡 ミドル)"
-        task_name = re.sub(r'\(.*?\)', '', task_name).strip()
-        return task_name
-    return None
+    task = TaskQueue(list_file_path).next()
+    return task.name if task else None
 
 def main():
     # Target file
@@ -0,0 +1,228 @@
+"""
+task_queue.py - やりたいリスト.md のタスクキュー
+
+リストを一度だけ解析して、セクション・チェック状態・サイズタグ (🔴/🟡)・
+行番号とバイト位置の索引を作る。
+- ファイルが変わったら、前回の内容との共通部分より後ろだけを解析し直す
+- 同じタスク名のエントリは状態にかかわらず最初の 1 件だけを扱う
+  (完了済みのタスクが再掲されても、もう一度ディスパッチしない)
+- 着手できるエントリの行番号を昇順で持ち、next() は先頭を見るだけ
+- claim() は [ ] → [/]、complete() は [/] → [x] をその 1 文字だけ書き換える
+  ([/] は monitor-app.js でも「進行中」として表示される)
+
+    queue = TaskQueue(LIST_FILE)
+    task = queue.next()
+    queue.claim(task)
+    ...
+    queue.complete(task)
+"""
+import re
+import bisect
+from collections import namedtuple
+
+from lib.file_watch import file_stamp
+
+TODO, IN_PROGRESS, DONE = " ", "/", "x"
+SIZE_TAGS = ("🔴", "🟡")
+
+TASK_LINE = re.compile(rb'^([ \t]*)- \[([ xX/])\]\s*(.*?)\s*$')
+SECTION_LINE = re.compile(rb'^##\s+(.*?)\s*$')
+
+TaskEntry = namedtuple("TaskEntry", "line offset state name text size section indent")
+
+
+def task_key(text):
+    """Normalized task name: parenthetical notes like "(🟡 ミドル)" and bold markers removed."""
+    name = re.sub(r'\(.*?\)|（.*?）', '', text)
+    return name.replace("**", "").strip()
+
+
+def _parse_line(raw, line, offset, section):
+    match = TASK_LINE.match(raw)
+    if not match:
+        return None
+    indent, state, text = match.group(1), match.group(2).decode().lower(), match.group(3).decode("utf-8", "replace")
+    size = next((tag for tag in SIZE_TAGS if tag in text), None)
+    # offset points at the state character inside "[ ]"
+    return TaskEntry(line, offset + len(indent) + 3, state, task_key(text), text, size, section, len(indent))
+
+
+class TaskQueue:
+    def __init__(self, path):
+        self.path = path
+        self.stats = {"full_parses": 0, "incremental_parses": 0, "lines_parsed": 0, "edits": 0}
+        self._data = b""
+        self._stamp = None
+        self._line_starts = []    # byte offset of every line
+        self._sections = []       # (line, title), sorted by line
+        self._entries = []        # TaskEntry, sorted by line
+        self._entry_lines = []    # line of each entry (for bisect)
+        self._position = {}       # line -> index into _entries
+        self._by_key = {}         # task key -> [line, ...] in file order
+        self._open = []           # lines of dispatchable entries (see _is_open), sorted
+        self.refresh()
+
+    # --- index -------------------------------------------------------------
+
+    def refresh(self):
+        """Bring the index up to date with the file. Returns True if anything was re-parsed."""
+        stamp = file_stamp(self.path)
+        if stamp == self._stamp:
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        self._stamp = stamp
+        if data == self._data:
+            return False
+        self._reindex_from(self._first_changed_line(data), data)
+        return True
+
+    def _first_changed_line(self, data):
+        old = self._data
+        limit = min(len(old), len(data))
+        lo, step = 0, 4096
+        while lo < limit and old[lo:lo + step] == data[lo:lo + step]:
+            lo += step
+        while lo < limit and old[lo] == data[lo]:
+            lo += 1
+        # Re-parse from the start of the line holding the first differing byte
+        return max(0, bisect.bisect_right(self._line_starts, lo) - 1)
+
+    def _reindex_from(self, first_line, data):
+        if first_line == 0:
+            self.stats["full_parses"] += 1
+        else:
+            self.stats["incremental_parses"] += 1
+        keep = bisect.bisect_left(self._entry_lines, first_line)
+        for entry in reversed(self._entries[keep:]):
+            del self._position[entry.line]
+            lines = self._by_key[entry.name]
+            lines.pop()
+            if not lines:
+                del self._by_key[entry.name]
+        del self._entries[keep:]
+        del self._entry_lines[keep:]
+        del self._open[bisect.bisect_left(self._open, first_line):]
+        del self._sections[bisect.bisect_left(self._sections, (first_line,)):]
+        offset = self._line_starts[first_line] if first_line < len(self._line_starts) else 0
+        del self._line_starts[first_line:]
+        section = self._sections[-1][1] if self._sections else None
+
+        line = first_line
+        while offset < len(data):
+            end = data.find(b"\n", offset)
+            end = len(data) if end < 0 else end + 1
+            raw = data[offset:end].rstrip(b"\r\n")
+            self._line_starts.append(offset)
+            heading = SECTION_LINE.match(raw)
+            if heading:
+                section = heading.group(1).decode("utf-8", "replace")
+                self._sections.append((line, section))
+            else:
+                entry = _parse_line(raw, line, offset, section)
+                if entry:
+                    self._position[line] = len(self._entries)
+                    self._entries.append(entry)
+                    self._entry_lines.append(line)
+                    self._by_key.setdefault(entry.name, []).append(line)
+                    if self._is_open(entry):
+                        self._open.append(line)
+            offset = end
+            line += 1
+        self.stats["lines_parsed"] += line - first_line
+        self._data = data
+
+    # --- lookups -----------------------------------------------------------
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entry_at(self, line):
+        position = self._position.get(line)
+        return None if position is None else self._entries[position]
+
+    def find(self, name):
+        """All entries for a task name (any state), in file order."""
+        return [self._entries[self._position[line]] for line in self._by_key.get(task_key(name), [])]
+
+    def _is_open(self, entry):
+        """
+        True for a top-level task still to do that is the first entry of its name.
+        A later entry with the same name is a re-listing whatever the first one's
+        state, so a task completed once is not dispatched again.
+        """
+        return entry.state == TODO and not entry.indent and self._by_key[entry.name][0] == entry.line
+
+    def next(self, section=None, size=None):
+        """
+        First top-level task still to do, skipping re-listings of earlier tasks
+        and tasks already in progress. Optionally restricted to a section
+        (substring) or size tag.
+        """
+        self.refresh()
+        if not section and not size:
+            return self.entry_at(self._open[0]) if self._open else None
+        for line in self._open:
+            entry = self.entry_at(line)
+            if section and (entry.section is None or section not in entry.section):
+                continue
+            if size and entry.size != size:
+                continue
+            return entry
+        return None
+
+    def pending(self):
+        """Every task next() could return, in file order."""
+        self.refresh()
+        return [self._entries[self._position[line]] for line in self._open]
+
+    def in_progress(self):
+        return [e for e in self._entries if e.state == IN_PROGRESS]
+
+    # --- edits -------------------------------------------------------------
+
+    def _resolve(self, task, state):
+        if isinstance(task, TaskEntry):
+            return self.entry_at(task.line)
+        return next((e for e in self.find(task) if e.state == state), None)
+
+    def _set_state(self, task, expected, state):
+        self.refresh()
+        entry = self._resolve(task, expected)
+        if entry is None or entry.state != expected:
+            return None
+        with open(self.path, "r+b") as f:
+            f.seek(entry.offset)
+            current = f.read(1).decode().lower()
+            if current != expected:
+                return None
+            f.seek(entry.offset)
+            f.write(state.encode())
+        self.stats["edits"] += 1
+        data = bytearray(self._data)
+        data[entry.offset:entry.offset + 1] = state.encode()
+        self._data = bytes(data)
+        self._stamp = file_stamp(self.path)
+        if self._is_open(entry):
+            del self._open[bisect.bisect_left(self._open, entry.line)]
+        entry = entry._replace(state=state)
+        self._entries[self._position[entry.line]] = entry
+        if self._is_open(entry):
+            bisect.insort(self._open, entry.line)
+        return entry
+
+    def claim(self, task=None):
+        """Mark a task (default: next()) as in progress. Returns the updated entry or None."""
+        task = task or self.next()
+        return task and self._set_state(task, TODO, IN_PROGRESS)
+
+    def complete(self, task):
+        """Mark an in-progress task as done. Returns the updated entry or None."""
+        return self._set_state(task, IN_PROGRESS, DONE)
+
+    def release(self, task):
+        """Put an in-progress task back to to-do (e.g. when dispatch failed)."""
+        return self._set_state(task, IN_PROGRESS, TODO)
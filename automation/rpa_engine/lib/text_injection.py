@@ -0,0 +1,99 @@
+"""
+text_injection.py - テキスト入力 (貼り付け / タイプ) の自動切り替え
+
+短い 1 行の ASCII はチャンクごとにまとめてタイプし、日本語・改行入り・
+長文はクリップボード経由で貼り付ける。
+貼り付けでは:
+1. 元のクリップボードを退避
+2. 書き込んだ内容が本当にクリップボードに入ったか確認 (違えば貼らない)
+3. Cmd+V のあと、貼り付けが画面に出るまで待ってから元の内容に戻す
+   (アプリはクリップボードを非同期に読むので、すぐ戻すと古い内容が貼られる)
+
+クリップボード自体はバックエンドが担当する (MacBackend は PyObjC /
+常駐スクリプトホストでプロセスを起動せずに読み書きする)。
+退避・復元はテキストのみ。画像などテキスト以外の内容は戻せない。
+"""
+import time
+from collections import namedtuple
+
+from lib.probes import screen_changed, wait_until
+
+TYPE_MAX_CHARS = 32   # longer text is pasted
+TYPE_CHUNK = 8        # characters sent per write() call when typing
+CHUNK_PAUSE = 0.01    # pause between chunks so the app keeps up
+
+InjectionResult = namedtuple("InjectionResult", "mode chars verified restored latency")
+
+
+def choose_mode(text, type_max_chars=TYPE_MAX_CHARS):
+    """
+    "type" for short printable ASCII without newlines (what the keyboard can
+    key in safely); "paste" for Japanese, multi-line or long text.
+    """
+    if len(text) <= type_max_chars and text.isascii() and text.isprintable():
+        return "type"
+    return "paste"
+
+
+class TextInjector:
+    def __init__(self, rpa, type_max_chars=TYPE_MAX_CHARS, verify_timeout=1.0,
+                 settle_timeout=0.5, restore=True, sleep=time.sleep):
+        self.rpa = rpa
+        self.type_max_chars = type_max_chars
+        self.verify_timeout = verify_timeout
+        self.settle_timeout = settle_timeout
+        self.restore = restore
+        self.sleep = sleep
+        self.stats = {"typed": 0, "pasted": 0, "verify_failures": 0, "restored": 0}
+
+    @property
+    def backend(self):
+        return self.rpa.backend
+
+    def inject(self, text, region=None, mode=None):
+        """
+        Enter text into the focused control. region (logical screen box of the
+        input) lets a paste wait until the text has actually rendered before the
+        clipboard is restored. Returns an InjectionResult.
+        """
+        start = time.monotonic()
+        mode = mode or choose_mode(text, self.type_max_chars)
+        if mode == "type":
+            self._type(text)
+            self.stats["typed"] += 1
+            return InjectionResult("type", len(text), True, False, time.monotonic() - start)
+
+        previous = self.backend.get_clipboard() if self.restore else None
+        self.backend.set_clipboard(text)
+        verified, _, _ = wait_until(lambda: self.backend.get_clipboard() == text,
+                                    timeout=self.verify_timeout, sleep=self.sleep)
+        if not verified:
+            # Pasting now would insert whatever else is on the clipboard
+            self.stats["verify_failures"] += 1
+            restored = self._restore(previous, text)
+            return InjectionResult("paste", len(text), False, restored, time.monotonic() - start)
+
+        rendered = screen_changed(self.rpa, region) if region and previous else None
+        self.backend.hotkey("command", "v")
+        self.stats["pasted"] += 1
+        if previous:
+            if rendered:
+                wait_until(rendered, timeout=self.settle_timeout, sleep=self.sleep)
+            else:
+                self.sleep(self.settle_timeout)
+        restored = self._restore(previous, text)
+        return InjectionResult("paste", len(text), True, restored, time.monotonic() - start)
+
+    def _type(self, text):
+        for i in range(0, len(text), TYPE_CHUNK):
+            if i:
+                self.sleep(CHUNK_PAUSE)
+            self.backend.write(text[i:i + TYPE_CHUNK], interval=0.0)
+
+    def _restore(self, previous, text):
+        # An empty previous clipboard may hold an image; leave it alone
+        if not previous or previous == text:
+            return False
+        self.backend.set_clipboard(previous)
+        self.stats["restored"] += 1
+        return True
@@ -0,0 +1,231 @@
+"""
+tracing.py - エンジン操作の計測 (span)
+
+run_applescript・画像検索・クリック・入力・シナリオのステップなどを span として
+記録し、遅いミッションの原因 (osascript / スクリーンショット / 照合 / 待ち) を
+後から切り分けられるようにする。
+- 記録先はメモリ上のリングバッファ (deque、上限 capacity 件) なので常時オンでも軽い
+- JSONL (追記、前回の書き出し以降の分だけ) と Prometheus テキスト形式で出力できる
+- CLI で操作ごとの p50/p95/p99 を表示する
+
+    with span("run_applescript", chars=len(script)) as s:
+        ...
+        s.set(error_text=error)   # 属性を後から追加
+    TRACER.export_jsonl(TRACE_FILE)
+
+    python3 lib/tracing.py report automation/rpa_trace.jsonl
+    python3 lib/tracing.py prometheus automation/rpa_trace.jsonl
+
+RPA_TRACE=0 で記録を止められる。
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import itertools
+import threading
+from collections import deque, namedtuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# start: wall-clock seconds; duration: seconds; ok: False if the action raised or failed
+Span = namedtuple("Span", "seq name start duration ok error attrs")
+
+
+class _ActiveSpan:
+    __slots__ = ("tracer", "name", "attrs", "ok", "error", "_wall", "_start")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.ok = True
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def fail(self, error=None):
+        """Mark the action as failed without raising (e.g. an image that was not found)."""
+        self.ok = False
+        self.error = error
+
+    def __enter__(self):
+        self._wall = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        if exc_type is not None:
+            self.ok = False
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.record(self.name, duration, self.ok, self.error, self._wall, **self.attrs)
+        return False
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+    def fail(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    def __init__(self, capacity=4096, enabled=None):
+        self.spans = deque(maxlen=capacity)
+        if enabled is None:
+            enabled = os.environ.get("RPA_TRACE", "1") != "0"
+        self.enabled = enabled
+        self._seq = itertools.count(1)
+        self._exported = {}   # path -> last exported seq
+        self._export_lock = threading.Lock()
+
+    def span(self, name, **attrs):
+        """Context manager that times a block; exceptions mark the span failed and propagate."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _ActiveSpan(self, name, attrs)
+
+    def record(self, name, duration, ok=True, error=None, start=None, **attrs):
+        """Add an already-measured span (deque.append is atomic, so no lock is needed)."""
+        if not self.enabled:
+            return
+        start = time.time() - duration if start is None else start
+        self.spans.append(Span(next(self._seq), name, start, duration, ok, error, attrs))
+
+    def snapshot(self, name=None):
+        spans = list(self.spans)
+        return spans if name is None else [s for s in spans if s.name == name]
+
+    def clear(self):
+        self.spans.clear()
+
+    # --- export ------------------------------------------------------------------
+
+    def export_jsonl(self, path):
+        """Append the spans recorded since the last export to path. Returns how many were written."""
+        with self._export_lock:
+            last = self._exported.get(path, 0)
+            fresh = [s for s in list(self.spans) if s.seq > last]
+            if not fresh:
+                return 0
+            with open(path, "a", encoding="utf-8") as f:
+                for s in fresh:
+                    f.write(json.dumps(span_to_dict(s), ensure_ascii=False, default=str) + "\n")
+            self._exported[path] = fresh[-1].seq
+            return len(fresh)
+
+    def prometheus(self):
+        return prometheus_text(self.snapshot())
+
+
+def span_to_dict(s):
+    return {"name": s.name, "start": round(s.start, 6), "duration": round(s.duration, 6),
+            "ok": s.ok, "error": s.error, "attrs": s.attrs}
+
+
+def load_jsonl(path):
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for seq, line in enumerate(f, 1):
+            try:
+                d = json.loads(line)
+                spans.append(Span(seq, d["name"], d["start"], d["duration"], d.get("ok", True),
+                                  d.get("error"), d.get("attrs") or {}))
+            except (ValueError, KeyError):
+                continue
+    return spans
+
+
+# --- statistics --------------------------------------------------------------------
+
+def quantile(sorted_values, q):
+    """Nearest-rank quantile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(spans):
+    """{name: {"count", "errors", "sum", "max", 0.5, 0.95, 0.99}} per action."""
+    groups = {}
+    for s in spans:
+        groups.setdefault(s.name, []).append(s)
+    summary = {}
+    for name, group in groups.items():
+        durations = sorted(s.duration for s in group)
+        stats = {"count": len(group), "errors": sum(1 for s in group if not s.ok),
+                 "sum": sum(durations), "max": durations[-1]}
+        for q in QUANTILES:
+            stats[q] = quantile(durations, q)
+        summary[name] = stats
+    return summary
+
+
+def report(spans):
+    """Text table of p50/p95/p99 per action, slowest total time first."""
+    summary = summarize(spans)
+    lines = [f"{'action':<28}{'count':>7}{'errors':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'total':>10}"]
+    for name, st in sorted(summary.items(), key=lambda item: -item[1]["sum"]):
+        lines.append(f"{name:<28}{st['count']:>7}{st['errors']:>7}"
+                     + "".join(f"{st[q] * 1000:>8.1f}ms" for q in QUANTILES)
+                     + f"{st['max'] * 1000:>8.1f}ms{st['sum']:>9.2f}s")
+    return "\n".join(lines)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(spans, metric="rpa_action_duration_seconds"):
+    """Prometheus text exposition: one summary (quantiles, sum, count) plus an error counter per action."""
+    summary = summarize(spans)
+    lines = [f"# HELP {metric} Duration of RPA engine actions.", f"# TYPE {metric} summary"]
+    for name, st in sorted(summary.items()):
+        label = _label(name)
+        for q in QUANTILES:
+            lines.append(f'{metric}{{action="{label}",quantile="{q}"}} {st[q]:.6f}')
+        lines.append(f'{metric}_sum{{action="{label}"}} {st["sum"]:.6f}')
+        lines.append(f'{metric}_count{{action="{label}"}} {st["count"]}')
+    lines += ["# HELP rpa_action_errors_total RPA engine actions that failed.",
+              "# TYPE rpa_action_errors_total counter"]
+    for name, st in sorted(summary.items()):
+        lines.append(f'rpa_action_errors_total{{action="{_label(name)}"}} {st["errors"]}')
+    return "\n".join(lines) + "\n"
+
+
+TRACER = Tracer()
+span = TRACER.span
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize RPA trace spans (JSONL).")
+    parser.add_argument("command", choices=("report", "prometheus"))
+    parser.add_argument("path", help="JSONL file written by Tracer.export_jsonl")
+    parser.add_argument("--action", help="only spans whose name starts with this")
+    args = parser.parse_args(argv)
+    spans = load_jsonl(args.path)
+    if args.action:
+        spans = [s for s in spans if s.name.startswith(args.action)]
+    if args.command == "report":
+        print(report(spans))
+    else:
+        sys.stdout.write(prometheus_text(spans))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+vision.py - 画面上の画像検索
+
+バックエンドからスクリーンショットを取得し、matcher のピラミッド探索で
+テンプレートを探す。結果は論理座標 (クリック座標と同じ単位) の Match で返す。
+
+アンカーはたいてい前回と同じ場所に出るため、テンプレートごとに最後の
+ヒット位置を覚えておき、その周囲 (または呼び出し側が指定した ROI) だけを
+キャプチャして探す。見つからなかったときだけ全画面に広げる。
+
+複数の UI 状態を見分けたいときは find_all / find_any で 1 枚のフレームに
+対して N 個のテンプレートをまとめて照合する (スレッド並列も可)。
+
+wait_for は生のキャプチャ (または ROI) を前回と比べ (lib/frame_diff.py)、
+変化があったタイルの周囲だけをグレースケールにして照合する。静止している間は
+比較だけで終わる。変化の直後は短い間隔でポーリングし、静止している間は
+間隔を広げる。
+
+frames に FrameRing (lib/frame_ring.py) を渡すと、frame_max_age 秒以内の
+最新フレームからビューで切り出して照合し、検索ごとのスクリーンショットを省く。
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.assets import AssetStore
+from lib.frame_diff import TileDiff
+from lib.matcher import MAX_LEVELS, extend_pyramid, find_template, to_gray
+from lib.tracing import span
+
+# center/box are in logical points; scale is the template scale that matched
+Match = namedtuple("Match", "center score box scale")
+
+
+class Vision:
+    def __init__(self, backend, scales=None, assets=None):
+        self.backend = backend
+        self.extra_scales = tuple(scales or ())
+        self.assets = assets if assets is not None else AssetStore()
+        self.history = {}  # template path -> last Match
+        self.stats = {"local_hits": 0, "local_misses": 0, "full_searches": 0,
+                      "wait_matches": 0, "wait_skips": 0, "ring_frames": 0}
+        # Optional shared FrameRing filled by a CaptureService (see AntigravityRPA.start_capture)
+        self.frames = None
+        self.frame_max_age = 0.1
+
+    def scales(self):
+        """Template scales to try, most likely first (HiDPI aware)."""
+        factor = self.backend.scale_factor()
+        scales = [1.0]
+        if factor != 1.0:
+            # Anchors may have been captured in physical pixels or in points
+            scales.append(factor)
+        return tuple(dict.fromkeys(scales + list(self.extra_scales)))
+
+    def capture(self, region=None):
+        """Grayscale screenshot of region (None = full screen), traced as 'screenshot'."""
+        return self._capture(region, gray=True)
+
+    def grab(self, region=None):
+        """Like capture() but as delivered: RGB, or gray from a gray ring. Convert with to_gray."""
+        return self._capture(region, gray=False)
+
+    def _capture(self, region, gray):
+        with span("screenshot", region=region) as s:
+            if self.frames is not None:
+                image = self._from_ring(region, gray)
+                if image is not None:
+                    s.set(source="ring")
+                    return image
+            image = self.backend.screenshot(region)
+            return to_gray(image) if gray else image
+
+    def _from_ring(self, region, gray=True):
+        """Own copy of a crop of the newest ring frame, or None if it is stale or was overwritten meanwhile."""
+        frame = self.frames.latest(self.frame_max_age)
+        if frame is None:
+            return None
+        image = frame.image
+        if region:
+            factor = self.backend.scale_factor()
+            left, top, width, height = (int(v * factor) for v in region)
+            image = image[top:top + height, left:left + width]
+        if image.shape[2] == 1:
+            image = image[..., 0].copy()
+        else:
+            image = to_gray(image) if gray else image.copy()
+        if not frame.valid():
+            return None
+        self.stats["ring_frames"] += 1
+        return image
+
+    def search(self, screen_pyramid, template, confidence):
+        """Match a cached Template against a (shared) screen pyramid."""
+        if template.flat:
+            return None
+        with span("match", template=template.path) as s:
+            hit = find_template(screen_pyramid, template.gray, confidence, self.scales(),
+                                template_pyramids=template.pyramids)
+            s.set(score=None if hit is None else round(float(hit.score), 3))
+            return hit
+
+    def to_match(self, hit, origin=(0, 0)):
+        """Convert a physical-pixel Hit in a capture taken at logical origin to a Match."""
+        factor = self.backend.scale_factor()
+        left = origin[0] + hit.left / factor
+        top = origin[1] + hit.top / factor
+        width, height = hit.width / factor, hit.height / factor
+        center = (int(left + width / 2), int(top + height / 2))
+        return Match(center, hit.score, (int(left), int(top), int(width), int(height)), hit.scale)
+
+    def clip_region(self, region):
+        """Clamp a logical (left, top, width, height) region to the screen; None if empty."""
+        screen_w, screen_h = self.backend.screen_size()
+        left, top = max(0, int(region[0])), max(0, int(region[1]))
+        right = min(screen_w, int(region[0] + region[2]))
+        bottom = min(screen_h, int(region[1] + region[3]))
+        if right <= left or bottom <= top:
+            return None
+        return (left, top, right - left, bottom - top)
+
+    def padded(self, box):
+        """Region around a previous hit, padded by the template size on each side."""
+        left, top, width, height = box
+        pad = max(width, height, 32)
+        return (left - pad, top - pad, width + 2 * pad, height + 2 * pad)
+
+    def locate_in(self, template, confidence, region=None):
+        """Capture region (None = full screen) and search it for a loaded Template."""
+        origin = (region[0], region[1]) if region else (0, 0)
+        screen_pyramid = [self.capture(region)]
+        hit = self.search(screen_pyramid, template, confidence)
+        if hit is None or hit.score < confidence:
+            return None
+        return self.to_match(hit, origin)
+
+    def locate(self, template, confidence=0.8, roi=None, widen=True):
+        """
+        Find a template (asset name or path). Returns a Match or None.
+
+        Searches roi (logical region) if given, otherwise the area around the
+        template's last hit, and falls back to the full screen on a miss.
+        """
+        template = self.assets.get(template)
+        region = roi or (self.padded(self.history[template.path].box) if template.path in self.history else None)
+        region = self.clip_region(region) if region else None
+        match = None
+        if region:
+            match = self.locate_in(template, confidence, region)
+            self.stats["local_hits" if match else "local_misses"] += 1
+        if match is None and (region is None or widen):
+            self.stats["full_searches"] += 1
+            match = self.locate_in(template, confidence)
+        if match:
+            self.history[template.path] = match
+        return match
+
+    def _match_in_frame(self, frame_pyramid, origin, template, confidence):
+        """Search a captured frame, trying the crop around the last hit first."""
+        factor = self.backend.scale_factor()
+        frame = frame_pyramid[0]
+        last = self.history.get(template.path)
+        if last:
+            left, top, width, height = self.padded(last.box)
+            px_left = max(0, int((left - origin[0]) * factor))
+            px_top = max(0, int((top - origin[1]) * factor))
+            crop = frame[px_top:int((top + height - origin[1]) * factor),
+                         px_left:int((left + width - origin[0]) * factor)]
+            if crop.size:
+                hit = self.search([crop], template, confidence)
+                if hit is not None and hit.score >= confidence:
+                    crop_origin = (origin[0] + px_left / factor, origin[1] + px_top / factor)
+                    return self.to_match(hit, crop_origin)
+        hit = self.search(frame_pyramid, template, confidence)
+        if hit is None or hit.score < confidence:
+            return None
+        return self.to_match(hit, origin)
+
+    def find_all(self, templates, confidence=0.8, roi=None, workers=None, stop_at_first=False):
+        """
+        Match several templates against one captured frame.
+
+        Returns {template: Match or None} in the order given. workers > 1 spreads
+        the matching over a thread pool (OpenCV releases the GIL while matching).
+        """
+        region = self.clip_region(roi) if roi else None
+        origin = (region[0], region[1]) if region else (0, 0)
+        frame_pyramid = [self.capture(region)]
+        # Build every level up front so worker threads only read the pyramid
+        extend_pyramid(frame_pyramid, MAX_LEVELS)
+        loaded = [(name, self.assets.get(name)) for name in templates]
+
+        def match_one(item):
+            return self._match_in_frame(frame_pyramid, origin, item[1], confidence)
+
+        results = {}
+        if workers and workers > 1 and len(loaded) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                matches = list(pool.map(match_one, loaded))
+            results = dict(zip((name for name, _ in loaded), matches))
+        else:
+            for item in loaded:
+                results[item[0]] = match_one(item)
+                if stop_at_first and results[item[0]]:
+                    break
+        for name, template in loaded:
+            if results.get(name):
+                self.history[template.path] = results[name]
+        return results
+
+    def find_any(self, templates, confidence=0.8, roi=None, workers=None):
+        """Return (template, Match) for the first template (in order) found in one frame, else (None, None)."""
+        results = self.find_all(templates, confidence, roi, workers, stop_at_first=not workers)
+        for name in templates:
+            if results.get(name):
+                return name, results[name]
+        return None, None
+
+    def watch(self, template, confidence=0.8, roi=None, min_interval=0.05, max_interval=1.0):
+        """Create an ImageWatch for change-driven polling (used by wait_for and the async API)."""
+        return ImageWatch(self, template, confidence, roi, min_interval, max_interval)
+
+    def wait_for(self, template, timeout=30, confidence=0.8, roi=None,
+                 min_interval=0.05, max_interval=1.0, sleep=time.sleep, clock=time.monotonic):
+        """
+        Wait until a template appears, matching only where the screen changed.
+
+        Polls every min_interval right after a change and backs off (doubling)
+        up to max_interval while the screen is idle. Returns a Match or None.
+        """
+        watch = self.watch(template, confidence, roi, min_interval, max_interval)
+        deadline = clock() + timeout
+        while True:
+            match = watch.poll()
+            if match:
+                return match
+            remaining = deadline - clock()
+            if remaining <= 0:
+                return None
+            sleep(min(watch.interval, remaining))
+
+
+class ImageWatch:
+    """
+    One template being waited for. Each poll() grabs a raw frame, compares it
+    with the previous one (lib/frame_diff.py) and converts and matches only the
+    area that changed; interval is the pause the caller should take before
+    polling again.
+    """
+
+    def __init__(self, vision, template, confidence, roi, min_interval, max_interval):
+        self.vision = vision
+        self.template = vision.assets.get(template)
+        self.confidence = confidence
+        self.region = vision.clip_region(roi) if roi else None
+        self.min_interval, self.max_interval = min_interval, max_interval
+        self.interval = min_interval
+        # A template straddling the edge of a dirty area still has to fit in the crop
+        self.reach = int(max(self.template.gray.shape) * max(vision.scales()))
+        self.diff = TileDiff()
+
+    def poll(self):
+        """Capture and check once. Returns a Match or None."""
+        vision = self.vision
+        region = self.region
+        frame = vision.grab(region)
+        dirty = self.diff.update(frame)
+        if not dirty:
+            vision.stats["wait_skips"] += 1
+            self.interval = min(self.max_interval, self.interval * 2)
+            return None
+        vision.stats["wait_matches"] += 1
+        self.interval = self.min_interval
+        left, top = max(0, dirty[0] - self.reach), max(0, dirty[1] - self.reach)
+        crop = to_gray(frame[top:dirty[3] + self.reach, left:dirty[2] + self.reach])
+        hit = vision.search([crop], self.template, self.confidence)
+        if hit is None or hit.score < self.confidence:
+            return None
+        factor = vision.backend.scale_factor()
+        origin = (region[0], region[1]) if region else (0, 0)
+        match = vision.to_match(hit, (origin[0] + left / factor, origin[1] + top / factor))
+        vision.history[self.template.path] = match
+        return match
@@ -0,0 +1,61 @@
+"""
+window_registry.py - ウィンドウ位置キャッシュ
+
+タイトルの一部からプロセス名・位置・サイズを一度だけ解決し、TTL 付きで保持する。
+System Events で全プロセス・全ウィンドウを走査するのは初回（または無効化後）のみ。
+
+無効化のきっかけ:
+- TTL 切れ
+- フォーカスが別プロセスへ移ったとき (note_focus)
+- バックエンドが報告するウィンドウ世代 (window_epoch) が変わったとき
+- クリックが狙ったウィンドウに当たらなかったとき (呼び出し側が invalidate)
+"""
+import time
+
+
+class WindowRegistry:
+    def __init__(self, backend, ttl=30.0, clock=time.monotonic):
+        self.backend = backend
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._entries = {}
+        self._focused = None
+
+    def lookup(self, title_part):
+        """Return the cached window for title_part, or None if absent or stale."""
+        entry = self._entries.get(title_part)
+        if entry is None:
+            return None
+        window, expires, epoch = entry
+        if self.clock() >= expires or epoch != self.backend.window_epoch():
+            del self._entries[title_part]
+            return None
+        self.stats["hits"] += 1
+        return window
+
+    def resolve(self, title_part):
+        """Return the window whose title contains title_part, scanning the desktop on a miss."""
+        window = self.lookup(title_part)
+        if window is not None:
+            return window
+        self.stats["misses"] += 1
+        epoch = self.backend.window_epoch()
+        window = self.backend.find_window(title_part)
+        if window is not None:
+            self._entries[title_part] = (window, self.clock() + self.ttl, epoch)
+        return window
+
+    def invalidate(self, title_part=None):
+        """Forget one title (or everything when title_part is None)."""
+        self.stats["invalidations"] += 1
+        if title_part is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(title_part, None)
+
+    def note_focus(self, process_name):
+        """Record a focus change; moving focus to another process drops the cache."""
+        if self._focused is not None and process_name != self._focused:
+            self.invalidate()
+        self._focused = process_name
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+monitor_server.py - Mission Control (monitor.html) 用の配信サーバー
+
+checkpoint.md / auto_continue_log.txt / やりたいリスト.md を解析した状態を
+メモリに持ち、ファイルが変わったときだけ差分を Server-Sent Events で送る。
+- ファイルごとに FileWatcher (Linux では inotify) で変更を待つ
+- ログはバイト位置から追記分だけ読む (ローテーション・切り詰めも検出)
+- 変わった部分だけをイベントにして 1 回だけエンコードし、全員のキューに配る
+  (閲覧者が何人いてもファイルの読み直しは 1 回)
+- 接続した直後にスナップショットを送る。再接続時は Last-Event-ID 以降の
+  差分が履歴に残っていればそれだけを送る
+- 静的ファイル (monitor.html など) も同じポートで配信する
+
+    python3 automation/rpa_engine/monitor_server.py --port 8765
+    curl -N http://localhost:8765/events    # SSE
+    curl http://localhost:8765/state        # いまの状態 (ポーリング用)
+"""
+import os
+import re
+import sys
+import json
+import queue
+import signal
+import argparse
+import threading
+from collections import deque
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from lib.checkpoint import parse_checkpoint
+from lib.file_watch import FileWatcher
+from lib.task_queue import TaskQueue
+
+PROJECT_DIR = os.environ.get("ANTIGRAVITY_PROJECT_DIR", "/Users/moritak129/DailyAntigravity")
+AUTOMATION_DIR = os.path.join(PROJECT_DIR, "automation")
+CHECKPOINT_FILE = os.path.join(AUTOMATION_DIR, "checkpoint.md")
+LOG_FILE = os.path.join(AUTOMATION_DIR, "auto_continue_log.txt")
+LIST_FILE = os.path.join(PROJECT_DIR, "やりたいリスト.md")
+
+LOG_LINES = 10         # log entries kept for the snapshot (the page shows the last 10)
+HISTORY = 256          # past events kept for Last-Event-ID resumes
+CLIENT_BUFFER = 64     # events queued per viewer before it is dropped as too slow
+HEARTBEAT = 15         # seconds between keep-alive comments on an idle stream
+TAIL_BYTES = 64 * 1024  # how far back from the end the first log read starts
+ALL_DONE = "全タスク完了！ 🎉"
+
+LOG_LINE = re.compile(r'^\[([\d-]+ [\d:]+)\]\s*(.*)$')
+CHECKLIST_ITEM = re.compile(r'- \[([ x/])\] (.+)')
+CHECKLIST_STATES = {"x": "completed", "/": "in-progress", " ": "pending"}
+
+
+def _field(content, label):
+    match = re.search(r'\*\*' + label + r'\*\*:\s*(.+)', content)
+    return match.group(1).strip() if match else "--"
+
+
+def monitor_checkpoint(content):
+    """The checkpoint fields monitor-app.js displays, in its own shape."""
+    return {
+        "status": parse_checkpoint(content)["status"],
+        "taskName": _field(content, "タスク名"),
+        "startTime": _field(content, "開始時刻"),
+        "checklist": [{"status": CHECKLIST_STATES[m.group(1)], "text": m.group(2).strip()}
+                      for m in CHECKLIST_ITEM.finditer(content)],
+        "nextAction": {
+            "time": _field(content, "予定時刻"),
+            "content": _field(content, "内容"),
+            "trigger": _field(content, "トリガー"),
+        },
+    }
+
+
+def parse_log_line(line):
+    match = LOG_LINE.match(line)
+    if match:
+        return {"time": match.group(1), "message": match.group(2).strip()}
+    return {"time": "", "message": line.strip()}
+
+
+class LogTail:
+    """Reads only the lines appended to a log since the last call, by byte offset."""
+
+    def __init__(self, path, start_bytes=TAIL_BYTES):
+        self.path = path
+        self.start_bytes = start_bytes
+        self.offset = None
+        self.inode = None
+        self.stats = {"bytes": 0, "lines": 0, "rotations": 0}
+
+    def read_new(self):
+        """Complete lines appended since the last call (a trailing partial line waits for its newline)."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            st = os.fstat(f.fileno())
+            first = self.offset is None
+            if first:
+                self.offset = max(0, st.st_size - self.start_bytes)
+            elif st.st_ino != self.inode or st.st_size < self.offset:
+                # Rotated away or truncated: the file at path is a new log
+                self.stats["rotations"] += 1
+                self.offset = 0
+            self.inode = st.st_ino
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if first and self.offset > 0:
+            # Started mid-file: drop the partial first line
+            skip = data.find(b"\n") + 1
+            data, end, self.offset = data[skip:], end - skip, self.offset + skip
+        self.offset += end
+        self.stats["bytes"] += end
+        lines = data[:end].decode("utf-8", "replace").splitlines()
+        self.stats["lines"] += len(lines)
+        return [line for line in lines if line.strip()]
+
+
+class Viewer:
+    def __init__(self):
+        self.events = queue.Queue(maxsize=CLIENT_BUFFER)
+        self.dropped = False
+
+
+def encode_event(seq, kind, data):
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {seq}\nevent: {kind}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class MonitorHub:
+    """
+    Parsed monitor state plus the connected viewers. Each source file has one
+    watcher thread; a change is parsed once and fanned out as a small event.
+    """
+
+    def __init__(self, checkpoint_path=CHECKPOINT_FILE, log_path=LOG_FILE, list_path=LIST_FILE,
+                 log=None):
+        self.checkpoint_path = checkpoint_path
+        self.log_path = log_path
+        self.log = log or (lambda message: None)
+        self.tail = LogTail(log_path)
+        self.tasks = TaskQueue(list_path)
+        self.checkpoint = None
+        self.logs = deque(maxlen=LOG_LINES)
+        self.next_task = None
+        self.seq = 0
+        self.history = deque(maxlen=HISTORY)  # (seq, encoded event)
+        self.viewers = set()
+        self.stats = {"events": 0, "viewers": 0, "dropped_viewers": 0, "reads": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self.refresh_checkpoint()
+        self.refresh_log()
+        self.refresh_tasks()
+
+    # --- sources -------------------------------------------------------------------
+
+    def refresh_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            content = ""
+        self.stats["reads"] += 1
+        checkpoint = monitor_checkpoint(content)
+        with self._lock:
+            if checkpoint != self.checkpoint:
+                self.checkpoint = checkpoint
+                self._publish("checkpoint", checkpoint)
+
+    def refresh_log(self):
+        entries = [parse_log_line(line) for line in self.tail.read_new()][-LOG_LINES:]
+        self.stats["reads"] += 1
+        if entries:
+            with self._lock:
+                self.logs.extend(entries)
+                self._publish("log", entries)
+
+    def refresh_tasks(self):
+        entry = self.tasks.next()  # re-parses only the changed lines
+        self.stats["reads"] += 1
+        next_task = entry.text if entry else ALL_DONE
+        with self._lock:
+            if next_task != self.next_task:
+                self.next_task = next_task
+                self._publish("task", next_task)
+
+    def start(self):
+        """Start one watcher thread per source file."""
+        for path, refresh in ((self.checkpoint_path, self.refresh_checkpoint),
+                              (self.log_path, self.refresh_log),
+                              (self.tasks.path, self.refresh_tasks)):
+            thread = threading.Thread(target=self._watch, args=(path, refresh),
+                                      name=f"watch-{os.path.basename(path)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _watch(self, path, refresh):
+        watcher = FileWatcher(path, debounce=0.1)
+        changed = True  # catch up on anything written before the watcher existed
+        try:
+            while not self._stop.is_set():
+                if changed:
+                    try:
+                        refresh()
+                    except Exception as e:
+                        self.log(f"Monitor refresh failed for {path}: {e}")
+                changed = watcher.wait(timeout=1.0)
+        finally:
+            watcher.close()
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    # --- viewers -------------------------------------------------------------------
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        return {"seq": self.seq, "checkpoint": self.checkpoint, "logs": list(self.logs),
+                "nextTask": self.next_task}
+
+    def publish(self, kind, data):
+        with self._lock:
+            self._publish(kind, data)
+
+    def _publish(self, kind, data):
+        # Called with _lock held, in the same critical section that changed the state:
+        # a snapshot then either already has the change or is older than this event
+        self.seq += 1
+        event = encode_event(self.seq, kind, data)
+        self.history.append((self.seq, event))
+        self.stats["events"] += 1
+        for viewer in list(self.viewers):
+            try:
+                viewer.events.put_nowait(event)
+            except queue.Full:
+                viewer.dropped = True
+                self.viewers.discard(viewer)
+                self.stats["dropped_viewers"] += 1
+
+    def subscribe(self, last_event_id=None):
+        """
+        A new Viewer whose queue starts with what it is missing: the events after
+        last_event_id if they are all still in the history, else a full snapshot.
+        """
+        viewer = Viewer()
+        with self._lock:
+            missed = None
+            if last_event_id is not None and self.history and self.history[0][0] <= last_event_id + 1:
+                missed = [event for seq, event in self.history if seq > last_event_id]
+            if missed is not None and len(missed) < CLIENT_BUFFER:
+                for event in missed:
+                    viewer.events.put_nowait(event)
+            else:
+                viewer.events.put_nowait(encode_event(self.seq, "snapshot", self._snapshot()))
+            self.viewers.add(viewer)
+            self.stats["viewers"] += 1
+        return viewer
+
+    def unsubscribe(self, viewer):
+        with self._lock:
+            self.viewers.discard(viewer)
+
+
+class MonitorHandler(SimpleHTTPRequestHandler):
+    hub = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/events":
+            return self.stream_events()
+        if path == "/state":
+            return self.send_json(self.hub.snapshot())
+        if path == "/":
+            self.path = "/monitor.html"
+        return super().do_GET()
+
+    def send_json(self, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self):
+        try:
+            last_event_id = int(self.headers.get("Last-Event-ID"))
+        except (TypeError, ValueError):
+            last_event_id = None
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.close_connection = True
+        viewer = self.hub.subscribe(last_event_id)
+        try:
+            self.wfile.write(b"retry: 3000\n\n")
+            while not viewer.dropped and self.hub.running:
+                try:
+                    event = viewer.events.get(timeout=HEARTBEAT)
+                except queue.Empty:
+                    event = b": keep-alive\n\n"
+                self.wfile.write(event)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.hub.unsubscribe(viewer)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Mission Control with live updates over SSE.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bind", default="127.0.0.1")
+    args = parser.parse_args(argv)
+
+    hub = MonitorHub(log=print).start()
+    handler = type("Handler", (MonitorHandler,), {"hub": hub})
+    server = ThreadingHTTPServer((args.bind, args.port), partial(handler, directory=AUTOMATION_DIR))
+    server.daemon_threads = True
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    print(f"Mission Control: http://localhost:{args.port}/monitor.html (live updates on /events)")
+    try:
+        server.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.stop()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+rpa_client.py - 常駐 RPA デーモン (daemon.py) のクライアント
+
+標準ライブラリだけで動くので起動が速い (エンジン本体は import しない)。
+
+    python3 rpa_client.py status
+    python3 rpa_client.py send-prompt "続けてください。"
+    python3 rpa_client.py find-image send_button --window Antigravity
+    python3 rpa_client.py mission
+    python3 rpa_client.py classify-state
+    python3 rpa_client.py shutdown
+
+終了コード: 0 = 成功, 1 = コマンドが失敗, 3 = デーモンが動いていない
+(シェルスクリプトは 3 のときに従来どおりスクリプトを直接起動すればよい)。
+"""
+import os
+import sys
+import json
+import socket
+import argparse
+
+PROJECT_DIR = os.environ.get("ANTIGRAVITY_PROJECT_DIR", "/Users/moritak129/DailyAntigravity")
+SOCKET_PATH = os.environ.get("RPA_SOCKET", os.path.join(PROJECT_DIR, "automation", "rpa.sock"))
+
+EXIT_OK, EXIT_FAILED, EXIT_UNAVAILABLE = 0, 1, 3
+
+
+class DaemonUnavailable(Exception):
+    """Nothing is listening on the socket."""
+
+
+def request(cmd, socket_path=SOCKET_PATH, timeout=300.0, **args):
+    """Send one command and return the daemon's response dict ({"ok", "result", "error", ...})."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonUnavailable(f"RPA daemon is not running ({socket_path}): {e}")
+        sock.sendall((json.dumps({"cmd": cmd, "args": args}, ensure_ascii=False) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+        if not line:
+            raise DaemonUnavailable("RPA daemon closed the connection")
+        return json.loads(line)
+    finally:
+        sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send a command to the resident RPA daemon.")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status")
+    sub.add_parser("ping")
+    sub.add_parser("shutdown")
+    sub.add_parser("mission", help="run master_auto_mission inside the daemon")
+    sub.add_parser("classify-state", help="classify the Antigravity window (learned screen states)")
+    send = sub.add_parser("send-prompt")
+    send.add_argument("text")
+    find = sub.add_parser("find-image")
+    find.add_argument("template")
+    find.add_argument("--confidence", type=float, default=0.8)
+    find.add_argument("--window")
+    args = parser.parse_args(argv)
+
+    fields = {k: v for k, v in vars(args).items() if k not in ("cmd", "socket", "timeout") and v is not None}
+    try:
+        response = request(args.cmd, socket_path=args.socket, timeout=args.timeout, **fields)
+    except DaemonUnavailable as e:
+        print(e, file=sys.stderr)
+        return EXIT_UNAVAILABLE
+    except OSError as e:
+        print(f"RPA daemon request failed: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    if not response["ok"]:
+        print(f"Error: {response['error']}", file=sys.stderr)
+        return EXIT_FAILED
+    result = response["result"]
+    if isinstance(result, dict) and "report" in result:
+        print(result.pop("report"))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
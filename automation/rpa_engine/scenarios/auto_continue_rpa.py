@@ -5,129 +5,87 @@ auto_continue_rpa.py - 自律開発ループ監視スクリプト
 機能:
 1. checkpoint.md の「WAITING」状態を監視し、自動で続行コマンドを送信
 2. 予定時刻になったら自動でWAITINGに変更してタスクを開始
+3. 画面状態の参照 (assets/states.json) があれば、画面が承認待ちに見えるときも
+   WAITING とみなす (AI が checkpoint.md を書き忘れても止まらない)
 """
 import sys
 import os
 import time
-import re
-import subprocess
 from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core import AntigravityRPA
-
-CHECKPOINT_FILE = "/Users/moritak129/DailyAntigravity/automation/checkpoint.md"
-LOG_FILE = "/Users/moritak129/DailyAntigravity/automation/auto_continue_log.txt"
-CHECK_INTERVAL = 10  # seconds between checks
-MAX_WAITING_TIME = 300  # 5 minutes max wait before giving up
-
-def log(message):
-    """Logs to file and console."""
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    log_line = f"[{timestamp}] {message}"
-    print(log_line)
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(log_line + "\n")
-    except:
-        pass
-
-def read_checkpoint():
-    """Reads the full checkpoint content and extracts info."""
-    result = {
-        "status": "IDLE",
-        "scheduled_time": None,
-        "scheduled_content": None,
-        "content": ""
-    }
-
-    if not os.path.exists(CHECKPOINT_FILE):
-        return result
-
-    try:
-        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        result["content"] = content
-
-        # Extract status
-        match = re.search(r'\*\*状態\*\*:\s*(\w+)', content)
-        if match:
-            result["status"] = match.group(1).strip()
-
-        # Extract scheduled time: - **予定時刻**: 2026-01-18 00:01
-        time_match = re.search(r'\*\*予定時刻\*\*:\s*([\d\-]+ [\d:]+)', content)
-        if time_match:
-            try:
-                result["scheduled_time"] = datetime.strptime(time_match.group(1).strip(), "%Y-%m-%d %H:%M")
-            except:
-                pass
-
-        # Extract scheduled content: - **内容**: Day 5「ボム兵カウントするゲー」の開発開始
-        content_match = re.search(r'\*\*内容\*\*:\s*(.+)', content)
-        if content_match:
-            result["scheduled_content"] = content_match.group(1).strip()
-
-    except Exception as e:
-        log(f"Error reading checkpoint: {e}")
-
-    return result
-
-def update_checkpoint_status(new_status):
-    """Updates the status in checkpoint.md."""
+from lib.checkpoint import CheckpointStore, CheckpointWatcher
+from lib.logger import get_logger
+from lib.task_queue import TaskQueue
+from lib.antigravity import send_command
+from lib.screen_states import WAITING
+from lib.tracing import TRACER
+
+PROJECT_DIR = os.environ.get("ANTIGRAVITY_PROJECT_DIR", "/Users/moritak129/DailyAntigravity")
+CHECKPOINT_FILE = os.path.join(PROJECT_DIR, "automation", "checkpoint.md")
+LOG_FILE = os.path.join(PROJECT_DIR, "automation", "auto_continue_log.txt")
+TRACE_FILE = os.path.join(PROJECT_DIR, "automation", "rpa_trace.jsonl")
+STATS_FILE = os.path.join(PROJECT_DIR, "automation", "mission_stats.json")
+LIST_FILE = os.path.join(PROJECT_DIR, "やりたいリスト.md")
+CHECK_INTERVAL = 10  # seconds between schedule checks (status changes wake us immediately)
+WAITING_GRACE = 1.0  # let the agent finish its turn before answering WAITING
+RESEND_INTERVAL = 30  # resend "continue" if still WAITING after this long
+MAX_WAITING_TIME = 300  # give up after 5 minutes without a command getting through
+STATES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "states.json")
+SCREEN_CHECK_INTERVAL = 2  # seconds between screen-state checks (only with learned states)
+
+def log(message, **fields):
+    """Logs to file and console (written in the background by the shared logger)."""
+    get_logger(LOG_FILE).log(message, **fields)
+
+def update_checkpoint_status(store, new_status):
+    """Journals the new status and regenerates checkpoint.md from it."""
     try:
-        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        # Replace status
-        new_content = re.sub(
-            r'(\*\*状態\*\*:\s*)\w+',
-            f'\\1{new_status}',
-            content
-        )
-
-        with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
-            f.write(new_content)
-
+        store.set_status(new_status)
         log(f"Checkpoint status updated to: {new_status}")
         return True
     except Exception as e:
         log(f"Error updating checkpoint: {e}")
         return False
 
+def complete_mission_task(store):
+    """Marks the mission's task as done ([/] -> [x]) in やりたいリスト.md."""
+    record = store.latest()
+    if not record or not record.task:
+        return
+    try:
+        if TaskQueue(LIST_FILE).complete(record.task):
+            log(f"Task list updated: {record.task} → done")
+    except OSError as e:
+        log(f"Error updating task list: {e}")
+
+def update_mission_stats():
+    """Folds the log lines written since the last run into mission_stats.json."""
+    from lib.log_analytics import LogAnalytics, default_sources
+    get_logger(LOG_FILE).flush()
+    try:
+        analytics = LogAnalytics(default_sources(PROJECT_DIR), STATS_FILE)
+        analytics.update()
+        analytics.save()
+    except (OSError, ValueError) as e:
+        log(f"Error updating mission stats: {e}")
+
+def make_state_detector(rpa):
+    """Screen-state detector when reference states were learned, else None (no vision stack loaded)."""
+    if not os.path.exists(STATES_FILE):
+        return None
+    from lib.state_classifier import StateClassifier, StateDetector
+    classifier = StateClassifier.load(STATES_FILE)
+    labels = sorted({ref[0] for ref in classifier.references})
+    log(f"Screen-state detection on: {len(classifier.references)} references ({', '.join(labels)})")
+    return StateDetector(rpa, classifier)
+
 def send_command_to_antigravity(rpa, text):
-    """Sends a custom command to Antigravity."""
-    log(f"Sending command: {text[:50]}...")
-
-    # Set clipboard
-    rpa.run_applescript(f'set the clipboard to ""')
-    time.sleep(0.3)
-
-    process = subprocess.Popen(['pbcopy'], stdin=subprocess.PIPE)
-    process.communicate(text.encode('utf-8'))
-    time.sleep(1.0)
-
-    # Focus and paste
-    if rpa.activate_by_window_title("Antigravity"):
-        time.sleep(0.5)
-        rpa.click_window_area("Antigravity", ratio_x=0.9, ratio_y=0.9)
-        time.sleep(0.5)
-
-        script = '''
-        tell application "System Events"
-            set frontmost of process "Antigravity" to true
-            delay 0.3
-            keystroke "v" using {command down}
-            delay 0.5
-            keystroke return
-        end tell
-        '''
-        rpa.run_applescript(script)
-        log("Command sent!")
-        return True
-    else:
-        log("Failed to find Antigravity window.")
-        return False
+    """Sends a custom command to Antigravity (focus, click, verified paste, submit)."""
+    sent = send_command(rpa, text, log=log)
+    TRACER.export_jsonl(TRACE_FILE)
+    return sent
 
 def check_scheduled_trigger(checkpoint):
     """Check if scheduled time has arrived and trigger if needed."""
@@ -149,18 +107,30 @@ def check_scheduled_trigger(checkpoint):
 
     return False
 
-def main():
+def main(rpa=None, send=None, classify=None):
+    """
+    send(rpa, text) -> bool delivers commands and classify() -> StateMatch reads the
+    screen state; the resident daemon passes ones that go through its queue.
+    """
+    send = send or send_command_to_antigravity
     log("=== Auto-Continue RPA Started ===")
     log(f"Monitoring: {CHECKPOINT_FILE}")
-    log(f"Check interval: {CHECK_INTERVAL}s")
 
-    rpa = AntigravityRPA()
+    rpa = rpa or AntigravityRPA()
+    store = CheckpointStore(CHECKPOINT_FILE)
+    watcher = CheckpointWatcher(CHECKPOINT_FILE)
+    log(f"Watch mode: {watcher.mode} (schedule check every {CHECK_INTERVAL}s)")
+    detector = make_state_detector(rpa)
+
     waiting_start_time = None
+    last_sent_time = None
+    gave_up = False
     triggered_schedule = None  # Track which schedule we've triggered
 
     while True:
-        checkpoint = read_checkpoint()
+        checkpoint = watcher.checkpoint
         status = checkpoint["status"]
+        timeout = CHECK_INTERVAL
 
         # Check for scheduled trigger
         if check_scheduled_trigger(checkpoint):
@@ -177,47 +147,65 @@ def main():
                 log(f"🚀 Triggering scheduled task: {content}")
 
                 # Update status to WAITING
-                update_checkpoint_status("WAITING")
-                time.sleep(2)
+                update_checkpoint_status(store, "WAITING")
 
                 # Send the command directly
-                if send_command_to_antigravity(rpa, command):
+                if send(rpa, command):
                     log("✅ Scheduled task triggered successfully!")
-                    time.sleep(30)
-                    continue
-
-        if status == "WAITING":
+                    last_sent_time = time.time()
+                    gave_up = False
+
+        if detector:
+            screen = detector.poll(classify() if classify else None)
+            if screen:
+                log(f"Screen state: {screen.label or 'unknown'}", screen=screen.label, distance=screen.distance)
+                if screen.label == WAITING and status != "WAITING":
+                    log(f"Screen is waiting for approval (checkpoint: {status}); treating as WAITING")
+                elif screen.label != WAITING:
+                    waiting_start_time = None
+                    gave_up = False
+            if detector.state == WAITING:
+                status = "WAITING"
+
+        if status == "WAITING" and not gave_up:
+            now = time.time()
             if waiting_start_time is None:
-                waiting_start_time = time.time()
+                waiting_start_time = now
                 log("Detected WAITING status. Will send continue command shortly...")
-                time.sleep(5)  # Wait a bit before sending
 
-            elapsed = time.time() - waiting_start_time
+            elapsed = now - waiting_start_time
             if elapsed > MAX_WAITING_TIME:
                 log("Max waiting time exceeded. Returning to monitoring.")
-                waiting_start_time = None
-                continue
-
-            # Send continue command
-            continue_text = "続けてください。承認します。お任せで進めてください。"
-            if send_command_to_antigravity(rpa, continue_text):
-                waiting_start_time = None
-                time.sleep(30)  # Wait before checking again
-
-        elif status == "COMPLETE":
-            if waiting_start_time is not None:
-                log("Mission COMPLETE detected. Returning to idle monitoring.")
-            waiting_start_time = None
-
-        elif status == "RUNNING":
-            waiting_start_time = None
-            log("Status: RUNNING - AI is working...")
-
-        else:  # IDLE or unknown
-            waiting_start_time = None
-            log(f"Status: {status}")
-
-        time.sleep(CHECK_INTERVAL)
+                gave_up = True
+            elif elapsed < WAITING_GRACE:
+                timeout = WAITING_GRACE - elapsed
+            elif last_sent_time is None or now - last_sent_time >= RESEND_INTERVAL:
+                # Send continue command
+                continue_text = "続けてください。承認します。お任せで進めてください。"
+                if send(rpa, continue_text):
+                    # The wait only gives up while nothing gets through
+                    last_sent_time = waiting_start_time = time.time()
+                timeout = RESEND_INTERVAL
+            else:
+                timeout = RESEND_INTERVAL - (now - last_sent_time)
+
+        # Sleep until the checkpoint changes state or the next timed check is due
+        if detector:
+            timeout = min(timeout, SCREEN_CHECK_INTERVAL)
+        event = watcher.next_event(timeout=timeout)
+        if event is None:
+            continue
+
+        log(f"Status: {event.previous} → {event.status}", previous=event.previous, status=event.status)
+        store.observe(event.status)
+        waiting_start_time = None
+        gave_up = False
+        if event.status == "COMPLETE":
+            log("Mission COMPLETE detected. Returning to idle monitoring.")
+            complete_mission_task(store)
+            update_mission_stats()
+        elif event.status == "RUNNING":
+            log("AI is working...")
 
     log("=== Auto-Continue RPA Stopped ===")
 
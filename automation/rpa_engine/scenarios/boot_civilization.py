@@ -11,22 +11,24 @@ def main():
 
     rpa.log("--- Civilization Boot Sequence Started ---")
 
-    # 1. Activate Chrome (or your preference)
-    rpa.activate_app("Google Chrome")
-    time.sleep(1)
-
-    # 2. Open a new tab (Cmd + T)
-    rpa.log("Opening new tab...")
-    rpa.run_applescript('tell application "System Events" to keystroke "t" using command down')
-    time.sleep(1)
-
-    # 3. Type the local dashboard URL
     # Assuming the dashboard is running on port 3000 or similar
     # (The user has sync-server.js running, let's guess the URL or use a placeholder)
     dashboard_url = "http://localhost:3000"
     rpa.log(f"Navigating to {dashboard_url}")
-    rpa.type_text(dashboard_url)
-    rpa.press_key("enter")
+
+    # Activate Chrome, open a new tab (Cmd + T), type the URL and press Enter.
+    # Every step is AppleScript-expressible, so on the Mac they run as one script.
+    result = (rpa.macro()
+              .activate("Google Chrome")
+              .hotkey("command", "t")
+              .delay(0.3)
+              .keystroke(dashboard_url)
+              .press("return")
+              .run())
+    if not result.ok:
+        rpa.log(f"Boot sequence failed: {result.error}")
+        return
+    rpa.log(f"Steps: {result.summary()}")
 
     time.sleep(3)
 
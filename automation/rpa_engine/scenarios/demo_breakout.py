@@ -1,7 +1,6 @@
 import sys
 import os
 import time
-import subprocess
 
 # Add parent dir to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -10,15 +9,10 @@ from core import AntigravityRPA
 def send_complex_text(rpa, text):
     """Robustly sends text (including Japanese) via clipboard and Cmd+V."""
     rpa.log(f"Sending text via clipboard: {text}")
-    # Copy to clipboard using pbcopy (macOS native)
-    process = subprocess.Popen(['pbcopy'], stdin=subprocess.PIPE)
-    process.communicate(text.encode('utf-8'))
-
-    # Cmd + V
-    rpa.run_applescript('tell application "System Events" to keystroke "v" using command down')
-    time.sleep(0.5)
-    # Enter
-    rpa.press_key("enter")
+    # Verified paste; the user's clipboard is restored afterwards
+    if rpa.inject_text(text, mode="paste").verified:
+        # Enter
+        rpa.press_key("enter")
 
 def main():
     rpa = AntigravityRPA()
@@ -7,105 +7,23 @@ Antigravity に自律開発命令を送信する。
 """
 import sys
 import os
-import time
-import subprocess
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core import AntigravityRPA
-from lib.task_parser import get_next_task
+from lib.task_queue import TaskQueue
+from lib.checkpoint import CheckpointStore
+from lib.logger import get_logger
+from lib.antigravity import WINDOW_TITLE, focus_chat, send_command
+from lib.scenario_runner import ScenarioRunner, StepFailed
+from lib.tracing import TRACER
 
-LOG_FILE = "/Users/moritak129/DailyAntigravity/automation/mission_log.txt"
-CHECKPOINT_FILE = "/Users/moritak129/DailyAntigravity/automation/checkpoint.md"
+PROJECT_DIR = os.environ.get("ANTIGRAVITY_PROJECT_DIR", "/Users/moritak129/DailyAntigravity")
+LOG_FILE = os.path.join(PROJECT_DIR, "automation", "mission_log.txt")
+CHECKPOINT_FILE = os.path.join(PROJECT_DIR, "automation", "checkpoint.md")
+LIST_FILE = os.path.join(PROJECT_DIR, "やりたいリスト.md")
+TRACE_FILE = os.path.join(PROJECT_DIR, "automation", "rpa_trace.jsonl")
 
-def log_to_file(message):
-    """Logs to a local file for debugging."""
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] {message}\n")
-    except:
-        pass
-    print(f"[{timestamp}] {message}")
-
-def initialize_checkpoint(task_name):
-    """Initializes the checkpoint file for this mission."""
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    content = f"""# Checkpoint - 自律開発ステータス
-
-## 現在のミッション
-- **タスク名**: {task_name}
-- **開始時刻**: {timestamp}
-
-## ステータス
-- **状態**: RUNNING
-
-## 進捗チェックリスト
-(AIが自動で記入)
-
-## 次のアクション
-(AIが自動で記入)
-
-## 最終更新
-{timestamp}
-"""
-    try:
-        with open(CHECKPOINT_FILE, "w", encoding="utf-8") as f:
-            f.write(content)
-        log_to_file(f"Checkpoint initialized for: {task_name}")
-    except Exception as e:
-        log_to_file(f"Failed to initialize checkpoint: {e}")
-
-def send_command_to_antigravity(rpa, text):
-    """Sends the command via clipboard."""
-    log_to_file(f"Preparing command: {text[:50]}...")
-
-    # Clear clipboard
-    rpa.run_applescript('set the clipboard to ""')
-    time.sleep(0.5)
-
-    # Set new content
-    try:
-        process = subprocess.Popen(['pbcopy'], stdin=subprocess.PIPE)
-        process.communicate(text.encode('utf-8'))
-        log_to_file("pbcopy executed.")
-    except Exception as e:
-        log_to_file(f"pbcopy error: {e}")
-
-    time.sleep(1.5)
-
-    # Paste
-    script = '''
-    tell application "System Events"
-        set frontmost of process "Antigravity" to true
-        delay 0.3
-        keystroke "v" using {command down}
-        delay 0.5
-        keystroke return
-    end tell
-    '''
-    rpa.run_applescript(script)
-    log_to_file("Command sent!")
-
-def main():
-    rpa = AntigravityRPA()
-    list_file = "/Users/moritak129/DailyAntigravity/やりたいリスト.md"
-
-    log_to_file("=== AUTONOMOUS MISSION START ===")
-
-    # 1. Read next task
-    task_name = get_next_task(list_file)
-    if not task_name:
-        log_to_file("No task found. Aborting.")
-        return
-
-    log_to_file(f"Target: {task_name}")
-
-    # 2. Initialize checkpoint
-    initialize_checkpoint(task_name)
-
-    # 3. Build autonomous command
-    # This command instructs the AI to work independently
-    command = f"""本日は「{task_name}」を作ります。
+COMMAND_TEMPLATE = """本日は「{task_name}」を作ります。
 
 【自律開発モード】
 - 自分で計画を立てて、checkpoint.md に進捗を書き出しながら進めてください
@@ -116,23 +34,91 @@ def main():
 
 開発を開始してください。"""
 
-    log_to_file(f"Command length: {len(command)} chars")
+def log_to_file(message, **fields):
+    """Logs to a local file for debugging (written in the background by the shared logger)."""
+    get_logger(LOG_FILE).log(message, **fields)
 
-    # 4. Focus and send
-    if rpa.activate_by_window_title("Antigravity"):
-        log_to_file("Focused Antigravity window.")
-        time.sleep(1.0)
+def initialize_checkpoint(task_name):
+    """Initializes the checkpoint file (and its status journal) for this mission."""
+    try:
+        store = CheckpointStore(CHECKPOINT_FILE)
+        store.start_mission(task_name)
+        store.close()
+        log_to_file(f"Checkpoint initialized for: {task_name}")
+    except Exception as e:
+        log_to_file(f"Failed to initialize checkpoint: {e}")
 
-        if rpa.click_window_area("Antigravity", ratio_x=0.9, ratio_y=0.9):
-            log_to_file("Clicked chat area.")
-            time.sleep(1.5)
+def send_command_to_antigravity(rpa, text, process=None, steps=None):
+    """Sends the command via clipboard, waiting only until each step is confirmed."""
+    return send_command(rpa, text, log=log_to_file, process=process, steps=steps)
+
+# --- steps (each receives the shared context and returns its result) ---
+
+def claim_task(ctx):
+    """Claim next task ([ ] -> [/], so a second run does not pick it again)."""
+    task = ctx["queue"].claim()
+    if not task:
+        raise StepFailed("No task found. Aborting.")
+    log_to_file(f"Target: {task.name}", line=task.line + 1, size=task.size)
+    return task
+
+def resolve_window(ctx):
+    """Look up the Antigravity window (cached for the UI steps that follow)."""
+    window = ctx["rpa"].windows.resolve(WINDOW_TITLE)
+    if not window:
+        raise StepFailed("Failed to find Antigravity window.")
+    return window
+
+def init_checkpoint(ctx):
+    initialize_checkpoint(ctx["task"].name)
+
+def build_command(ctx):
+    """Autonomous command: instructs the AI to work independently."""
+    command = COMMAND_TEMPLATE.format(task_name=ctx["task"].name)
+    log_to_file(f"Command length: {len(command)} chars", task=ctx["task"].name, chars=len(command))
+    return command
+
+def focus(ctx):
+    process = focus_chat(ctx["rpa"], log=log_to_file, steps=ctx["probe_steps"])
+    if not process:
+        raise StepFailed("Could not focus the chat input")
+    return process
+
+def send(ctx):
+    if not send_command_to_antigravity(ctx["rpa"], ctx["command"], ctx["focus"], ctx["probe_steps"]):
+        raise StepFailed("Command was not sent")
+    log_to_file("=== MISSION DISPATCHED ===")
+
+# Task claim and window lookup run concurrently; UI steps run one at a time
+SCENARIO = [
+    {"name": "task", "run": claim_task},
+    {"name": "window", "run": resolve_window, "retries": 1},
+    {"name": "checkpoint", "run": init_checkpoint, "needs": ["task"]},
+    {"name": "command", "run": build_command, "needs": ["task"]},
+    {"name": "focus", "run": focus, "needs": ["window"], "ui": True, "retries": 1, "timeout": 15},
+    {"name": "send", "run": send, "needs": ["focus", "command", "checkpoint"], "ui": True, "timeout": 20},
+]
+
+def main(rpa=None):
+    rpa = rpa or AntigravityRPA()
+    queue = TaskQueue(LIST_FILE)
 
-            send_command_to_antigravity(rpa, command)
-            log_to_file("=== MISSION DISPATCHED ===")
+    log_to_file("=== AUTONOMOUS MISSION START ===")
+    report = ScenarioRunner(SCENARIO, log=log_to_file).run(
+        {"rpa": rpa, "queue": queue, "probe_steps": rpa.steps(log=log_to_file)})
+
+    # Hand the task back only when it is known not to have been dispatched
+    task = report.context.get("task")
+    sent = report.results.get("send")
+    if task and not report.ok:
+        if sent and sent.status in ("late", "timeout"):
+            log_to_file(f"Send step {sent.status} ({sent.error}); task left in progress: {task.name}")
         else:
-            log_to_file("Failed to click window.")
-    else:
-        log_to_file("Failed to find Antigravity window.")
+            queue.release(task)
+            log_to_file(f"Mission not dispatched; task released: {task.name}")
+    # Span timings for `python3 lib/tracing.py report automation/rpa_trace.jsonl`
+    TRACER.export_jsonl(TRACE_FILE)
+    return report
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ENGINE_DIR, os.path.join(ENGINE_DIR, "scenarios")]
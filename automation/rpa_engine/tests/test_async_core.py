@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+from async_core import AsyncAntigravityRPA, TIMED_OUT
+from lib.backends import VirtualDesktopBackend
+
+
+def make_rpa():
+    desktop = VirtualDesktopBackend()
+    desktop.add_window("Electron", "Antigravity", 0, 0, 800, 600)
+    return AsyncAntigravityRPA(backend=desktop, debug=False)
+
+
+def test_wait_for_file_change_sees_an_append(tmp_path):
+    path = tmp_path / "checkpoint.md"
+    path.write_text("RUNNING")
+
+    async def scenario():
+        async with make_rpa() as rpa:
+            threading.Timer(0.2, lambda: path.write_text("WAITING!")).start()
+            return await rpa.wait_for_file_change(str(path), timeout=5)
+
+    st = asyncio.run(scenario())
+    assert st is not None and st.st_size == len("WAITING!")
+
+
+def test_wait_for_file_change_times_out_and_can_be_cancelled(tmp_path):
+    path = tmp_path / "checkpoint.md"
+    path.write_text("RUNNING")
+
+    async def scenario():
+        async with make_rpa() as rpa:
+            quiet = await rpa.wait_for_file_change(str(path), timeout=0.3)
+            index, result = await rpa.wait_first(rpa.wait_for_file_change(str(path)), rpa.timeout(0.1))
+            return quiet, index, result
+
+    assert asyncio.run(scenario()) == (None, 1, TIMED_OUT)
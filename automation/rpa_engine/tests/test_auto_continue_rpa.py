@@ -0,0 +1,92 @@
+import pytest
+
+import auto_continue_rpa
+from core import AntigravityRPA
+from lib.backends import VirtualDesktopBackend
+
+CHECKPOINT = "# Checkpoint\n\n## ステータス\n- **状態**: {status}\n"
+
+
+class Stop(Exception):
+    pass
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    (tmp_path / "automation").mkdir()
+    paths = {"CHECKPOINT_FILE": tmp_path / "automation" / "checkpoint.md",
+             "LOG_FILE": tmp_path / "automation" / "auto_continue_log.txt",
+             "TRACE_FILE": tmp_path / "automation" / "rpa_trace.jsonl",
+             "STATS_FILE": tmp_path / "automation" / "mission_stats.json",
+             "LIST_FILE": tmp_path / "list.md", "STATES_FILE": tmp_path / "states.json"}
+    for name, path in paths.items():
+        monkeypatch.setattr(auto_continue_rpa, name, str(path))
+    for name, value in {"WAITING_GRACE": 0.0, "RESEND_INTERVAL": 0.05,
+                        "MAX_WAITING_TIME": 0.2, "CHECK_INTERVAL": 0.05}.items():
+        monkeypatch.setattr(auto_continue_rpa, name, value)
+    paths["CHECKPOINT_FILE"].write_text(CHECKPOINT.format(status="WAITING"), encoding="utf-8")
+    return paths
+
+
+def make_rpa():
+    desktop = VirtualDesktopBackend()
+    desktop.add_window("Electron", "Antigravity", 0, 0, 1440, 900)
+    return AntigravityRPA(backend=desktop, debug=False)
+
+
+def stop_on_give_up(monkeypatch):
+    """Record log messages; end the monitor loop when it gives up waiting."""
+    messages = []
+    def log(message, **fields):
+        messages.append(message)
+        if message.startswith("Max waiting time exceeded"):
+            raise Stop(message)
+    monkeypatch.setattr(auto_continue_rpa, "log", log)
+    return messages
+
+
+def test_answers_waiting_by_pasting_continue_into_antigravity(project, monkeypatch):
+    stop_on_give_up(monkeypatch)
+    send = auto_continue_rpa.send_command_to_antigravity
+    def send_once(rpa, text):
+        sent = send(rpa, text)
+        raise Stop(sent)
+    monkeypatch.setattr(auto_continue_rpa, "send_command_to_antigravity", send_once)
+    rpa = make_rpa()
+    desktop = rpa.backend
+    window = desktop.windows[0]
+
+    with pytest.raises(Stop) as stopped:
+        auto_continue_rpa.main(rpa)
+    assert stopped.value.args == (True,)
+    assert desktop.front is window
+    assert window.submitted == ["続けてください。承認します。お任せで進めてください。"]
+    assert desktop.clipboard == window.submitted[0]
+    keys = [detail for kind, detail in desktop.events if kind == "key"]
+    assert keys == [("hotkey", "command", "v"), ("press", "return")]
+
+
+def test_keeps_answering_a_long_wait_while_sends_get_through(project, monkeypatch):
+    messages = stop_on_give_up(monkeypatch)
+    sent = []
+    def send(rpa, text):
+        sent.append(text)
+        if len(sent) == 8:  # well past MAX_WAITING_TIME
+            raise Stop("enough")
+        return True
+
+    with pytest.raises(Stop, match="enough"):
+        auto_continue_rpa.main(make_rpa(), send=send)
+    assert not any(m.startswith("Max waiting time exceeded") for m in messages)
+
+
+def test_gives_up_when_no_send_gets_through(project, monkeypatch):
+    stop_on_give_up(monkeypatch)
+    sent = []
+    def send(rpa, text):
+        sent.append(text)
+        return False
+
+    with pytest.raises(Stop, match="Max waiting time exceeded"):
+        auto_continue_rpa.main(make_rpa(), send=send)
+    assert sent
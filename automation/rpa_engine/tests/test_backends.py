@@ -0,0 +1,15 @@
+from lib.backends import VirtualDesktopBackend, quote_applescript
+
+
+def test_virtual_run_script_reads_escaped_and_multiline_literals():
+    desktop = VirtualDesktopBackend()
+    window = desktop.add_window("Electron", "Antigravity", 0, 0, 800, 600)
+    text = 'say "hi" to C:\\temp\\\n\tthen "quit"'
+    desktop.run_script(f'set the clipboard to "{quote_applescript(text)}"\n'
+                       'tell application "System Events"\n'
+                       '    set frontmost of process "Electron" to true\n'
+                       '    keystroke "v" using command down\n'
+                       '    keystroke return\n'
+                       'end tell')
+    assert desktop.clipboard == text
+    assert desktop.front is window and window.submitted == [text]
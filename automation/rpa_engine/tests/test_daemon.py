@@ -0,0 +1,115 @@
+import json
+import threading
+
+import auto_continue_rpa
+import daemon as rpa_daemon
+from core import AntigravityRPA
+from lib.backends import VirtualDesktopBackend
+from lib.log_analytics import LogAnalytics, default_sources
+from lib.logger import get_logger
+from lib.state_classifier import StateClassifier, StateDetector
+
+
+def make_daemon(tmp_path, monkeypatch):
+    monkeypatch.setattr(rpa_daemon, "TRACE_FILE", str(tmp_path / "trace.jsonl"))
+    desktop = VirtualDesktopBackend()
+    desktop.add_window("Electron", "Antigravity", 0, 0, 800, 600)
+    desktop.fill_rect(0, 480, 800, 120, (230, 230, 230))
+    rpa = AntigravityRPA(backend=desktop, debug=False)
+    daemon = rpa_daemon.RPADaemon(rpa=rpa, socket_path=str(tmp_path / "rpa.sock"), log=lambda message: None)
+    worker = threading.Thread(target=daemon._work, name="rpa-worker", daemon=True)
+    worker.start()
+    return daemon, rpa
+
+
+def test_classify_state_captures_on_the_worker_thread(tmp_path, monkeypatch):
+    daemon, rpa = make_daemon(tmp_path, monkeypatch)
+    try:
+        detector = StateDetector(rpa, StateClassifier())
+        detector.classifier.learn("idle", detector.capture())
+        daemon._states = detector
+        threads = []
+        capture = rpa.vision.capture
+        monkeypatch.setattr(rpa.vision, "capture",
+                            lambda region=None: threads.append(threading.current_thread().name) or capture(region))
+
+        response = daemon.call("classify-state", timeout=5)
+        assert response["ok"], response["error"]
+        assert response["result"]["label"] == "idle"
+        assert threads == ["rpa-worker"]
+        json.dumps(response)  # what a socket client receives
+    finally:
+        daemon._stop.set()
+
+
+def test_classify_state_without_learned_states_is_an_error(tmp_path, monkeypatch):
+    daemon, _ = make_daemon(tmp_path, monkeypatch)
+    monkeypatch.setattr(StateClassifier, "load", classmethod(lambda cls, path=None: None))
+    try:
+        response = daemon.call("classify-state", timeout=5)
+        assert not response["ok"] and "No screen states" in response["error"]
+    finally:
+        daemon._stop.set()
+
+
+def test_monitor_sends_are_counted_in_the_mission_stats(tmp_path, monkeypatch):
+    daemon, rpa = make_daemon(tmp_path, monkeypatch)
+    (tmp_path / "automation").mkdir()
+    log_file = str(tmp_path / "automation" / "auto_continue_log.txt")
+    monkeypatch.setattr(auto_continue_rpa, "LOG_FILE", log_file)
+    sent = []
+
+    def main(rpa, send, classify):
+        auto_continue_rpa.log("Detected WAITING status. Will send continue command shortly...")
+        sent.append(send(rpa, "続けてください。"))
+    monkeypatch.setattr(auto_continue_rpa, "main", main)
+    try:
+        daemon._monitor()
+    finally:
+        daemon._stop.set()
+    get_logger(log_file).flush()
+
+    analytics = LogAnalytics(default_sources(str(tmp_path)), str(tmp_path / "stats.json"))
+    analytics.update()
+    assert sent == [True]
+    assert analytics.state["counts"]["continues"] == 1
+    assert analytics.summary()["wait_response_seconds"]["count"] == 1
+
+
+def test_job_that_timed_out_in_the_queue_is_not_run_later(tmp_path, monkeypatch):
+    daemon, _ = make_daemon(tmp_path, monkeypatch)
+    release, ran = threading.Event(), []
+    daemon.commands["block"] = lambda: release.wait(5)
+    daemon.commands["click"] = lambda: ran.append("click")
+    try:
+        blocker = threading.Thread(target=daemon.call, args=("block",))
+        blocker.start()
+        response = daemon.call("click", timeout=0.1)
+        assert not response["ok"] and "Timed out" in response["error"]
+        release.set()
+        blocker.join(5)
+        assert daemon.call("ping")["ok"]
+        # Anything queued after the cancelled job still runs, the cancelled one does not
+        assert daemon.call("warm", timeout=5)["ok"]
+        assert ran == []
+    finally:
+        daemon._stop.set()
+
+
+def test_monitor_crash_is_logged_and_shows_in_status(tmp_path, monkeypatch):
+    daemon, _ = make_daemon(tmp_path, monkeypatch)
+    lines = []
+    daemon.log = lines.append
+
+    def main(rpa, send, classify):
+        raise RuntimeError("checkpoint unreadable")
+    monkeypatch.setattr(auto_continue_rpa, "main", main)
+    try:
+        daemon.monitor = threading.Thread(target=daemon._monitor)
+        daemon.monitor.start()
+        daemon.monitor.join(5)
+        status = daemon.status()
+    finally:
+        daemon._stop.set()
+    assert status["monitor"] == {"alive": False, "error": "checkpoint unreadable"}
+    assert "Traceback" in lines[-1] and "checkpoint unreadable" in lines[-1]
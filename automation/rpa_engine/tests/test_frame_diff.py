@@ -0,0 +1,54 @@
+import numpy as np
+from PIL import Image
+
+from lib.backends import VirtualDesktopBackend
+from lib.frame_diff import TileDiff
+from lib.vision import Vision
+
+
+def test_first_frame_is_dirty_and_an_unchanged_one_is_not():
+    frame = np.zeros((200, 300, 3), dtype=np.uint8)
+    diff = TileDiff()
+    assert diff.update(frame) == (0, 0, 300, 200)
+    assert diff.update(frame.copy()) is None
+    assert diff.update(frame[:100]) == (0, 0, 300, 100)
+
+
+def test_change_is_reported_on_tile_boundaries():
+    diff = TileDiff(tile=64)
+    frame = np.zeros((256, 256, 3), dtype=np.uint8)
+    diff.update(frame)
+    frame = frame.copy()
+    frame[70:80, 130:140] = 255
+    assert diff.update(frame) == (128, 64, 192, 128)
+    assert diff.update(frame.copy()) is None
+
+
+def test_a_one_pixel_change_is_seen_on_every_row():
+    diff = TileDiff(tile=64)
+    frame = np.zeros((256, 256), dtype=np.uint8)
+    diff.update(frame)
+    for row in range(256):
+        frame = frame.copy()
+        frame[row, 200] ^= 1  # a caret blinking anywhere
+        assert diff.update(frame) == (192, row // 64 * 64, 256, row // 64 * 64 + 64)
+
+
+def test_watch_skips_idle_polls_and_finds_a_template_when_it_appears(tmp_path):
+    icon = np.zeros((24, 24, 3), dtype=np.uint8)
+    icon[4:20, 4:20] = (200, 40, 40)
+    icon[8:16, 8:16] = (250, 250, 250)
+    path = tmp_path / "icon.png"
+    Image.fromarray(icon).save(path)
+
+    desktop = VirtualDesktopBackend(640, 480)
+    vision = Vision(desktop)
+    watch = vision.watch(str(path), min_interval=0.0, max_interval=0.0)
+    assert watch.poll() is None
+    assert watch.poll() is None
+    assert vision.stats["wait_skips"] == 1
+
+    desktop.draw_image(icon, 400, 300)
+    match = watch.poll()
+    assert match is not None and match.center == (412, 312)
+    assert vision.stats["wait_matches"] == 2
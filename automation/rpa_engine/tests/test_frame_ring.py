@@ -0,0 +1,32 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+from lib.frame_ring import FrameRing
+
+
+def test_close_unlinks_even_while_a_view_is_held():
+    ring = FrameRing.create((4, 6, 3), slots=2)
+    name, shm = ring.name, weakref.ref(ring.shm)
+    ring.write(np.full((4, 6, 3), 7, dtype=np.uint8))
+    image = ring.latest().image[1:]
+    ring.close()
+    with pytest.raises(FileNotFoundError):
+        FrameRing.attach(name)
+    # The mapping outlives the name until the last view is dropped
+    assert int(image[0, 0, 0]) == 7
+    assert shm() is not None
+    del image
+    gc.collect()
+    assert shm() is None
+
+
+def test_close_without_views_closes_at_once():
+    ring = FrameRing.create((4, 6, 3), slots=2)
+    shm = ring.shm
+    ring.write(np.zeros((4, 6, 3), dtype=np.uint8))
+    ring.close()
+    ring.close()
+    assert shm.buf is None
@@ -0,0 +1,104 @@
+"""
+起動時の import コストのテスト
+
+trigger_mission.sh (ショートカットから起動) や master_auto_mission.py のような
+テキストだけのミッションが OpenCV / NumPy / PIL / pyautogui を読み込まずに
+起動・実行できていることを、新しいプロセスで 1 つずつ確かめる。
+- import だけのチェック: 重いモジュールが 1 つも読み込まれず、IMPORT_BUDGET_MS 以内
+  (既定 150ms。IMPORT_BUDGET_REPEAT 回のうち最速の値で判定)
+- テキストのみのミッション実行 (仮想デスクトップ): 画像検索の一式 (cv2 / lib.vision /
+  lib.matcher) が読み込まれない (仮想デスクトップ自体は NumPy を使う)
+"""
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+ENGINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIO_DIR = os.path.join(ENGINE_DIR, "scenarios")
+
+HEAVY = ("cv2", "numpy", "PIL", "pyautogui")
+VISION_STACK = ("cv2", "lib.vision", "lib.matcher")
+BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "150"))
+REPEAT = int(os.environ.get("IMPORT_BUDGET_REPEAT", "3"))
+
+PRELUDE = f"""
+import sys, json, time
+sys.path[:0] = [{ENGINE_DIR!r}, {SCENARIO_DIR!r}]
+ok = True
+start = time.perf_counter()
+"""
+
+RESULT = """
+print("RESULT " + json.dumps({"ms": elapsed * 1000, "modules": sorted(sys.modules), "ok": ok}))
+"""
+
+IMPORT_CHECKS = [
+    ("import core", "import core"),
+    ("import async_core", "import async_core"),
+    ("import master_auto_mission", "import master_auto_mission"),
+    ("import auto_continue_rpa", "import auto_continue_rpa"),
+    ("import lib.task_parser", "import lib.task_parser"),
+]
+
+MISSION_RUN = """
+import master_auto_mission as mission
+from core import AntigravityRPA
+from lib.backends import VirtualDesktopBackend
+desktop = VirtualDesktopBackend()
+desktop.add_window("Electron", "Antigravity", 0, 0, 1440, 900)
+report = mission.main(AntigravityRPA(backend=desktop, debug=False))
+ok = report.ok
+"""
+
+CONTINUE_RUN = """
+import auto_continue_rpa
+from core import AntigravityRPA
+from lib.backends import VirtualDesktopBackend
+desktop = VirtualDesktopBackend()
+desktop.add_window("Electron", "Antigravity", 0, 0, 1440, 900)
+ok = auto_continue_rpa.send_command_to_antigravity(AntigravityRPA(backend=desktop, debug=False), "続けてください")
+"""
+
+RUN_CHECKS = [("text-only mission run", MISSION_RUN), ("auto-continue send", CONTINUE_RUN)]
+
+
+def run_snippet(body, env=None):
+    """Run body in a fresh interpreter; returns {"ms", "modules", "ok"}."""
+    code = PRELUDE + body + "\nelapsed = time.perf_counter() - start\n" + RESULT
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                          env=dict(os.environ, **(env or {})), timeout=120)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"Check did not finish:\n{proc.stderr.strip() or proc.stdout.strip()}")
+
+
+def loaded(modules, names):
+    return [name for name in names if name in modules]
+
+
+def make_project(directory):
+    """A throwaway project with one open task so the mission has something to dispatch."""
+    os.makedirs(os.path.join(directory, "automation"))
+    with open(os.path.join(directory, "やりたいリスト.md"), "w", encoding="utf-8") as f:
+        f.write("## やりたいリスト\n\n- [ ] **Import budget check** (S)\n")
+
+
+@pytest.mark.parametrize("body", [body for _, body in IMPORT_CHECKS], ids=[name for name, _ in IMPORT_CHECKS])
+def test_import_stays_light(body):
+    runs = [run_snippet(body) for _ in range(REPEAT)]
+    assert loaded(runs[0]["modules"], HEAVY) == []
+    ms = min(r["ms"] for r in runs)
+    assert ms <= BUDGET_MS, f"{ms:.1f} ms (budget {BUDGET_MS:.0f} ms)"
+
+
+@pytest.mark.parametrize("body", [body for _, body in RUN_CHECKS], ids=[name for name, _ in RUN_CHECKS])
+def test_text_only_run_skips_the_vision_stack(body, tmp_path):
+    project = str(tmp_path / "project")
+    make_project(project)
+    result = run_snippet(body, env={"ANTIGRAVITY_PROJECT_DIR": project})
+    assert result["ok"]
+    assert loaded(result["modules"], VISION_STACK) == []
@@ -0,0 +1,30 @@
+import os
+import time
+
+from lib.logger import MissionLogger
+
+
+def local_ts(text):
+    return time.mktime(time.strptime(text, "%Y-%m-%d %H:%M:%S"))
+
+
+def write_at(logger, text, message):
+    # Queue a line with a chosen timestamp, as log() would at that moment
+    logger._queue.put((local_ts(text), message, "INFO", {}))
+    logger.flush()
+
+
+def test_daily_rotation_archives_under_the_day_written(tmp_path):
+    path = str(tmp_path / "log.txt")
+    logger = MissionLogger(path, echo=False)
+    write_at(logger, "2026-01-19 23:00:00", "late evening")
+    write_at(logger, "2026-01-20 00:00:05", "after midnight")
+    logger.close()
+
+    with open(tmp_path / "log.2026-01-19.txt", encoding="utf-8") as f:
+        assert "late evening" in f.read()
+    assert not os.path.exists(tmp_path / "log.2026-01-20.txt")
+    with open(path, encoding="utf-8") as f:
+        assert "after midnight" in f.read()
+    with open(tmp_path / "log.2026-01-19.jsonl", encoding="utf-8") as f:
+        assert "late evening" in f.read()
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+import master_auto_mission as mission
+from core import AntigravityRPA
+from lib.backends import VirtualDesktopBackend
+from lib.logger import get_logger
+
+LIST = "## 今週\n- [ ] 記事を書く (🟡 ミドル)\n- [ ] 本を読む\n"
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    (tmp_path / "automation").mkdir()
+    paths = {"LIST_FILE": tmp_path / "list.md", "LOG_FILE": tmp_path / "automation" / "mission_log.txt",
+             "CHECKPOINT_FILE": tmp_path / "automation" / "checkpoint.md",
+             "TRACE_FILE": tmp_path / "automation" / "rpa_trace.jsonl"}
+    for name, path in paths.items():
+        monkeypatch.setattr(mission, name, str(path))
+    paths["LIST_FILE"].write_text(LIST, encoding="utf-8")
+    return paths
+
+
+def make_rpa():
+    desktop = VirtualDesktopBackend()
+    desktop.add_window("Electron", "Antigravity", 0, 0, 1440, 900)
+    return AntigravityRPA(backend=desktop, debug=False)
+
+
+def test_mission_pastes_and_submits_the_command_in_antigravity(project):
+    rpa = make_rpa()
+    desktop = rpa.backend
+    window = desktop.windows[0]
+
+    report = mission.main(rpa)
+    assert report.ok
+    assert desktop.front is window
+    assert len(window.submitted) == 1 and window.submitted[0].startswith("本日は「記事を書く」を作ります。")
+    assert desktop.clipboard == window.submitted[0]
+    keys = [detail for kind, detail in desktop.events if kind == "key"]
+    assert keys == [("hotkey", "command", "v"), ("press", "return")]
+    assert "- [/] 記事を書く" in project["LIST_FILE"].read_text(encoding="utf-8")
+
+
+def scenario_with(send_timeout):
+    return [dict(step, timeout=send_timeout) if step["name"] == "send" else step for step in mission.SCENARIO]
+
+
+def test_send_that_finishes_after_its_timeout_keeps_the_task(project, monkeypatch):
+    def slow_send(rpa, text, process=None, steps=None):
+        time.sleep(0.3)
+        return True
+    monkeypatch.setattr(mission, "send_command_to_antigravity", slow_send)
+    monkeypatch.setattr(mission, "SCENARIO", scenario_with(0.2))
+
+    report = mission.main(make_rpa())
+    get_logger(str(project["LOG_FILE"])).flush()
+    assert report.results["send"].status == "late"
+    assert "- [/] 記事を書く" in project["LIST_FILE"].read_text(encoding="utf-8")
+    assert "=== MISSION DISPATCHED ===" in project["LOG_FILE"].read_text(encoding="utf-8")
+
+
+def test_send_that_fails_releases_the_task(project, monkeypatch):
+    monkeypatch.setattr(mission, "send_command_to_antigravity", lambda *args, **kwargs: False)
+
+    report = mission.main(make_rpa())
+    assert report.results["send"].status == "failed"
+    assert "- [ ] 記事を書く" in project["LIST_FILE"].read_text(encoding="utf-8")
@@ -0,0 +1,51 @@
+import json
+import threading
+import time
+
+from monitor_server import MonitorHub
+
+
+def make_hub(tmp_path):
+    log_path = tmp_path / "auto_continue_log.txt"
+    log_path.write_text("[2026-01-20 09:00:00] === Auto-Continue RPA Started ===\n", encoding="utf-8")
+    list_path = tmp_path / "list.md"
+    list_path.write_text("- [ ] 記事を書く\n", encoding="utf-8")
+    hub = MonitorHub(str(tmp_path / "checkpoint.md"), str(log_path), str(list_path))
+    return hub, log_path
+
+
+def drain(viewer):
+    events = []
+    while not viewer.events.empty():
+        events.append(viewer.events.get_nowait().decode("utf-8"))
+    return events
+
+
+def test_state_and_event_change_together(tmp_path):
+    hub, log_path = make_hub(tmp_path)
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write("[2026-01-20 09:00:05] Detected WAITING status.\n")
+    with hub._lock:
+        refresh = threading.Thread(target=hub.refresh_log)
+        refresh.start()
+        time.sleep(0.1)
+        # The new line is not visible to a snapshot before its event exists
+        assert [e["message"] for e in hub.logs] == ["=== Auto-Continue RPA Started ==="]
+    refresh.join()
+
+    viewer = hub.subscribe()
+    events = drain(viewer)
+    assert len(events) == 1 and "event: snapshot" in events[0]
+    snapshot = json.loads(events[0].split("data: ", 1)[1])
+    assert [e["message"] for e in snapshot["logs"]][-1] == "Detected WAITING status."
+    assert snapshot["seq"] == hub.seq
+
+
+def test_resume_gets_only_the_missed_events(tmp_path):
+    hub, log_path = make_hub(tmp_path)
+    seen = hub.seq
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write("[2026-01-20 09:00:05] Detected WAITING status.\n")
+    hub.refresh_log()
+    events = drain(hub.subscribe(last_event_id=seen))
+    assert len(events) == 1 and "event: log" in events[0] and "Detected WAITING" in events[0]
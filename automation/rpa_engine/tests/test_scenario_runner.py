@@ -0,0 +1,70 @@
+import threading
+import time
+
+from lib.scenario_runner import ScenarioRunner, StepFailed
+
+
+def test_timed_out_ui_step_is_waited_for_and_reported_late():
+    events = []
+
+    def slow(ctx):
+        events.append("slow start")
+        time.sleep(0.3)
+        events.append("slow end")
+        return "sent"
+
+    def other(ctx):
+        events.append("other")
+
+    report = ScenarioRunner([
+        {"name": "slow", "run": slow, "ui": True, "timeout": 0.2},
+        {"name": "after", "run": other, "needs": ["slow"], "ui": True},
+    ], ui_lock=threading.Lock()).run()
+    # run() returned only once the abandoned step had finished
+    assert events == ["slow start", "slow end"]
+    assert report.results["slow"].status == "late"
+    assert report.results["after"].status == "skipped"
+    assert report.context["slow"] == "sent"
+
+
+def test_independent_ui_steps_never_overlap_a_timed_out_one():
+    lock, active, overlaps = threading.Lock(), [], []
+
+    def ui(seconds):
+        def run(ctx):
+            if active:
+                overlaps.append(list(active))
+            active.append(seconds)
+            time.sleep(seconds)
+            active.remove(seconds)
+        return run
+
+    report = ScenarioRunner([
+        {"name": "slow", "run": ui(0.3), "ui": True, "timeout": 0.1},
+        {"name": "quick", "run": ui(0.01), "ui": True},
+    ], ui_lock=lock).run()
+    assert overlaps == []
+    assert report.results["quick"].status == "ok"
+
+
+def test_timed_out_step_is_not_retried():
+    attempts = []
+
+    def flaky(ctx):
+        attempts.append(1)
+        time.sleep(0.2)
+        raise StepFailed("no")
+
+    report = ScenarioRunner([{"name": "flaky", "run": flaky, "retries": 3, "retry_delay": 0.0,
+                              "timeout": 0.1}]).run()
+    assert len(attempts) == 1
+    outcome = report.results["flaky"]
+    assert outcome.status == "failed" and "timed out" in outcome.error
+
+
+def test_step_still_running_after_the_grace_is_a_timeout():
+    release = threading.Event()
+    report = ScenarioRunner([{"name": "stuck", "run": lambda ctx: release.wait(5), "timeout": 0.05}]).run()
+    release.set()
+    assert report.results["stuck"].status == "timeout"
+    assert "still running" in report.results["stuck"].error
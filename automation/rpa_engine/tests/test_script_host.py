@@ -0,0 +1,114 @@
+import sys
+import threading
+
+import pytest
+
+from lib.script_host import ScriptHost, ScriptHostError
+
+# Speaks the host's JSON-lines protocol; "scripts" are tiny commands:
+#   echo <text> | sleep <seconds> | fail <message> | die | pid | stale <text>
+STAND_IN = r'''
+import os, sys, json, time
+clipboard = ""
+for line in sys.stdin:
+    request = json.loads(line)
+    rid = request["id"]
+    if "clipboard" in request:
+        if request["clipboard"] == "set":
+            clipboard = request["text"]
+        response = {"ok": True, "result": clipboard if request["clipboard"] == "get" else ""}
+    else:
+        command, _, arg = request["script"].partition(" ")
+        if command == "die":
+            sys.exit(1)
+        if command == "sleep":
+            time.sleep(float(arg))
+            response = {"ok": True, "result": "slept"}
+        elif command == "fail":
+            response = {"ok": False, "error": arg}
+        elif command == "pid":
+            response = {"ok": True, "result": str(os.getpid())}
+        elif command == "stale":
+            # An answer to an older request arrives first and must be ignored
+            sys.stdout.write(json.dumps({"id": rid - 1, "ok": True, "result": "stale"}) + "\n")
+            response = {"ok": True, "result": arg}
+        else:
+            response = {"ok": True, "result": arg}
+    response["id"] = rid
+    sys.stdout.write(json.dumps(response) + "\n")
+    sys.stdout.flush()
+'''
+
+
+@pytest.fixture
+def host():
+    host = ScriptHost(command=[sys.executable, "-u", "-c", STAND_IN], timeout=5.0)
+    yield host
+    host.stop()
+
+
+def test_runs_scripts_in_one_process(host):
+    assert host.run("echo hello") == ("hello", None)
+    pid = host.run("pid")[0]
+    assert host.run("pid")[0] == pid
+    assert host.stats["restarts"] == 0
+
+
+def test_responses_are_matched_by_id(host):
+    assert host.run("stale fresh") == ("fresh", None)
+
+
+def test_concurrent_callers_get_their_own_answers(host):
+    results = {}
+
+    def call(n):
+        results[n] = host.run(f"echo {n}")
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {n: (str(n), None) for n in range(20)}
+
+
+def test_timeout_kills_the_host_and_the_next_call_restarts_it(host):
+    pid = host.run("pid")[0]
+    output, error = host.run("sleep 5", timeout=0.2)
+    assert output == "" and "timeout" in error
+    assert host.stats["timeouts"] == 1
+    assert not host.alive()
+    assert host.run("pid")[0] != pid
+    assert host.stats["restarts"] == 1
+
+
+def test_host_dying_mid_request_is_reported_and_restarted(host):
+    output, error = host.run("die")
+    assert output == "" and "exited" in error
+    assert host.run("echo back") == ("back", None)
+    assert host.stats["restarts"] == 1
+
+
+def test_host_killed_while_idle_is_restarted_transparently(host):
+    host.run("echo warm")
+    host._process.kill()
+    host._process.wait()
+    assert host.run("echo again") == ("again", None)
+    assert host.stats["restarts"] == 1
+
+
+def test_script_errors_are_returned_not_raised(host):
+    assert host.run("fail no such window") == ("", "no such window")
+    assert host.stats["errors"] == 1
+    assert host.alive()
+
+
+def test_clipboard_round_trip(host):
+    host.set_clipboard("続けてください。\nline 2")
+    assert host.get_clipboard() == "続けてください。\nline 2"
+
+
+def test_unstartable_host_raises():
+    host = ScriptHost(command=["/nonexistent/osascript"])
+    with pytest.raises(ScriptHostError):
+        host.run("echo x")
@@ -0,0 +1,54 @@
+import os
+import multiprocessing
+
+from lib.status_journal import RECORD_SIZE, StatusJournal
+
+
+def test_task_with_trailing_whitespace_round_trips(tmp_path):
+    journal = StatusJournal(str(tmp_path / "checkpoint.journal"))
+    journal.append("RUNNING", task="foo ")
+    record = journal.latest()
+    assert record is not None
+    assert (record.status, record.task) == ("RUNNING", "foo ")
+    journal.close()
+
+
+def test_sequence_is_shared_between_writers(tmp_path):
+    path = str(tmp_path / "checkpoint.journal")
+    daemon, mission = StatusJournal(path), StatusJournal(path)
+    seqs = [daemon.append("RUNNING", task="a").seq, mission.append("WAITING").seq,
+            daemon.append("RUNNING").seq, mission.append("COMPLETE").seq]
+    assert seqs == [1, 2, 3, 4]
+    assert StatusJournal(path).latest().seq == 4
+    daemon.close()
+    mission.close()
+
+
+def test_torn_tail_falls_back_to_previous_record(tmp_path):
+    path = str(tmp_path / "checkpoint.journal")
+    journal = StatusJournal(path)
+    journal.append("RUNNING", task="a")
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b"deadbeef|" + b"x" * (RECORD_SIZE - 10) + b"\n")
+    assert journal.latest().status == "RUNNING"
+
+
+def _append_many(path, source, count):
+    journal = StatusJournal(path, compact_after=8)
+    for i in range(count):
+        journal.append("RUNNING", task=f"{source}-{i}", source=source)
+    journal.close()
+
+
+def test_appends_racing_compaction_are_not_lost(tmp_path):
+    path = str(tmp_path / "checkpoint.journal")
+    writers = [multiprocessing.Process(target=_append_many, args=(path, f"w{n}", 200)) for n in range(3)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(30)
+    assert [writer.exitcode for writer in writers] == [0, 0, 0]
+    # Every append got a number, so the last one equals the total count
+    assert StatusJournal(path).latest().seq == 600
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
@@ -0,0 +1,71 @@
+import os
+
+from lib.task_queue import TaskQueue, DONE
+
+LIST = """# やりたいリスト
+
+## 今週
+- [ ] 記事を書く (🟡 ミドル)
+  - [ ] 下書き
+- [ ] **動画を編集する** (🔴 ヘビー)
+
+## いつか
+- [ ] 記事を書く
+- [ ] 本を読む
+"""
+
+
+def make_queue(tmp_path, text=LIST):
+    path = tmp_path / "list.md"
+    path.write_text(text, encoding="utf-8")
+    return TaskQueue(str(path)), path
+
+
+def test_next_follows_claims_and_completions(tmp_path):
+    queue, path = make_queue(tmp_path)
+    first = queue.next()
+    assert first.name == "記事を書く" and first.size == "🟡"
+    assert queue.claim().line == first.line
+    assert queue.next().name == "動画を編集する"
+    queue.complete(first)
+    assert "- [x] 記事を書く (🟡 ミドル)" in path.read_text(encoding="utf-8")
+    assert [e.name for e in queue.pending()] == ["動画を編集する", "本を読む"]
+    assert queue.next(section="いつか").name == "本を読む"
+    assert queue.next(size="🔴").name == "動画を編集する"
+
+
+def test_relisted_task_is_not_dispatched_again_after_completion(tmp_path):
+    queue, path = make_queue(tmp_path)
+    queue.complete(queue.claim())
+    # A fresh queue (another process) sees the completed task and its re-listing
+    queue = TaskQueue(str(path))
+    assert [e.state for e in queue.find("記事を書く")] == [DONE, " "]
+    assert "記事を書く" not in [e.name for e in queue.pending()]
+
+
+def test_release_puts_a_task_back_in_file_order(tmp_path):
+    queue, _ = make_queue(tmp_path)
+    first = queue.claim()
+    second = queue.claim()
+    assert queue.next().name == "本を読む"
+    queue.release(second)
+    assert queue.next().line == second.line
+    queue.release(first)
+    assert queue.next().line == first.line
+
+
+def test_appended_and_edited_lines_are_reindexed(tmp_path):
+    queue, path = make_queue(tmp_path)
+    for entry in queue.pending():
+        queue.complete(queue.claim(entry))
+    assert queue.next() is None
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("- [ ] 散歩する\n- [ ] 本を読む\n")
+    assert queue.next().name == "散歩する"
+    assert len(queue.pending()) == 1
+    path.write_text(path.read_text(encoding="utf-8").replace("- [x] 本を読む", "- [ ] 本を読む"),
+                    encoding="utf-8")
+    # Same size as before: make sure the stamp moves even on a coarse mtime clock
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert [e.name for e in queue.pending()] == ["本を読む", "散歩する"]
@@ -2,8 +2,8 @@
 
 # start_autonomous_dev.sh
 # 自律開発ループを開始するスクリプト
-# 1. ミッションを起動
-# 2. 自動継続モニターをバックグラウンドで起動
+# 1. 常駐 RPA デーモン (自動継続モニター込み) を起動
+# 2. デーモン経由でミッションを起動
 
 PROJECT_DIR="/Users/moritak129/DailyAntigravity"
 cd "$PROJECT_DIR"
@@ -12,15 +12,32 @@ export PATH="/Users/moritak129/.pyenv/shims:$PATH"
 
 echo "=== Starting Autonomous Development Loop ==="
 
-# 1. Launch mission
-echo "Step 1: Launching mission..."
-python3 "$PROJECT_DIR/automation/rpa_engine/scenarios/master_auto_mission.py"
+ENGINE_DIR="$PROJECT_DIR/automation/rpa_engine"
 
-# 2. Start auto-continue monitor in background
-echo "Step 2: Starting auto-continue monitor..."
-nohup python3 "$PROJECT_DIR/automation/rpa_engine/scenarios/auto_continue_rpa.py" > /dev/null 2>&1 &
-echo "Monitor PID: $!"
+# 1. Start the resident RPA daemon (with the auto-continue monitor) unless one is running
+if python3 "$ENGINE_DIR/rpa_client.py" ping > /dev/null 2>&1; then
+    echo "Step 1: RPA daemon already running."
+else
+    echo "Step 1: Starting RPA daemon with auto-continue monitor..."
+    nohup python3 "$ENGINE_DIR/daemon.py" --monitor > /dev/null 2>&1 &
+    echo "Daemon PID: $!"
+    for _ in $(seq 1 50); do
+        python3 "$ENGINE_DIR/rpa_client.py" ping > /dev/null 2>&1 && break
+        sleep 0.1
+    done
+fi
+
+# 2. Launch mission through the daemon (falls back to a one-off run plus a separate monitor)
+echo "Step 2: Launching mission..."
+python3 "$ENGINE_DIR/rpa_client.py" mission
+if [ $? -eq 3 ]; then
+    echo "RPA daemon unavailable; running mission and monitor as separate processes."
+    python3 "$ENGINE_DIR/scenarios/master_auto_mission.py"
+    nohup python3 "$ENGINE_DIR/scenarios/auto_continue_rpa.py" > /dev/null 2>&1 &
+    echo "Monitor PID: $!"
+fi
 
 echo "=== Autonomous Development Loop Started ==="
 echo "The AI will now work autonomously."
 echo "Monitor logs: $PROJECT_DIR/automation/auto_continue_log.txt"
+echo "Daemon status: python3 $ENGINE_DIR/rpa_client.py status"
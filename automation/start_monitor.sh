@@ -1,6 +1,6 @@
 #!/bin/bash
 # Mission Control Monitor - Start Script
-# Starts a local server and opens the dashboard
+# Starts the live-update server and opens the dashboard
 
 cd /Users/moritak129/DailyAntigravity/automation
 
@@ -12,5 +12,6 @@ echo "Press Ctrl+C to stop"
 # Open browser
 open "http://localhost:8765/monitor.html"
 
-# Start simple HTTP server
-python3 -m http.server 8765
+# Serve the dashboard with live updates (SSE); fall back to a plain file server
+# (the page then polls the files every 5 seconds)
+python3 rpa_engine/monitor_server.py --port 8765 || python3 -m http.server 8765
@@ -11,8 +11,12 @@ cd "$PROJECT_DIR"
 # Set up the Python environment
 export PATH="/Users/moritak129/.pyenv/shims:$PATH"
 
-# Run the master mission script directly
+# Hand the mission to the resident RPA daemon (warm caches, queued behind other commands);
+# exit code 3 means no daemon is running, so run the master mission script directly.
 # We don't redirect output here so you can see any errors in the Shortcut result
-python3 "$PROJECT_DIR/automation/rpa_engine/scenarios/master_auto_mission.py"
+python3 "$PROJECT_DIR/automation/rpa_engine/rpa_client.py" mission
+if [ $? -eq 3 ]; then
+    python3 "$PROJECT_DIR/automation/rpa_engine/scenarios/master_auto_mission.py"
+fi
 
 echo "Mission Triggered Successfully"